@@ -9,23 +9,64 @@ import pytz
 import matplotlib.patheffects as pe
 import matplotlib.font_manager as fm
 import csv
+import json
 import ast # Required for parsing the lag options
+from fan_log_store import read_fan_log
+from member_registry import MemberRegistry
 from market.economy import process_cc_earnings
 from market.engine import update_all_stock_prices, calculate_individual_nudges
 from market.events import clear_and_check_events, update_lag_index
-from market.database import get_market_data_from_db, save_all_market_data_to_db, save_market_state_to_db, get_unapplied_prestige_purchases, flag_prestige_purchases_as_applied, get_inGameName_by_discord_id, get_discord_id_to_ingamename_map
+from market.database import get_market_data_from_db, save_all_market_data_to_db, save_market_state_to_db, get_unapplied_prestige_purchases, flag_prestige_purchases_as_applied, get_inGameName_by_discord_id, get_discord_id_to_ingamename_map, queue_announcement
 
 # --- Configuration ---
 MEMBERS_CSV = 'members.csv'
 FANLOG_CSV = 'fan_log.csv'
 RANKS_CSV = 'ranks.csv'
 OUTPUT_DIR = 'Club_Report_Output'
+ENRICHED_FANLOG_CSV = 'enriched_fan_log.csv'
+ENRICHED_FANLOG_MANIFEST = 'enriched_fan_log_manifest.json'
+ERROR_LOG_CSV = 'data_validation_errors.csv'
+HOLD_OUT_SUSPECT_ROWS = False # Leave out entries validate_data.py flagged, so misreads never reach prestige, CC or prices
 
 def _format_timestamp(dt_object):
     """Formats a datetime object into the consistent ecosystem format."""
     base_str = dt_object.strftime('%Y-%m-%d %H:%M:%S%z')
     return f"{base_str[:-2]}:{base_str[-2:]}"
 
+def hold_out_suspect_rows(fanlog_df):
+    """
+    Drops fan log entries listed in the validation error log. A held-out entry's gain isn't lost,
+    it just shows up in the member's next good reading instead.
+    """
+    if not os.path.isfile(ERROR_LOG_CSV):
+        return fanlog_df
+    errors_df = pd.read_csv(ERROR_LOG_CSV, usecols=['timestamp', 'inGameName'])
+    errors_df['timestamp'] = pd.to_datetime(errors_df['timestamp'], errors='coerce')
+    suspect_keys = pd.MultiIndex.from_frame(errors_df.dropna())
+    # The error log records Central wall-clock times
+    is_suspect = pd.MultiIndex.from_arrays([fanlog_df['timestamp'].dt.tz_localize(None), fanlog_df['inGameName']]).isin(suspect_keys)
+    if is_suspect.any():
+        print(f"  - Holding out {is_suspect.sum()} suspect log entries listed in {ERROR_LOG_CSV}.")
+    return fanlog_df[~is_suspect]
+
+def write_enriched_log_manifest(fanlog_df):
+    """
+    Writes a tiny summary of the enriched log that the bot polls instead of the full CSV.
+    Written after the CSV and swapped in atomically, so a new manifest always describes a complete file.
+    """
+    latest_timestamp = fanlog_df['timestamp'].max()
+    latest_scan = fanlog_df[fanlog_df['timestamp'] == latest_timestamp]
+    manifest = {
+        'latest_timestamp': _format_timestamp(latest_timestamp),
+        'row_count': int(len(fanlog_df)),
+        'members_in_latest_scan': int(len(latest_scan)),
+        'club_total_gain': float(latest_scan['fanGain'].sum()),
+    }
+    temp_path = ENRICHED_FANLOG_MANIFEST + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(temp_path, ENRICHED_FANLOG_MANIFEST)
+
 def log_market_snapshot(run_timestamp, market_state):
     """Logs the current state of the market to a historical file."""
     log_file = 'market/market_snapshot_log.csv'
@@ -97,20 +138,22 @@ def main():
     print("--- 1. Loading and Cleaning Data ---")
     try:
         members_df = pd.read_csv(MEMBERS_CSV)
-        fanlog_df = pd.read_csv(FANLOG_CSV)
+        fanlog_df = read_fan_log(FANLOG_CSV, categorical=True)
         ranks_df = pd.read_csv(RANKS_CSV)
         print(f"Successfully loaded {len(members_df)} members, {len(fanlog_df)} log entries, and {len(ranks_df)} ranks.")
     except FileNotFoundError as e:
         print(f"FATAL ERROR: {e}. Script cannot continue.")
         return
 
-    fanlog_df.dropna(subset=['inGameName', 'fanCount'], inplace=True)
-    fanlog_df['fanCount'] = pd.to_numeric(fanlog_df['fanCount'].astype(str).str.replace(',', '', regex=False), errors='coerce')
-    fanlog_df['timestamp'] = pd.to_datetime(fanlog_df['timestamp'], errors='coerce')
-    fanlog_df.dropna(subset=['fanCount', 'timestamp'], inplace=True)
+    # read_fan_log() has already dropped unparseable rows and localized timestamps to Central
+    if HOLD_OUT_SUSPECT_ROWS:
+        fanlog_df = hold_out_suspect_rows(fanlog_df)
+
+    # Every frame keys members by the same categorical codes; names come back out at the CSV and DB writes
+    registry = MemberRegistry.from_members(members_df)
+    registry.encode(fanlog_df)
 
     central_tz = pytz.timezone('US/Central')
-    fanlog_df['timestamp'] = fanlog_df['timestamp'].dt.tz_localize(central_tz)
 
     print(f"Found {len(fanlog_df)} valid log entries after cleaning.")
 
@@ -127,11 +170,11 @@ def main():
 
     fanlog_df = fanlog_df.sort_values(by=['inGameName', 'timestamp'])
 
-    fanlog_df['previousFanCount'] = fanlog_df.groupby('inGameName')['fanCount'].shift(1)
+    fanlog_df['previousFanCount'] = fanlog_df.groupby('inGameName', observed=True)['fanCount'].shift(1)
     fanlog_df['fanGain'] = fanlog_df['fanCount'] - fanlog_df['previousFanCount']
     fanlog_df['fanGain'].fillna(0, inplace=True)
     
-    fanlog_df['timeDiffMinutes'] = fanlog_df.groupby('inGameName')['timestamp'].diff().dt.total_seconds() / 60
+    fanlog_df['timeDiffMinutes'] = fanlog_df.groupby('inGameName', observed=True)['timestamp'].diff().dt.total_seconds() / 60
     fanlog_df['timeDiffMinutes'].fillna(0, inplace=True)
     
     # 1. Initialize the new column
@@ -167,10 +210,10 @@ def main():
     fanlog_df['tenurePrestigePoints'] = 20 * (fanlog_df['timeDiffMinutes'] / 1440)
     fanlog_df['prestigeGain'] = fanlog_df['performancePrestigePoints'] + fanlog_df['tenurePrestigePoints'] + fanlog_df['prestigePurchased']
 
-    fanlog_df['lifetimePrestige'] = fanlog_df.groupby('inGameName')['prestigeGain'].cumsum()
+    fanlog_df['lifetimePrestige'] = fanlog_df.groupby('inGameName', observed=True)['prestigeGain'].cumsum()
 
     monthly_fan_log = fanlog_df[(fanlog_df['timestamp'] >= start_date) & (fanlog_df['timestamp'] <= end_date)].copy()
-    monthly_fan_log['monthlyPrestige'] = monthly_fan_log.groupby('inGameName')['prestigeGain'].cumsum()
+    monthly_fan_log['monthlyPrestige'] = monthly_fan_log.groupby('inGameName', observed=True)['prestigeGain'].cumsum()
     
     fanlog_df = pd.merge(fanlog_df, monthly_fan_log[['inGameName', 'timestamp', 'monthlyPrestige']], on=['inGameName', 'timestamp'], how='left')
     fanlog_df['monthlyPrestige'].fillna(0, inplace=True)
@@ -193,7 +236,8 @@ def main():
     fanlog_df['date'] = fanlog_df['timestamp'].dt.date
     
     print("\n--- 3. Saving Enriched Fan Log ---")
-    fanlog_df.to_csv('enriched_fan_log.csv', index=False)
+    fanlog_df.to_csv(ENRICHED_FANLOG_CSV, index=False)
+    write_enriched_log_manifest(fanlog_df)
     print("  - Successfully created enriched_fan_log.csv")
     
     # =================================================================
@@ -209,6 +253,14 @@ def main():
         print("FATAL: Could not load market data from database. Halting.")
         return
     
+    # Names only the DB knows get ids too, then every frame is pointed at the final category list
+    member_columns = [('crew_coins', 'inGameName'), ('stock_prices', 'inGameName'), ('portfolios', 'stock_inGameName')]
+    for frame_name, column in member_columns:
+        registry.add(market_data[frame_name][column])
+    for frame_name, column in member_columns:
+        registry.encode(market_data[frame_name], column)
+    registry.encode(fanlog_df)
+
     # Log a snapshot of the state we are using for this run's calculations
     log_market_snapshot(run_timestamp, market_data['market_state'].set_index('state_name')['state_value'])
  
@@ -236,7 +288,7 @@ def main():
     # --- 4. SAVE: Commit all results to the database ---
     print("\nSaving all market data and the new state to the database...")
     
-    save_all_market_data_to_db(updated_balances_df, final_stock_prices_df, new_transactions)
+    save_all_market_data_to_db(MemberRegistry.decode(updated_balances_df), MemberRegistry.decode(final_stock_prices_df), new_transactions)
     
     final_next_market_state_df.loc[final_next_market_state_df['state_name'] == 'last_run_timestamp', 'state_value'] = run_timestamp.isoformat()
     save_market_state_to_db(final_next_market_state_df)
@@ -247,8 +299,10 @@ def main():
     # --- 5. QUEUE ANNOUNCEMENTS ---
     if lag_announcement:
         print(f"Queueing announcement: {lag_announcement}")
-        with open("announcements.txt", "a") as f:
-            f.write(lag_announcement + "\n")
+        if not queue_announcement(lag_announcement):
+            # Fall back to the legacy file so the message isn't lost; the bot drains it too
+            with open("announcements.txt", "a") as f:
+                f.write(lag_announcement + "\n")
     
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -11,13 +11,16 @@ from analysis import get_club_month_window
 import matplotlib.pyplot as plt
 import io
 import asyncio
-import subprocess
 import json
 import random
 from market import database
+from market import async_database
 import numpy as np
 import math
 from generate_visuals import generate_portfolio_image, format_pl_part
+from fan_log_cache import FanLogCache, FanLogManifest
+from role_sync import RoleReconciler
+from refresh_jobs import RefreshJobManager, RefreshAlreadyRunning
 
 # --- Configuration ---
 COMMAND_LOG_CSV = 'command_log.csv'
@@ -29,6 +32,11 @@ FAN_LOG_CSV = 'fan_log.csv'
 MEMBERS_CSV = 'members.csv'
 RANKS_CSV = 'ranks.csv'
 ENRICHED_FAN_LOG_CSV = 'enriched_fan_log.csv'
+ENRICHED_FAN_LOG_MANIFEST = 'enriched_fan_log_manifest.json'
+
+# Shared, mtime-invalidated cache of the enriched log used by the tasks and commands below
+enriched_log = FanLogCache(ENRICHED_FAN_LOG_CSV)
+enriched_log_manifest = FanLogManifest(ENRICHED_FAN_LOG_MANIFEST)
 
 SCOREBOARD_CHANNEL_NAME = 'the-scoreboard'
 PROMOTION_CHANNEL_NAME = 'the-scoreboard' 
@@ -135,13 +143,19 @@ bot = commands.Bot(command_prefix='/', intents=intents, help_command=None)
 
 
 
-def get_last_update_timestamp():
-    """Reads the fan log and returns a Discord-formatted timestamp of the last entry."""
+async def get_last_update_timestamp():
+    """
+    Returns a Discord-formatted timestamp of the last entry in the enriched fan log.
+    Read from the manifest analysis.py writes; the enriched log itself is only parsed (off the
+    event loop) for logs written before the manifest existed.
+    """
     try:
-        df = pd.read_csv(FAN_LOG_CSV)
-        # When reading, pandas correctly infers the timestamp is already timezone-aware
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        last_update_time = df['timestamp'].max()
+        try:
+            last_update_time = enriched_log_manifest.read()['latest_timestamp']
+        except FileNotFoundError:
+            last_update_time = (await enriched_log.load()).latest_timestamp
+        if last_update_time is None:
+            return "Not available"
         
         # --- FIX: Convert the timezone-aware timestamp to UTC before getting the unix value ---
         last_update_time_utc = last_update_time.tz_convert('UTC')
@@ -186,27 +200,29 @@ async def send_to_fan_exchange(guild, message_content, file=None):
         print(f"ERROR: Could not find the #{FAN_EXCHANGE_CHANNEL_NAME} channel.")
 
 async def send_to_channel_by_name(channel_name, message_content, file_path=None):
-    """Finds a channel by name and sends a message and optional file there."""
+    """Finds a channel by name and sends a message and optional file there. Returns True if it was sent."""
     if not bot.guilds:
         print("Bot is not in any guild.")
-        return
+        return False
 
     guild = bot.guilds[0]
     channel = discord.utils.get(guild.channels, name=channel_name)
 
     if not channel:
         print(f"Error: I couldn't find the `#{channel_name}` channel.")
-        return
+        return False
 
     if file_path and not os.path.exists(file_path):
         print(f"Error: I couldn't find the file at {file_path}.")
-        return
+        return False
 
     try:
         file_to_send = discord.File(file_path) if file_path else None
         await channel.send(message_content, file=file_to_send)
+        return True
     except Exception as e:
         print(f"Error sending to channel {channel_name}: {e}")
+        return False
 
 def log_command_usage(ctx):
     """Logs the details of a command execution to a CSV file."""
@@ -281,7 +297,7 @@ async def award_cc(ctx, member: str, amount: int):
 
     # --- 2. Find User in the Database ---
     # This finds the user by their in-game name or ticker.
-    target_user = database.get_user_details_by_identifier(member)
+    target_user = await async_database.get_user_details_by_identifier(member)
     if not target_user:
         return await ctx.send(f"Could not find a member or ticker named '{member}'.", ephemeral=True)
     
@@ -290,7 +306,7 @@ async def award_cc(ctx, member: str, amount: int):
 
     # --- 3. Execute the Database Transaction ---
     # This single function updates the balance AND logs the transaction safely.
-    new_balance = database.execute_admin_award(
+    new_balance = await async_database.execute_admin_award(
         admin_id=admin_id,
         target_id=target_id,
         amount=amount
@@ -361,7 +377,7 @@ async def remove_cc(ctx, member: str, amount: int):
         return await ctx.send("Please enter a positive whole number for the amount to remove.", ephemeral=True)
 
     # --- 2. Find User in the Database ---
-    target_user = database.get_user_details_by_identifier(member)
+    target_user = await async_database.get_user_details_by_identifier(member)
     if not target_user:
         return await ctx.send(f"Could not find a member or ticker named '{member}'.", ephemeral=True)
     
@@ -370,7 +386,7 @@ async def remove_cc(ctx, member: str, amount: int):
 
     # --- 3. Execute the Database Transaction ---
     # This new function safely handles the removal and logging.
-    new_balance = database.execute_admin_removal(
+    new_balance = await async_database.execute_admin_removal(
         admin_id=admin_id,
         target_id=target_id,
         amount=amount
@@ -438,7 +454,7 @@ async def remove_upgrade(ctx, member: discord.Member, upgrade_id: str):
         return await ctx.send(f"Invalid upgrade ID: `{upgrade_id}`.", ephemeral=True)
 
     # Call the new database function
-    success = database.remove_shop_upgrade(target_id, upgrade_name)
+    success = await async_database.remove_shop_upgrade(target_id, upgrade_name)
 
     if success:
         embed = discord.Embed(
@@ -605,39 +621,50 @@ def get_24hr_change(stock_name: str, history_df: pd.DataFrame, current_price: fl
 # --- Fan Update Task ---
 last_update_announced_timestamp = None
 
-@tasks.loop(minutes=1)
+@tasks.loop(seconds=10)
 async def post_fan_update():
-    """Checks for new fan data and posts an update to the scoreboard."""
+    """
+    Checks for new fan data and posts an update to the scoreboard.
+    Driven by the manifest analysis.py writes, so an idle tick is a single stat() call.
+    A manifest is only marked consumed once its update has been handled, so a failed send
+    is retried on the next tick.
+    """
     global last_update_announced_timestamp
     await bot.wait_until_ready()
 
     try:
-        if not os.path.exists(ENRICHED_FAN_LOG_CSV):
-            return
-
-        df = pd.read_csv(ENRICHED_FAN_LOG_CSV)
-        if df.empty:
-            return
-
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        latest_timestamp = df['timestamp'].max()
+        manifest = None
+        try:
+            manifest = enriched_log_manifest.check()
+            if manifest is None:
+                return
+            latest_timestamp = manifest['latest_timestamp']
+            total_fan_gain = manifest['club_total_gain']
+        except FileNotFoundError:
+            # Fallback for logs written before the manifest existed
+            if not os.path.exists(ENRICHED_FAN_LOG_CSV):
+                return
+            snapshot = await enriched_log.load()
+            if snapshot.empty:
+                return
+            latest_timestamp = snapshot.latest_timestamp
+            total_fan_gain = snapshot.rows_at(latest_timestamp)['fanGain'].sum()
 
         if last_update_announced_timestamp is None:
             # On first run, just set the timestamp and do nothing.
             last_update_announced_timestamp = latest_timestamp
-            return
-
-        if latest_timestamp > last_update_announced_timestamp:
-            update_df = df[df['timestamp'] == latest_timestamp]
-            total_fan_gain = update_df['fanGain'].sum()
-
+        elif latest_timestamp > last_update_announced_timestamp:
             if total_fan_gain > 0:
                 message = (f"📢 **Club Update!**\n"
                            f"The data has been updated! The club gained a total of **{total_fan_gain:,.0f}** fans!")
-                await send_to_channel_by_name(SCOREBOARD_CHANNEL_NAME, message)
+                if not await send_to_channel_by_name(SCOREBOARD_CHANNEL_NAME, message):
+                    return  # Leave the manifest pending so the next tick tries again
 
             last_update_announced_timestamp = latest_timestamp
 
+        if manifest is not None:
+            enriched_log_manifest.mark_consumed()
+
     except Exception as e:
         print(f"Error in post_fan_update task: {e}")
 
@@ -648,6 +675,9 @@ async def on_ready():
     """Runs once when the bot successfully connects to Discord."""
     print(f'Success! {bot.user} is online and ready.')
     print('------')
+    # Open the async database pool up front so the first command doesn't pay for it
+    if await async_database.get_pool() is None:
+        print("WARNING: Could not open the async database pool. Market commands will fail until it is available.")
     # --- FIX: Start both tasks ---
     if not update_ranks_task.is_running():
         print("Starting scheduled rank update task...")
@@ -667,6 +697,8 @@ async def on_command_completion(ctx):
 
 
 # --- Scheduled Task for Rank Updates ---
+role_reconciler = RoleReconciler()
+
 @tasks.loop(minutes=60)
 async def update_ranks_task():
     """Periodically checks and updates member roles based on their prestige rank."""
@@ -677,83 +709,134 @@ async def update_ranks_task():
         print("`user_registrations.csv` not found. Skipping rank update until users have registered.")
         return
 
-    guild = bot.guilds[0]
-    if not guild:
+    if not bot.guilds:
         print("Bot is not connected to any server.")
         return
 
     try:
         registrations_df = pd.read_csv(USER_REGISTRATIONS_CSV)
-        enriched_df = pd.read_csv(ENRICHED_FAN_LOG_CSV)
-        all_prestige_roles = get_all_prestige_roles(guild)
+        snapshot = await enriched_log.load()
     except FileNotFoundError as e:
         print(f"Error loading data for rank update: {e}")
         return
 
-    # Convert timestamp to datetime for correct sorting
-    enriched_df['timestamp'] = pd.to_datetime(enriched_df['timestamp'])
-    # Find the latest entry for each player from the enriched log
-    latest_stats = enriched_df.loc[enriched_df.groupby('inGameName')['timestamp'].idxmax()]
-        
-    registrations_df.rename(columns={'inGameName': 'inGameName'}, inplace=True)
-    merged_df = pd.merge(latest_stats, registrations_df, on='inGameName')
+    # The latest entry for each player from the enriched log
+    latest_stats = snapshot.latest_per_member.reset_index(drop=True)
 
-    for _, player_data in merged_df.iterrows():
-        member = guild.get_member(player_data['discord_id'])
-        if not member:
-            print(f"Could not find member with ID: {player_data['discord_id']}")
-            continue
-
-        # --- FIX: Check if bot has permission to manage the user's roles ---
-        # The bot's highest role must be higher than the member's highest role.
-        if member.top_role >= guild.me.top_role:
-            print(f"Cannot manage roles for {member.name} because their role is higher than or equal to mine. Skipping.")
+    for guild in bot.guilds:
+        all_prestige_roles = get_all_prestige_roles(guild)
+        if not all_prestige_roles:
             continue
-        # --- END FIX ---
 
-        correct_rank_name = player_data['prestigeRank']
-        correct_role = all_prestige_roles.get(correct_rank_name)
-        if not correct_role: continue
-
-        member_prestige_roles = [role for role in member.roles if role.name in all_prestige_roles]
-        
-        if correct_role not in member.roles:
-            await member.add_roles(correct_role)
-            print(f"Promoted {member.name} to {correct_role.name}")
-            promo_channel = discord.utils.get(guild.channels, name=PROMOTION_CHANNEL_NAME)
-            if promo_channel:
-                await promo_channel.send(f"🎉 **RANK UP!** Congratulations {member.mention}, you have achieved the rank of **{correct_role.name}**! ")
-
-        for old_role in member_prestige_roles:
-            if old_role != correct_role:
-                await member.remove_roles(old_role)
+        desired = role_reconciler.desired_ranks(latest_stats, registrations_df, all_prestige_roles)
+        promo_channel = discord.utils.get(guild.channels, name=PROMOTION_CHANNEL_NAME)
+        report = await role_reconciler.reconcile(guild, desired, all_prestige_roles, promo_channel)
+        print(report)
 
 # --- NEW BACKGROUND TASK FOR ANNOUNCEMENTS ---
-@tasks.loop(minutes=20) # Checks every 20 minutes
-async def check_for_announcements():
-    # This line ensures the task doesn't run until the bot is fully ready
-    await bot.wait_until_ready()
-    
-    announcement_file = "announcements.txt"
-    # Check if the file exists and is not empty
-    if os.path.exists(announcement_file) and os.path.getsize(announcement_file) > 0:
-        print("Found announcements to send...") # Added for logging
-        # We found messages to send
-        with open(announcement_file, "r+") as f:
-            messages = f.readlines()
-            f.truncate(0) # Clear the file immediately after reading
-
-        # Get the guild (server) object
+LEGACY_ANNOUNCEMENTS_FILE = "announcements.txt"
+announcement_listener_conn = None
+announcement_delivery_lock = asyncio.Lock()
+announcement_delivery_tasks = set()  # Strong references, so a running delivery isn't garbage-collected
+
+def chunk_messages(messages, limit=1900):
+    """Joins messages into as few Discord-sized (<2000 char) posts as possible."""
+    chunk = ""
+    for message in messages:
+        if chunk and len(chunk) + len(message) + 2 > limit:
+            yield chunk
+            chunk = ""
+        chunk = f"{chunk}\n\n{message}" if chunk else message
+    if chunk:
+        yield chunk
+
+def requeue_legacy_announcements(rows):
+    """Puts undelivered file-based announcements back so the next pass retries them."""
+    messages = [row['message'] for row in rows if row['announcement_id'] is None]
+    if messages:
+        with open(LEGACY_ANNOUNCEMENTS_FILE, "a") as f:
+            f.writelines(message + "\n" for message in messages)
+
+def drain_legacy_announcements():
+    """
+    Reads messages written to announcements.txt when the database was unreachable.
+    The file is renamed before reading, so a concurrent writer starts a fresh file instead of racing a truncate.
+    """
+    if not os.path.exists(LEGACY_ANNOUNCEMENTS_FILE) or os.path.getsize(LEGACY_ANNOUNCEMENTS_FILE) == 0:
+        return []
+    draining_file = LEGACY_ANNOUNCEMENTS_FILE + ".sending"
+    os.replace(LEGACY_ANNOUNCEMENTS_FILE, draining_file)
+    with open(draining_file, "r") as f:
+        messages = [line.strip() for line in f if line.strip()]
+    os.remove(draining_file)
+    return messages
+
+async def deliver_announcements():
+    """Sends every pending announcement in batched posts, then acknowledges them."""
+    async with announcement_delivery_lock:
         if not bot.guilds:
             print("ERROR: Bot is not connected to any guilds. Cannot send announcement.")
             return
         guild = bot.guilds[0]
 
-        for message in messages:
-            message = message.strip() # Remove any leading/trailing whitespace
-            if message: # Ensure we don't send empty lines
-                print(f"Sending announcement from file: {message}")
-                await send_to_fan_exchange(guild, message)
+        pending = await async_database.get_pending_announcements()
+        legacy_messages = drain_legacy_announcements()
+        if not pending and not legacy_messages:
+            return
+
+        by_channel = {}
+        for row in pending:
+            by_channel.setdefault(row['channel_name'], []).append(row)
+        if legacy_messages:
+            by_channel.setdefault(FAN_EXCHANGE_CHANNEL_NAME, []).extend({'announcement_id': None, 'message': m} for m in legacy_messages)
+
+        for channel_name, rows in by_channel.items():
+            channel = discord.utils.get(guild.channels, name=channel_name)
+            if not channel:
+                print(f"ERROR: Could not find the #{channel_name} channel. Leaving {len(rows)} announcement(s) queued.")
+                requeue_legacy_announcements(rows)
+                continue
+            print(f"Sending {len(rows)} announcement(s) to #{channel_name}")
+            try:
+                for chunk in chunk_messages([row['message'] for row in rows]):
+                    await channel.send(chunk)
+            except discord.HTTPException as e:
+                print(f"Failed to send announcements to #{channel_name}: {e}")
+                requeue_legacy_announcements(rows)
+                continue
+            await async_database.ack_announcements([row['announcement_id'] for row in rows if row['announcement_id'] is not None])
+
+def _announcement_delivery_done(task):
+    announcement_delivery_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Error delivering announcements after NOTIFY, the next pass will retry: {task.exception()!r}")
+
+def schedule_announcement_delivery():
+    """Called by the LISTEN connection on every NOTIFY; runs a delivery pass as a tracked task."""
+    task = bot.loop.create_task(deliver_announcements())
+    announcement_delivery_tasks.add(task)
+    task.add_done_callback(_announcement_delivery_done)
+
+@tasks.loop(minutes=5) # Safety net; NOTIFY normally triggers delivery immediately
+async def check_for_announcements():
+    global announcement_listener_conn
+    # This line ensures the task doesn't run until the bot is fully ready
+    await bot.wait_until_ready()
+
+    # A database error must not stop the loop: tasks.loop would not restart it, and the LISTEN
+    # connection is only ever re-attached from here
+    try:
+        # (Re)attach the LISTEN connection if it has never been opened or was dropped
+        if announcement_listener_conn is None or announcement_listener_conn.is_closed():
+            await async_database.ensure_announcement_queue()
+            announcement_listener_conn = await async_database.listen_for_announcements(schedule_announcement_delivery)
+
+        await deliver_announcements()
+    except Exception as e:
+        print(f"Error checking for announcements, retrying next pass: {e}")
+        if announcement_listener_conn is not None and not announcement_listener_conn.is_closed():
+            announcement_listener_conn.terminate()
+        announcement_listener_conn = None
 
 # --- Bot Commands ---
 
@@ -805,10 +888,15 @@ async def register(ctx, *, inGameName: str):
 
 # This defines a global 30-minute cooldown for the /refresh command
 cooldown = commands.CooldownMapping.from_cooldown(1, 1800, commands.BucketType.guild)
+refresh_manager = RefreshJobManager('full_run_once')
 
 @bot.command(name="refresh")
 async def refresh(ctx):
     """Triggers a manual refresh of all club and market data."""
+    if refresh_manager.is_running():
+        job = refresh_manager.current_job
+        return await ctx.send(f"A refresh requested by **{job.requested_by}** is already running:\n{job.progress_text()}", ephemeral=True)
+
     bucket = cooldown.get_bucket(ctx.message)
     retry_after = bucket.update_rate_limit()
     if retry_after:
@@ -826,19 +914,25 @@ async def refresh(ctx):
             await owner.send(f"Hey! {ctx.author.name} tried to run a manual refresh, but it's disabled in the config.")
         return await ctx.send("Manual refresh is currently disabled by the admin.", ephemeral=True)
 
-    await ctx.send("🔄 Manual data refresh initiated... This should take about a minute.")
+    status_message = await ctx.send("🔄 Manual data refresh initiated...")
+
+    async def show_progress(job):
+        try:
+            await status_message.edit(content=f"🔄 Manual data refresh in progress...\n{job.progress_text()}")
+        except discord.HTTPException as e:
+            print(f"Could not update refresh progress message: {e}")
 
     try:
-        # --- CORRECTED LOGIC ---
-        # Use Popen to run the script in the background without blocking the bot.
-        # We run the 'full_run' sequence once and then exit.
-        process = subprocess.Popen(['python', 'race_day_scheduler.py', 'full_run_once'])
-        # Give the script time to run. You may need to adjust this value.
-        await asyncio.sleep(120) 
-
-        # Now we can send the completion message.
-        await ctx.send("✅ Data refresh complete! The market has been updated.")
-        
+        job = await refresh_manager.run(ctx.author.name, on_progress=show_progress)
+    except RefreshAlreadyRunning as e:
+        return await status_message.edit(content=f"A refresh requested by **{e.job.requested_by}** is already running.")
+    except Exception as e:
+        job = None
+        error_output = str(e)
+
+    if job and job.succeeded:
+        await status_message.edit(content=f"✅ Data refresh complete! The market has been updated.\n{job.progress_text()}")
+
         # Check for the flag file to see if a new event was triggered
         event_flag_file = 'market/new_event.txt'
         if os.path.exists(event_flag_file):
@@ -847,13 +941,27 @@ async def refresh(ctx):
             if new_event_name:
                 await announce_event(new_event_name)
             os.remove(event_flag_file)
+        return
 
-    except Exception as e:
-        await ctx.send("❌ An error occurred during the data refresh. The admin has been notified.")
-        owner = await bot.fetch_user(config.get("OWNER_DISCORD_ID"))
-        if owner:
-            error_message = f"**CRITICAL ERROR in `/refresh` triggered by {ctx.author.name}:**\n```\n{e}\n```"
-            await owner.send(error_message[:1990])
+    if job and job.cancelled and not job.error_output:
+        return await status_message.edit(content=f"🛑 Data refresh was cancelled.\n{job.progress_text()}")
+
+    progress = f"\n{job.progress_text()}" if job else ""
+    await status_message.edit(content=f"❌ An error occurred during the data refresh. The admin has been notified.{progress}")
+    owner = await bot.fetch_user(config.get("OWNER_DISCORD_ID"))
+    if owner:
+        details = job.error_output if job else error_output
+        error_message = f"**CRITICAL ERROR in `/refresh` triggered by {ctx.author.name}:**\n```\n{details}\n```"
+        await owner.send(error_message[:1990])
+
+@bot.command(name="cancel_refresh")
+@commands.check(is_admin)
+async def cancel_refresh(ctx):
+    """(Admin Only) Cancels the refresh that is currently running."""
+    if await refresh_manager.cancel():
+        await ctx.send("🛑 Cancelling the running data refresh...", ephemeral=True)
+    else:
+        await ctx.send("There is no data refresh running.", ephemeral=True)
 
 
 @bot.command(name="exchange_help")
@@ -910,14 +1018,14 @@ async def myprogress(ctx):
     
     try:
         ranks_df = pd.read_csv(RANKS_CSV)
-        enriched_df = pd.read_csv(ENRICHED_FAN_LOG_CSV)
-        enriched_df['timestamp'] = pd.to_datetime(enriched_df['timestamp'])
+        snapshot = await enriched_log.load()
+        enriched_df = snapshot.df
         progress_df = pd.read_csv(PROGRESS_LOG_CSV) if os.path.exists(PROGRESS_LOG_CSV) else pd.DataFrame(columns=['discord_id', 'last_checked_timestamp'])
     except FileNotFoundError as e:
         await ctx.send(f"Missing a data file (`{e.filename}`). Please run the analysis.", ephemeral=True)
         return
 
-    user_analysis_df = enriched_df[enriched_df['inGameName'] == inGameName].sort_values('timestamp')
+    user_analysis_df = snapshot.rows_for(inGameName)
     if user_analysis_df.empty:
         await ctx.send("I couldn't find any analysis data for you yet.", ephemeral=True)
         return
@@ -984,7 +1092,7 @@ async def myprogress(ctx):
 @bot.command()
 async def prestige_leaderboard(ctx):
     """Posts the prestige_leaderboard.png chart."""
-    timestamp_str = get_last_update_timestamp()
+    timestamp_str = await get_last_update_timestamp()
     message = f"{ctx.author.mention} here is the Prestige Leaderboard!"
     file_path = os.path.join(OUTPUT_DIR, 'prestige_leaderboard.png')
     await send_to_scoreboard(ctx, message, file_path)
@@ -992,7 +1100,7 @@ async def prestige_leaderboard(ctx):
 @bot.command()
 async def top10(ctx):
     """Posts the monthly_leaderboard.png chart."""
-    timestamp_str = get_last_update_timestamp()
+    timestamp_str = await get_last_update_timestamp()
     message = f"{ctx.author.mention} here is the Top 10 Monthly Fan Gain chart!"
     file_path = os.path.join(OUTPUT_DIR, 'monthly_leaderboard.png')
     await send_to_scoreboard(ctx, message, file_path)
@@ -1000,7 +1108,7 @@ async def top10(ctx):
 @bot.command()
 async def alltime_top10(ctx):
     """Posts the alltime_leaderboard.png chart."""
-    timestamp_str = get_last_update_timestamp()
+    timestamp_str = await get_last_update_timestamp()
     message = f"{ctx.author.mention} here is the Top 10 All-Time Fan Gain chart!"
     file_path = os.path.join(OUTPUT_DIR, 'alltime_leaderboard.png')
     await send_to_scoreboard(ctx, message, file_path)
@@ -1008,7 +1116,7 @@ async def alltime_top10(ctx):
 @bot.command()
 async def performance(ctx):
     """Posts the fan_performance_heatmap.png chart."""
-    timestamp_str = get_last_update_timestamp()
+    timestamp_str = await get_last_update_timestamp()
     message = f"{ctx.author.mention} here is the historical performance heatmap!"
     file_path = os.path.join(OUTPUT_DIR, 'fan_performance_heatmap.png')
     await send_to_scoreboard(ctx, message, file_path)
@@ -1016,7 +1124,7 @@ async def performance(ctx):
 @bot.command()
 async def log(ctx, *, name: str):
     """Finds and posts the cumulative log for a specific member."""
-    timestamp_str = get_last_update_timestamp()
+    timestamp_str = await get_last_update_timestamp()
     sanitized_input = re.sub(r'[^a-zA-Z0-9]', '', name).lower()
     
     # --- FIX: Look in the correct subdirectory ---
@@ -1044,7 +1152,7 @@ async def log(ctx, *, name: str):
 @bot.command()
 async def livegains(ctx):
     """Posts the 24-hour fan gain log."""
-    timestamp_str = get_last_update_timestamp()
+    timestamp_str = await get_last_update_timestamp()
     message = f"{ctx.author.mention} here is the live fan gain log for the last 6 hours!"
     file_path = os.path.join(OUTPUT_DIR, 'update_log_24hr.png')
     await send_to_scoreboard(ctx, message, file_path)
@@ -1056,18 +1164,20 @@ async def compare(ctx, member1: str, member2: str):
     async def get_member_stats(identifier: str):
         """Helper function to fetch all stats for a single member."""
         # 1. Get basic user details
-        user_details = database.get_user_details_by_identifier(identifier)
+        user_details = await async_database.get_user_details_by_identifier(identifier)
         if not user_details:
             return None, f"Could not find a member or ticker for '{identifier}'."
 
         ingamename = user_details['ingamename']
 
         # 2. Get stock and market details
-        stock_info, _, _ = database.get_stock_details(ingamename)
+        (stock_info, _, _), (market_snapshot, _) = await asyncio.gather(
+            async_database.get_stock_details(ingamename),
+            async_database.get_market_snapshot()
+        )
         if not stock_info:
             return None, f"Could not retrieve stock details for {ingamename}."
 
-        market_snapshot, _ = database.get_market_snapshot()
         if market_snapshot is None:
             return None, "Market snapshot is currently unavailable."
 
@@ -1080,9 +1190,9 @@ async def compare(ctx, member1: str, member2: str):
 
         # 3. Get prestige details from CSV
         try:
-            enriched_df = pd.read_csv(ENRICHED_FAN_LOG_CSV)
-            enriched_df['timestamp'] = pd.to_datetime(enriched_df['timestamp'])
-            latest_stats = enriched_df.loc[enriched_df[enriched_df['inGameName'] == ingamename]['timestamp'].idxmax()]
+            latest_stats = (await enriched_log.load()).latest_for(ingamename)
+            if latest_stats is None:
+                raise KeyError(ingamename)
             monthly_prestige = latest_stats['monthlyPrestige']
             lifetime_prestige = latest_stats['lifetimePrestige']
         except (FileNotFoundError, KeyError, ValueError):
@@ -1100,13 +1210,15 @@ async def compare(ctx, member1: str, member2: str):
         }
         return stats, None
 
-    # Fetch stats for both members
-    stats1, error1 = await get_member_stats(member1)
+    # Fetch stats for both members concurrently
+    (stats1, error1), (stats2, error2) = await asyncio.gather(
+        get_member_stats(member1),
+        get_member_stats(member2)
+    )
     if error1:
         await ctx.send(error1, ephemeral=True)
         return
 
-    stats2, error2 = await get_member_stats(member2)
     if error2:
         await ctx.send(error2, ephemeral=True)
         return
@@ -1173,12 +1285,12 @@ async def gift_cc(ctx, member: str, amount: int):
     if amount <= 0:
         return await ctx.send("You must gift a positive amount of CC.", ephemeral=True)
 
-    sender_details = database.get_user_details(sender_id)
+    sender_details = await async_database.get_user_details(sender_id)
     if not sender_details:
          return await ctx.send("Could not find your user account. Are you registered?", ephemeral=True)
     sender_name = sender_details['ingamename']
 
-    receiver_details = database.get_user_details_by_identifier(member)
+    receiver_details = await async_database.get_user_details_by_identifier(member)
     if not receiver_details:
         return await ctx.send(f"Could not find a member or ticker for '{member}'.", ephemeral=True)
 
@@ -1238,7 +1350,7 @@ async def gift_cc(ctx, member: str, amount: int):
 
     # 4. Execute Transaction
     if view.confirmed:
-        new_balance = database.execute_gift_transaction(
+        new_balance = await async_database.execute_gift_transaction(
             sender_id=sender_id,
             sender_name=sender_name,
             receiver_id=receiver_id,
@@ -1276,7 +1388,7 @@ async def set_ticker(ctx, ticker: str):
 
     # --- REFACTORED: Use database function ---
     # The file lock is no longer needed.
-    success = database.update_user_ticker(inGameName, ticker)
+    success = await async_database.update_user_ticker(inGameName, ticker)
 
     if success:
         embed = discord.Embed(
@@ -1293,7 +1405,7 @@ async def shop(ctx):
     """Displays the Prestige Shop with available items and your upgrade tiers."""
     user_id = str(ctx.author.id)
 
-    shop_data = database.get_shop_data(user_id)
+    shop_data = await async_database.get_shop_data(user_id)
     if not shop_data:
         return await ctx.send("Could not retrieve your account data. Are you registered?", ephemeral=True)
 
@@ -1359,7 +1471,7 @@ async def buy(ctx, item_id: str):
     if not item_details:
         return await ctx.send("Invalid item ID. Use `/shop` to see available items.", ephemeral=True)
     
-    shop_data = database.get_shop_data(user_id)
+    shop_data = await async_database.get_shop_data(user_id)
     if not shop_data:
         return await ctx.send("Could not retrieve your account data.", ephemeral=True)
 
@@ -1387,7 +1499,7 @@ async def buy(ctx, item_id: str):
         return await ctx.send(f"You need {format_cc(cost)} but only have {format_cc(balance)}.", ephemeral=True)
     
     # --- Database Transaction for CC Deduction ---
-    new_balance = database.execute_purchase_transaction(
+    new_balance = await async_database.execute_purchase_transaction(
         actor_id=user_id, 
         item_name=item_details['name'], 
         cost=cost, 
@@ -1398,7 +1510,7 @@ async def buy(ctx, item_id: str):
         # --- LOGIC FOR PRESTIGE ---
         if item_details['type'] == 'prestige':
             # Instead of updating the CSV, we now log the purchase to our new ledger table.
-            log_success = database.log_prestige_purchase(user_id, item_details['amount'])
+            log_success = await async_database.log_prestige_purchase(user_id, item_details['amount'])
             if not log_success:
                 # This is a critical error state. The user paid but didn't get credit.
                 # Needs manual admin intervention.
@@ -1419,13 +1531,16 @@ async def portfolio(ctx):
     inGameName = get_inGameName(user_id)
 
     # --- 1. Data Fetching and Calculations (Unchanged) ---
-    balance = database.get_user_balance_by_discord_id(user_id)
+    balance = await async_database.get_user_balance_by_discord_id(user_id)
     if balance is None:
         return await ctx.send("You do not have a Fan Exchange account yet.", ephemeral=True)
 
-    portfolio_df = database.get_portfolio_details(user_id)
-    market_snapshot, _ = database.get_market_snapshot()
-    sponsorships_list = database.get_sponsorships(user_id)
+    # These three queries are independent, so they run concurrently on the pool
+    portfolio_df, (market_snapshot, _), sponsorships_list = await asyncio.gather(
+        async_database.get_portfolio_details(user_id),
+        async_database.get_market_snapshot(),
+        async_database.get_sponsorships(user_id)
+    )
 
     total_stock_value = 0
     total_day_change = 0
@@ -1533,7 +1648,7 @@ async def portfolio(ctx):
 @bot.command(name="market")
 async def market(ctx):
     """Displays a comprehensive overview of the stock market with pagination."""
-    market_df, volume_24h = database.get_market_snapshot()
+    market_df, volume_24h = await async_database.get_market_snapshot()
     if market_df is None or market_df.empty:
         return await ctx.send("Market is currently closed or has insufficient data.", ephemeral=True)
 
@@ -1620,7 +1735,7 @@ async def market(ctx):
 @bot.command(name="stock")
 async def stock(ctx, *, identifier: str):
     """Displays detailed information and a price chart for a given stock with 24h, 7d, and all-time views."""
-    stock_info, history_df, top_holders_df = database.get_stock_details(identifier)
+    stock_info, history_df, top_holders_df = await async_database.get_stock_details(identifier)
     
     if not stock_info:
         return await ctx.send(f"Could not find a stock for '{identifier}'.", ephemeral=True)
@@ -1652,7 +1767,7 @@ async def stock(ctx, *, identifier: str):
     price_change_24h = current_price - price_24h
     percent_change_24h = (price_change_24h / price_24h) * 100 if price_24h > 0 else 0
 
-    market_snapshot, _ = database.get_market_snapshot()
+    market_snapshot, _ = await async_database.get_market_snapshot()
     market_cap = 0
     if market_snapshot is not None:
         stock_market_info = market_snapshot[market_snapshot['ingamename'] == ingamename]
@@ -1682,7 +1797,7 @@ async def stock(ctx, *, identifier: str):
     holders_text += "```"
     embed.add_field(name="🏆 Top 5 Shareholders", value=holders_text, inline=False)
     
-    user_portfolio = database.get_portfolio_details(str(ctx.author.id))
+    user_portfolio = await async_database.get_portfolio_details(str(ctx.author.id))
     user_holding = user_portfolio[user_portfolio['stock_ingamename'] == ingamename]
     if not user_holding.empty:
         shares_owned = float(user_holding['shares_owned'].iloc[0])
@@ -1761,7 +1876,7 @@ async def financial_summary(ctx):
     # --- FIX: Registration check is now performed against the database ---
     # This aligns the command's behavior with /portfolio and other core
     # market functions, using the database as the single source of truth.
-    user_details = database.get_user_details(user_id)
+    user_details = await async_database.get_user_details(user_id)
     if not user_details:
         await ctx.send("You do not have a Fan Exchange account. Please use `/register` first.", ephemeral=True)
         return
@@ -1957,7 +2072,7 @@ async def earnings(ctx, days: int = 7):
         await ctx.send("Please choose a valid period: 7 or 30 days.", ephemeral=True)
         return
 
-    user_details = database.get_user_details(user_id)
+    user_details = await async_database.get_user_details(user_id)
     if not user_details:
         await ctx.send("You do not have a Fan Exchange account.", ephemeral=True)
         return
@@ -2029,7 +2144,7 @@ async def ledger(ctx):
     """
     user_id = str(ctx.author.id)
 
-    user_details = database.get_user_details(user_id)
+    user_details = await async_database.get_user_details(user_id)
     if not user_details:
         await ctx.send("You do not have a Fan Exchange account.", ephemeral=True)
         return
@@ -2388,16 +2503,16 @@ async def invest(ctx, identifier: str, shares_str: str):
     user_id = str(ctx.author.id)
     
     # 1. Get Data
-    stock = database.get_stock_by_ticker_or_name(identifier)
+    stock = await async_database.get_stock_by_ticker_or_name(identifier)
     if not stock:
         return await ctx.send(f"Could not find a stock for '{identifier}'.", ephemeral=True)
 
-    balance = database.get_user_balance_by_discord_id(user_id)
+    balance = await async_database.get_user_balance_by_discord_id(user_id)
     if balance is None:
         return await ctx.send("You do not have a Fan Exchange account.", ephemeral=True)
 
     # 2. Calculate Trade Details
-    market_state_df = pd.DataFrame(database.get_market_data_from_db()['market_state'])
+    market_state_df = pd.DataFrame((await async_database.get_market_data_from_db())['market_state'])
     active_event = ""
     if not market_state_df.empty:
         market_state = market_state_df.set_index('state_name')['state_value']
@@ -2427,7 +2542,7 @@ async def invest(ctx, identifier: str, shares_str: str):
     )
     embed.description = details
     # Get the discord_id of the person whose stock is being bought
-    target_id = database.get_discord_id_by_name(stock['ingamename'])
+    target_id = await async_database.get_discord_id_by_name(stock['ingamename'])
 
     trade_details = {
         'actor_id': user_id,
@@ -2446,7 +2561,7 @@ async def invest(ctx, identifier: str, shares_str: str):
 
     # 4. Execute Trade if Confirmed
     if view.confirmed:
-        new_balance = database.execute_trade_transaction(**view.trade_details)
+        new_balance = await async_database.execute_trade_transaction(**view.trade_details)
         if new_balance is not None:
             await ctx.send(f"✅ **Trade Executed!** You purchased {shares_to_buy:,.2f} shares of **{stock['ingamename']}**. Your new balance is {format_cc(new_balance)}.", ephemeral=True)
         else:
@@ -2459,11 +2574,11 @@ async def sell(ctx, identifier: str, shares_str: str):
     user_id = str(ctx.author.id)
 
     # --- 1. Get Stock and Portfolio Data ---
-    stock = database.get_stock_by_ticker_or_name(identifier)
+    stock = await async_database.get_stock_by_ticker_or_name(identifier)
     if not stock:
         return await ctx.send(f"Could not find a stock for '{identifier}'.", ephemeral=True)
 
-    portfolio = database.get_portfolio_details(user_id)
+    portfolio = await async_database.get_portfolio_details(user_id)
     user_holding = portfolio[portfolio['stock_ingamename'] == stock['ingamename']]
     
     if user_holding.empty:
@@ -2488,13 +2603,13 @@ async def sell(ctx, identifier: str, shares_str: str):
         return await ctx.send(f"Insufficient shares. You are trying to sell {shares_to_sell:,.4f} but you only own {shares_owned:,.4f} of **{stock['ingamename']}**.", ephemeral=True)
 
     # --- 4. Calculate Trade Details ---
-    market_state_df = pd.DataFrame(database.get_market_data_from_db()['market_state'])
+    market_state_df = pd.DataFrame((await async_database.get_market_data_from_db())['market_state'])
     active_event = ""
     if not market_state_df.empty:
         market_state = market_state_df.set_index('state_name')['state_value']
         active_event = str(market_state.get('active_event', 'None'))
     
-    balance = database.get_user_balance_by_discord_id(user_id)
+    balance = await async_database.get_user_balance_by_discord_id(user_id)
     current_price = float(stock['current_price'])
     subtotal = shares_to_sell * current_price
     sell_tax_rate = 0.50 if active_event == "The Grand Derby" else 0.03
@@ -2516,7 +2631,7 @@ async def sell(ctx, identifier: str, shares_str: str):
     )
     embed.description = details
     
-    target_id = database.get_discord_id_by_name(stock['ingamename'])
+    target_id = await async_database.get_discord_id_by_name(stock['ingamename'])
 
     trade_details = {
         'actor_id': user_id,
@@ -2536,7 +2651,7 @@ async def sell(ctx, identifier: str, shares_str: str):
     # --- 6. Execute Trade if Confirmed ---
     if view.confirmed:
         # This calls the robust, fixed function in database.py
-        new_balance = database.execute_trade_transaction(**view.trade_details)
+        new_balance = await async_database.execute_trade_transaction(**view.trade_details)
         if new_balance is not None:
             await ctx.send(f"✅ **Trade Executed!** You sold {shares_to_sell:,.4f} shares of **{stock['ingamename']}**. Your new balance is {format_cc(new_balance)}.", ephemeral=True)
         else:
@@ -2548,7 +2663,7 @@ async def derby_leaderboard(ctx):
     """Displays the live leaderboard for the current Grand Derby event."""
     
     # Check if an event is actually active
-    market_state_df = pd.DataFrame(database.get_market_data_from_db()['market_state'])
+    market_state_df = pd.DataFrame((await async_database.get_market_data_from_db())['market_state'])
     if not market_state_df.empty:
         market_state = market_state_df.set_index('state_name')['state_value']
         active_event = str(market_state.get('active_event', 'None'))
@@ -2633,8 +2748,8 @@ async def event_start(ctx, hours: int):
         return
         
     # --- Set Event State in Database ---
-    database.update_market_state_value('active_event', 'The Grand Derby')
-    success = database.update_market_state_value('event_end_timestamp', formatted_end_time)
+    await async_database.update_market_state_value('active_event', 'The Grand Derby')
+    success = await async_database.update_market_state_value('event_end_timestamp', formatted_end_time)
 
     if success:
         discord_timestamp = f"<t:{int(end_time.timestamp())}:R>"
@@ -2663,8 +2778,8 @@ async def event_start(ctx, hours: int):
 @commands.check(is_admin)
 async def event_stop(ctx):
     """(Admin Only) Stops the Grand Derby immediately."""
-    database.update_market_state_value('active_event', 'None')
-    success = database.update_market_state_value('event_end_timestamp', 'None')
+    await async_database.update_market_state_value('active_event', 'None')
+    success = await async_database.update_market_state_value('event_end_timestamp', 'None')
 
     if success:
         await ctx.send("Successfully stopped the active event. The market will return to normal on the next analysis cycle.")
@@ -2727,7 +2842,7 @@ class HigherLowerView(discord.ui.View):
         }
 
         # Execute the database transaction to deduct the bet
-        new_balance = database.execute_gambling_transaction(
+        new_balance = await async_database.execute_gambling_transaction(
             str(self.author.id), "Higher or Lower", self.bet_amount, winnings, details
         )
         
@@ -2769,7 +2884,7 @@ class HigherLowerView(discord.ui.View):
             "net_cc": net_change,
         }
 
-        new_balance = database.execute_gambling_transaction(
+        new_balance = await async_database.execute_gambling_transaction(
             str(self.author.id), "Higher or Lower", self.bet_amount, winnings, details
         )
         
@@ -2806,9 +2921,9 @@ async def higherlower(ctx, bet: int):
     # --- START OF NEW BET LIMIT LOGIC ---
 
     # 1. Get the two potential maximums
-    house_balance = database.get_house_balance()
+    house_balance = await async_database.get_house_balance()
     house_max_bet = max(1000, int(house_balance * 0.35))
-    player_personal_limit = database.get_player_betting_limit(user_id)
+    player_personal_limit = await async_database.get_player_betting_limit(user_id)
 
     # 2. The true max bet is the LOWER of the two limits
     max_bet = min(house_max_bet, player_personal_limit)
@@ -2824,7 +2939,7 @@ async def higherlower(ctx, bet: int):
 
     # 2. Perform a PRELIMINARY balance check for good user experience.
     # The final, secure check happens in the database transaction.
-    balance = database.get_user_balance_by_discord_id(user_id)
+    balance = await async_database.get_user_balance_by_discord_id(user_id)
     if balance is None or balance < bet:
         await ctx.send(f"You don't have enough CC to make that bet. Your balance is {format_cc(balance)}.", ephemeral=True)
         higherlower.reset_cooldown(ctx) # Reset cooldown on a failed check
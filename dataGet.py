@@ -1,69 +1,113 @@
-import pyautogui
 import pytesseract
 import time
+import argparse
+import numpy as np
 import pandas as pd
 from PIL import Image, ImageEnhance, ImageFilter
 import os
+import re
 import cv2
+import queue
+import threading
 import csv
+import json
 import pytz
 from datetime import datetime
-from guiNavigationFunctions import clickClub, clickClubMenu, clickClubInfo, clickClubMemberArea, scrollDown, clickHome, clickClubMenuClose, clickClubInfoClose, harmlessClick
+from concurrent.futures import ThreadPoolExecutor
+from fan_log_store import FanLogStore
 
-pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+# Tesseract lives at a fixed path on the Windows capture machine; elsewhere (e.g. a Linux
+# replay box) it is expected on PATH, or at TESSERACT_CMD if set.
+if os.environ.get('TESSERACT_CMD'):
+    pytesseract.pytesseract.tesseract_cmd = os.environ['TESSERACT_CMD']
+elif os.name == 'nt':
+    pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
 # --- Configuration ---
 screenshots_folder = os.path.join("dataGet","data","rawScreenShots")
 cropped_screenshots_folder = os.path.join("dataGet","data","croppedFanCounts")
 templates_dir = "dataGet/imgToFind/clubMembers"
+crop_index_file = os.path.join("dataGet","data","crop_index.csv")  # (timestamp, inGameName) -> crop filename, read by validate_data.py
 
 
-# list of members in order they appear in the club info page, used to load club member images and find their coordinates
-clubMembers = [
-    "CashBaggins",
-    # "Top",
-    "WaveofGratitude",
-    "GhostlyInsomnia",
-    "Kino",
-    "Claimses",
-    "d",
-    "Yuto",
-    "Dill Dough",
-    "Pygums",
-    "Eunoia",
-    "Ray",
-    "Epidemic",
-    "Gearras",
-    "SmillBisser",
-    # "StarLight",
-    # "cinciol",
-    "Iyy",
-    "Walzy",
-    "Keyevin",
-    "gumgum",
-    "Twice",
-    "Ermereas",
-    "Maslow",
-    "Trainer#3487",
-    "Wither",
-    "AO",
-    "s",
-    "Kurumi",
-    "Kei",
-    "Nice",
-    "g",
-]
-clubMemberTemplateImageFileNames = [os.path.join(templates_dir, f"clubMember{name}.png") for name in clubMembers]
+members_csv = "members.csv"
+member_bands_file = os.path.join("dataGet","data","member_bands.json")
+
+def load_club_members(path=members_csv):
+    """Active members in the order they appear on the club info page (members.csv clubInfoOrder)."""
+    members_df = pd.read_csv(path)
+    active = members_df[members_df['status'] == 'Active'].sort_values('clubInfoOrder')
+    return active['inGameName'].tolist()
 
 # sequence of scrolls; we get two club members per screenshot, so we need 15 screenshots to get all 30 members.
 # each number in the list is how many scroll ticks to do before taking the next screenshot.
 scrollsBeforePic = [0,6,5,6,5,
                     6,6,5,6,6,
                     5,6,6,5,5]
+MEMBERS_PER_SCREENSHOT = 2
 
 # the relevant png of the top left of the club member's stat box is at dataGet/imgToFind/clubMembers/ and is named f"clubMember{member}.png"
 # the following fan coordinates are RELATIVE to top left of club members stats box we'll find.
 fanCoordinates = (341, 71, 545, 114) #left,top,right,bottom
+MATCH_THRESHOLD = 0.8
+
+# Template matching runs in grayscale, first on a downscaled copy (PYRAMID_SCALE) and then at
+# full size in a small window around the coarse hit. Once a shot's members have been found,
+# later scans only search that shot's vertical band (plus BAND_MARGIN) instead of the whole frame.
+PYRAMID_SCALE = 0.5
+REFINE_MARGIN = 6
+BAND_MARGIN = 80
+
+# OCR runs on in-memory crops; writing raw screenshots and crops to disk (for replay and
+# validate_data.py's error images) happens on a background thread and can be switched off.
+ARCHIVE_IMAGES = True
+OCR_CONFIG = '--psm 6 outputbase digits'
+
+# Each tesseract call is its own process, so a thread pool runs them side by side and a
+# scan waits only for its slowest crop. Reads below LOW_CONFIDENCE (0-100) get flagged.
+OCR_WORKERS = min(8, os.cpu_count() or 1)
+LOW_CONFIDENCE = 80
+
+# OCR backends: "glyph" reads digits with the built-in classifier (learned from archived crops
+# with --learn-glyphs) and hands anything it isn't sure of to tesseract; "tesseract" always uses tesseract.
+OCR_BACKEND = "glyph"
+digit_glyphs_file = os.path.join("dataGet","data","digit_glyphs.npz")
+GLYPH_SIZE = (12, 20)           # width, height every glyph is normalized to
+GLYPH_MIN_CONFIDENCE = 60       # below this (0-100) on any digit, the crop goes to tesseract
+GLYPH_MAX_DISTANCE = 0.25       # mean pixel disagreement beyond which a glyph matches nothing
+CROP_FILENAME_PATTERN = re.compile(r"^(\d+)_(\d{12})_(.+)_fans\.png$")
+
+# Raw screenshots are named f"{YYYYmmddHHMM}_{scan_id:04d}_{shot:02d}.png"
+RAW_SCREENSHOT_PATTERN = re.compile(r"^(\d{12})_(\d{4})_(\d{2})\.png$")
+FAN_LOG_FIELDS = ["timestamp", "inGameName", "fanCount"]
+
+class StageTimer:
+    """Accumulates wall-clock time per pipeline stage, so scans can be profiled stage by stage."""
+    def __init__(self):
+        self.seconds = {}
+        self.calls = {}
+        self._lock = threading.Lock()  # Stages run on the capture thread and the pipeline worker
+
+    def time(self, stage):
+        timer = self
+        class _Stage:
+            def __enter__(self):
+                self.start = time.perf_counter()
+            def __exit__(self, *exc):
+                with timer._lock:
+                    timer.seconds[stage] = timer.seconds.get(stage, 0.0) + time.perf_counter() - self.start
+                    timer.calls[stage] = timer.calls.get(stage, 0) + 1
+        return _Stage()
+
+    def report(self, scans=1, wall_seconds=None):
+        """wall_seconds overrides the sum of stage times, which double counts stages that overlap (a pipelined live scan)."""
+        total = wall_seconds if wall_seconds is not None else sum(self.seconds.values())
+        print("\n--- Stage Timings ---")
+        for stage, seconds in self.seconds.items():
+            print(f"  - {stage:<8} {seconds:8.2f}s total | {seconds / max(scans, 1) * 1000:8.1f} ms/scan | {self.calls[stage]} calls")
+        if total > 0:
+            basis = "wall clock" if wall_seconds is not None else "sum of stage times"
+            print(f"  - {scans} scan(s) in {total:.2f}s ({scans / total * 60:.1f} scans/minute, {basis})")
 
 def save_scan_id_to_csv(scan_id):
     with open("dataGet/data/scan_id.csv", mode="w", newline='') as file:
@@ -89,165 +133,618 @@ def preprocess_image(image):
     image = image.resize([2 * s for s in image.size], Image.Resampling.LANCZOS)
     return image
 
-def extract_data_from_png(image_path):
-    """Uses OCR to extract numeric text from a preprocessed image."""
+def preprocess_array(crop):
+    """
+    preprocess_image() for a BGR crop held in memory: grayscale, contrast x2 around the
+    mean (as ImageEnhance.Contrast does), binarize at 128, then upscale 2x.
+    """
+    return cv2.resize(binarize_array(crop), None, fx=2, fy=2, interpolation=cv2.INTER_LANCZOS4)
+
+def binarize_array(crop):
+    """The grayscale/contrast/threshold part of preprocess_array(), at the crop's own size."""
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    mean = int(gray.mean() + 0.5)
+    contrasted = np.clip(mean + 2 * (gray.astype(np.int16) - mean), 0, 255)
+    return np.where(contrasted > 128, 255, 0).astype(np.uint8)
+
+def tesseract_read(crop, label=""):
+    """
+    Uses tesseract to extract numeric text from an in-memory crop.
+    Returns (fan_count, confidence), where confidence is tesseract's lowest word confidence (0-100).
+    """
     try:
-        image = Image.open(image_path)
-        preprocessed_image = preprocess_image(image)
-        config = '--psm 6 outputbase digits'
-        text = pytesseract.image_to_string(preprocessed_image, config=config).strip()
-        fan_count = ''.join(filter(str.isdigit, text))
-        return fan_count
+        data = pytesseract.image_to_data(preprocess_array(crop), config=OCR_CONFIG, output_type=pytesseract.Output.DICT)
+        words = [(text, float(conf)) for text, conf in zip(data['text'], data['conf']) if text.strip() and float(conf) >= 0]
+        fan_count = ''.join(filter(str.isdigit, ''.join(text for text, _ in words)))
+        confidence = min(conf for _, conf in words) if words else 0.0
+        return fan_count, confidence
     except Exception as e:
-        print(f"  - Error during OCR for {os.path.basename(image_path)}: {e}")
+        print(f"  - Error during OCR for {label}: {e}")
+        return None, 0.0
+
+class GlyphClassifier:
+    """
+    Reads the fixed-font fan-count digits without tesseract. A binarized crop is split into
+    glyphs by connected components (separators like commas are dropped for being short), each
+    glyph is scaled to GLYPH_SIZE and matched to the nearest of ten digit templates.
+    The templates are the per-digit median of glyphs cut from archived crops whose fan_log
+    value is known, so they match the game's font exactly.
+    """
+    def __init__(self, templates=None):
+        self.templates = templates  # (10, h * w) floats in [0, 1], row d is digit d
+
+    @staticmethod
+    def segment(binary):
+        """Returns the crop's glyphs, left to right, as GLYPH_SIZE float arrays."""
+        border = np.concatenate([binary[0], binary[-1], binary[:, 0], binary[:, -1]])
+        ink = (binary < 128) if border.mean() > 127 else (binary >= 128)  # Digits are whichever colour the border isn't
+        count, _, stats, _ = cv2.connectedComponentsWithStats(ink.astype(np.uint8), connectivity=8)
+        boxes = [stats[i, :4] for i in range(1, count) if stats[i, cv2.CC_STAT_AREA] >= 4]
+        if not boxes:
+            return []
+        tallest = max(h for _, _, _, h in boxes)
+        boxes = sorted(([x, y, x + w, y + h] for x, y, w, h in boxes if h >= 0.6 * tallest), key=lambda box: box[0])
+
+        merged = []  # Pieces of one digit (a broken stroke) overlap horizontally
+        for box in boxes:
+            if merged and box[0] < merged[-1][2]:
+                last = merged[-1]
+                merged[-1] = [last[0], min(last[1], box[1]), max(last[2], box[2]), max(last[3], box[3])]
+            else:
+                merged.append(box)
+
+        glyphs = []
+        for x0, y0, x1, y1 in merged:
+            glyph = ink[y0:y1, x0:x1].astype(np.float32)
+            glyphs.append(cv2.resize(glyph, GLYPH_SIZE, interpolation=cv2.INTER_AREA))
+        return glyphs
+
+    def classify(self, glyphs):
+        """Returns (digits, per-glyph confidences 0-100) for already segmented glyphs."""
+        if not glyphs:
+            return "", []
+        flat = np.stack(glyphs).reshape(len(glyphs), -1)
+        distances = np.abs(flat[:, None, :] - self.templates[None, :, :]).mean(axis=2)
+        order = np.argsort(distances, axis=1)
+        best = distances[np.arange(len(glyphs)), order[:, 0]]
+        second = distances[np.arange(len(glyphs)), order[:, 1]]
+        # Confidence is how decisively the best digit beat the runner-up, zero if it matched nothing well
+        confidences = np.where(best <= GLYPH_MAX_DISTANCE, 100 * (1 - best / np.maximum(second, 1e-6)), 0.0)
+        return ''.join(str(d) for d in order[:, 0]), confidences.tolist()
+
+    def read(self, crop):
+        return self.classify(self.segment(binarize_array(crop)))
+
+    def save(self, path=digit_glyphs_file):
+        np.savez_compressed(path, templates=self.templates, glyph_size=np.array(GLYPH_SIZE))
+
+    @classmethod
+    def load(cls, path=digit_glyphs_file):
+        """Returns the saved classifier, or None if there isn't one (or it was learned at another GLYPH_SIZE)."""
+        try:
+            saved = np.load(path)
+        except (FileNotFoundError, OSError):
+            return None
+        if tuple(saved['glyph_size']) != GLYPH_SIZE:
+            print(f"  - WARNING: {path} was learned at a different glyph size, ignoring it")
+            return None
+        return cls(saved['templates'])
+
+    @classmethod
+    def learn(cls, crops_dir=cropped_screenshots_folder, fan_log='fan_log.csv', error_log='data_validation_errors.csv'):
+        """
+        Builds the digit templates from archived crops. A crop is used only when its fan_log value is
+        known, wasn't flagged by validate_data.py, and it segments into exactly that many glyphs.
+        """
+        log = pd.read_csv(fan_log, dtype=str)
+        log['fanCount'] = log['fanCount'].str.replace(r'\D', '', regex=True)
+        known = log.drop_duplicates(['timestamp', 'inGameName'], keep='last').set_index(['timestamp', 'inGameName'])['fanCount']
+        flagged = set()
+        if os.path.isfile(error_log):
+            flagged = {re.split(r'[\\/]', path)[-1] for path in pd.read_csv(error_log, dtype=str)['sourceImageFile'].dropna()}
+
+        samples = {digit: [] for digit in range(10)}
+        used = skipped = 0
+        for entry in os.scandir(crops_dir):
+            match = CROP_FILENAME_PATTERN.match(entry.name)
+            if not match or entry.name in flagged:
+                continue
+            _, filename_timestamp, member = match.groups()
+            display_timestamp = datetime.strptime(filename_timestamp, "%Y%m%d%H%M").strftime("%Y/%m/%d %H:%M")
+            fan_count = known.get((display_timestamp, member))
+            crop = cv2.imread(entry.path, cv2.IMREAD_COLOR)
+            if not fan_count or crop is None:
+                continue
+            glyphs = cls.segment(binarize_array(crop))
+            if len(glyphs) != len(fan_count):
+                skipped += 1
+                continue
+            for digit, glyph in zip(fan_count, glyphs):
+                samples[int(digit)].append(glyph.reshape(-1))
+            used += 1
+
+        missing = [digit for digit, glyphs in samples.items() if not glyphs]
+        print(f"  - Learned glyphs from {used} crop(s), skipped {skipped} that didn't segment cleanly")
+        if missing:
+            print(f"  - WARNING: No examples of digit(s) {missing}; can't build a classifier yet")
+            return None
+        return cls(np.stack([np.median(np.stack(samples[digit]), axis=0) for digit in range(10)]))
+
+_glyph_classifier = None
+
+def get_glyph_classifier():
+    """The saved classifier, loaded once per run."""
+    global _glyph_classifier
+    if _glyph_classifier is None:
+        _glyph_classifier = GlyphClassifier.load() or False
+        if not _glyph_classifier:
+            print(f"  - No digit glyphs at {digit_glyphs_file} (run with --learn-glyphs), using tesseract only")
+    return _glyph_classifier or None
+
+def extract_data_from_array(crop, label=""):
+    """
+    Uses the configured OCR backend to extract numeric text from an in-memory crop.
+    Returns (fan_count, confidence, engine). The glyph backend falls back to tesseract
+    when any digit is below GLYPH_MIN_CONFIDENCE.
+    """
+    if OCR_BACKEND == "glyph":
+        classifier = get_glyph_classifier()
+        if classifier:
+            digits, confidences = classifier.read(crop)
+            if digits and min(confidences) >= GLYPH_MIN_CONFIDENCE:
+                return digits, min(confidences), "glyph"
+    return (*tesseract_read(crop, label), "tesseract")
+
+def extract_data_from_png(image_path):
+    """Uses OCR to extract numeric text from a preprocessed image."""
+    crop = cv2.imread(image_path, cv2.IMREAD_COLOR)
+    if crop is None:
+        print(f"  - Error during OCR for {os.path.basename(image_path)}: could not read image")
         return None
+    return extract_data_from_array(crop, os.path.basename(image_path))[0]
+
+class ImageArchiver:
+    """
+    Writes raw screenshots and fan-count crops to disk on a single background thread, so
+    PNG encoding never sits between capture and OCR. close() waits for pending writes and
+    adds the saved crops to the crop index.
+    """
+    def __init__(self, screenshots_dir=screenshots_folder, crops_dir=cropped_screenshots_folder, index_file=crop_index_file):
+        self.screenshots_dir = screenshots_dir
+        self.crops_dir = crops_dir
+        self.index_file = index_file
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="archiver")
+        self._pending = []
+        self._crops = []
+
+    def _write(self, path, image):
+        if not cv2.imwrite(path, image):
+            print(f"  - WARNING: Could not archive {path}")
+            return False
+        return True
+
+    def save_screenshot(self, screenshot, scan_id, filename_timestamp, shot):
+        path = os.path.join(self.screenshots_dir, f"{filename_timestamp}_{scan_id:04d}_{shot:02d}.png")
+        self._pending.append(self._executor.submit(self._write, path, screenshot))
+        return path
+
+    def save_crop(self, crop, scan_id, filename_timestamp, member):
+        # Crops are views into the screenshot; copy so the write doesn't depend on it staying alive
+        filename = f"{scan_id}_{filename_timestamp}_{member}_fans.png"
+        future = self._executor.submit(self._write, os.path.join(self.crops_dir, filename), crop.copy())
+        self._pending.append(future)
+        self._crops.append((filename_timestamp, member, filename, future))
+        return os.path.join(self.crops_dir, filename)
+
+    def close(self):
+        for future in self._pending:
+            future.result()
+        self._executor.shutdown()
+        print(f"  - Archived {len(self._pending)} image(s)")
+
+        saved = [(ts, member, filename) for ts, member, filename, future in self._crops if future.result()]
+        if saved and self.index_file:
+            file_exists = os.path.isfile(self.index_file)
+            with open(self.index_file, 'a', newline='') as f:
+                writer = csv.writer(f)
+                if not file_exists:
+                    writer.writerow(["timestamp", "inGameName", "filename"])
+                writer.writerows(saved)
+
+class TemplateCache:
+    """Every member's stat-box template, read once and kept as grayscale at full and coarse scale."""
+    def __init__(self, member_names, directory=templates_dir, scale=PYRAMID_SCALE):
+        self.scale = scale
+        self.templates = {}
+        for member in member_names:
+            template = cv2.imread(os.path.join(directory, f"clubMember{member}.png"), cv2.IMREAD_GRAYSCALE)
+            if template is None:
+                print(f"  - WARNING: No template image for {member}")
+                continue
+            self.templates[member] = (template, cv2.resize(template, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA))
+
+    def get(self, member):
+        return self.templates.get(member)
+
+class MemberBands:
+    """
+    Where on screen each shot's members turned up, so the next scan can search just that band.
+    The scroll schedule fixes where a shot lands, so bands are only reused while scrollsBeforePic is unchanged.
+    """
+    def __init__(self, path=member_bands_file):
+        self.path = path
+        self.bands = {}
+        if not path:
+            return
+        try:
+            with open(path, 'r') as f:
+                saved = json.load(f)
+            if saved.get('scrollsBeforePic') == scrollsBeforePic:
+                self.bands = {int(shot): band for shot, band in saved['bands'].items()}
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            pass
+
+    def band_for(self, shot_index):
+        return self.bands.get(shot_index)
+
+    def record(self, shot_index, top, bottom):
+        band = self.bands.get(shot_index)
+        self.bands[shot_index] = [min(band[0], top), max(band[1], bottom)] if band else [top, bottom]
 
-# --- Main Script Workflow ---
-
-# 1. Navigate to the Club Member Screen
-print("--- 1. Navigating to Club Member Screen ---")
-# In case we're in a weird state (day restart), do a 12x harmless click first
-# harmlessClick()
-# harmlessClick()
-# harmlessClick()
-# harmlessClick()
-# harmlessClick()
-# harmlessClick()
-# harmlessClick()
-# harmlessClick()
-# harmlessClick()
-# harmlessClick()
-# ##############
-# harmlessClick()
-# harmlessClick()
-# harmlessClick()
-# harmlessClick()
-# harmlessClick()
-# harmlessClick()
-# harmlessClick()
-# harmlessClick()
-# harmlessClick()
-# harmlessClick()
-
-clickClub()
-clickClubMenu()
-clickClubInfo()
-clickClubMemberArea()
-
-# 2. Capture Screenshots
-print("\n--- 2. Capturing Screenshots ---")
-scan_id = load_scan_id_from_csv() + 1
-central = pytz.timezone("America/Chicago")
-now_central = datetime.now(central)
-filename_timestamp = now_central.strftime("%Y%m%d%H%M")
-formatted_display_timestamp = now_central.strftime("%Y/%m/%d %H:%M")
-
-print(f"Scan Time: {formatted_display_timestamp} | Scan ID: {scan_id}")
-
-for i, scrolls in enumerate(scrollsBeforePic):
-    scrollDown(scrolls)
-    screenshot_filename = os.path.join(screenshots_folder, f"{filename_timestamp}_{scan_id:04d}_{i+1:02d}.png")
-    pyautogui.screenshot().save(screenshot_filename)
-    print(f"  - Saved {screenshot_filename}")
-
-save_scan_id_to_csv(scan_id)
-
-# Navigate back to the home page
-clickClubMemberArea()
-clickClubInfoClose()
-clickClubMenuClose()
-clickHome()
-
-# 3. Locate Members and Crop Fan Counts
-print("\n--- 3. Locating Members and Cropping Fan Counts ---")
-raw_screenshot_filenames = sorted([
-    entry.path for entry in os.scandir(screenshots_folder)
-    if entry.is_file() and entry.name.startswith(f"{filename_timestamp}_{scan_id:04d}")
-])
-
-for i, screenshot_filename in enumerate(raw_screenshot_filenames):
-    print(f"Processing screenshot {os.path.basename(screenshot_filename)}...")
+    def save(self):
+        if not self.path:
+            return
+        with open(self.path, 'w') as f:
+            json.dump({'scrollsBeforePic': scrollsBeforePic, 'bands': self.bands}, f)
+
+# --- Pipeline Stages ---
+
+def members_for_screenshot(shot_index, club_members):
+    """The club members expected in the shot_index-th (0-based) screenshot of a scan."""
+    first = shot_index * MEMBERS_PER_SCREENSHOT
+    return club_members[first:first + MEMBERS_PER_SCREENSHOT]
+
+def capture_screenshots(scan_id, filename_timestamp, archiver=None, on_capture=None):
+    """
+    Stage 1 (capture): drives the game UI and grabs one screenshot per scroll step, kept in
+    memory as BGR arrays (handed to the archiver if one is given). on_capture(shot_index, screenshot)
+    is called as each one is taken, so processing can start while the UI is still scrolling.
+    The GUI libraries are imported here so every other stage runs headless.
+    """
+    import pyautogui
+    from guiNavigationFunctions import clickClub, clickClubMenu, clickClubInfo, clickClubMemberArea, scrollDown, clickHome, clickClubMenuClose, clickClubInfoClose, harmlessClick
+
+    # In case we're in a weird state (day restart), a series of harmlessClick() calls first helps
+    clickClub()
+    clickClubMenu()
+    clickClubInfo()
+    clickClubMemberArea()
+
+    screenshots = []
+    for i, scrolls in enumerate(scrollsBeforePic):
+        scrollDown(scrolls)
+        screenshot = cv2.cvtColor(np.asarray(pyautogui.screenshot()), cv2.COLOR_RGB2BGR)
+        screenshots.append(screenshot)
+        if archiver:
+            archiver.save_screenshot(screenshot, scan_id, filename_timestamp, i + 1)
+        if on_capture:
+            on_capture(i, screenshot)
+        print(f"  - Captured screenshot {i+1}/{len(scrollsBeforePic)}")
+
+    # Navigate back to the home page
+    clickClubMemberArea()
+    clickClubInfoClose()
+    clickClubMenuClose()
+    clickHome()
+    return screenshots
+
+def load_screenshot(screenshot_filename):
     screenshot = cv2.imread(screenshot_filename)
-    screenshot = cv2.cvtColor(screenshot, cv2.COLOR_BGRA2BGR) if screenshot.shape[2] == 4 else screenshot
-    
-    # Each screenshot can contain two members
-    member_index1 = i * 2
-    member_index2 = i * 2 + 1
-
-    # Process first member
-    if member_index1 < len(clubMembers):
-        template_image = cv2.imread(clubMemberTemplateImageFileNames[member_index1], cv2.IMREAD_COLOR)
-        template_image = cv2.cvtColor(template_image, cv2.COLOR_BGRA2BGR) if template_image.shape[2] == 4 else template_image
-
-        result = cv2.matchTemplate(screenshot, template_image, cv2.TM_CCOEFF_NORMED)
-        _, max_val, _, max_loc = cv2.minMaxLoc(result)
-
-        if max_val >= 0.8:
-            top_left = max_loc
-            fan_box = (top_left[0] + fanCoordinates[0], top_left[1] + fanCoordinates[1], 
-                       top_left[0] + fanCoordinates[2], top_left[1] + fanCoordinates[3])
-            cropped = screenshot[fan_box[1]:fan_box[3], fan_box[0]:fan_box[2]]
-            cropped_pil = Image.fromarray(cv2.cvtColor(cropped, cv2.COLOR_BGR2RGB))
-            cropped_filename = os.path.join(cropped_screenshots_folder, f"{scan_id}_{filename_timestamp}_{clubMembers[member_index1]}_fans.png")
-            cropped_pil.save(cropped_filename)
-            print(f"  - Cropped fan count for {clubMembers[member_index1]}")
-
-    # Process second member
-    if member_index2 < len(clubMembers):
-        template_image = cv2.imread(clubMemberTemplateImageFileNames[member_index2], cv2.IMREAD_COLOR)
-        template_image = cv2.cvtColor(template_image, cv2.COLOR_BGRA2BGR) if template_image.shape[2] == 4 else template_image
-
-        result = cv2.matchTemplate(screenshot, template_image, cv2.TM_CCOEFF_NORMED)
-        _, max_val, _, max_loc = cv2.minMaxLoc(result)
-
-        if max_val >= 0.8:
-            top_left = max_loc
-            fan_box = (top_left[0] + fanCoordinates[0], top_left[1] + fanCoordinates[1], 
-                       top_left[0] + fanCoordinates[2], top_left[1] + fanCoordinates[3])
-            cropped = screenshot[fan_box[1]:fan_box[3], fan_box[0]:fan_box[2]]
-            cropped_pil = Image.fromarray(cv2.cvtColor(cropped, cv2.COLOR_BGR2RGB))
-            cropped_filename = os.path.join(cropped_screenshots_folder, f"{scan_id}_{filename_timestamp}_{clubMembers[member_index2]}_fans.png")
-            cropped_pil.save(cropped_filename)
-            print(f"  - Cropped fan count for {clubMembers[member_index2]}")
-
-# 4. Extract Data and Append to fan_log.csv
-print("\n--- 4. Extracting Data and Appending to Log ---")
-cropped_files = [
-    entry.path for entry in os.scandir(cropped_screenshots_folder)
-    if entry.is_file() and entry.name.startswith(f"{scan_id}_{filename_timestamp}")
-]
-
-new_log_entries = []
-for file_path in cropped_files:
-    filename = os.path.basename(file_path)
-    try:
-        member_name = filename.split('_')[2]
-        fan_count = extract_data_from_png(file_path)
+    return cv2.cvtColor(screenshot, cv2.COLOR_BGRA2BGR) if screenshot.shape[2] == 4 else screenshot
+
+def _match_pyramid(region, region_coarse, template, template_coarse, scale):
+    """Coarse match on the downscaled region, refined at full size. Returns ((x, y), score) within region."""
+    if template_coarse.shape[0] > region_coarse.shape[0] or template_coarse.shape[1] > region_coarse.shape[1]:
+        return None, -1.0
+    _, _, _, coarse_loc = cv2.minMaxLoc(cv2.matchTemplate(region_coarse, template_coarse, cv2.TM_CCOEFF_NORMED))
+
+    h, w = template.shape
+    x0 = max(0, int(coarse_loc[0] / scale) - REFINE_MARGIN)
+    y0 = max(0, int(coarse_loc[1] / scale) - REFINE_MARGIN)
+    window = region[y0:y0 + h + 2 * REFINE_MARGIN, x0:x0 + w + 2 * REFINE_MARGIN]
+    if window.shape[0] < h or window.shape[1] < w:
+        return None, -1.0
+    _, max_val, _, max_loc = cv2.minMaxLoc(cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED))
+    return (x0 + max_loc[0], y0 + max_loc[1]), max_val
+
+def _search(gray, top, bottom, members, templates, scale):
+    """Matches each member inside rows [top, bottom) of the screenshot. Returns {member: ((x, y), score)}."""
+    region = gray[top:bottom]
+    region_coarse = cv2.resize(region, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    found = {}
+    for member in members:
+        template, template_coarse = templates.get(member)
+        loc, score = _match_pyramid(region, region_coarse, template, template_coarse, scale)
+        if loc is not None:
+            found[member] = ((loc[0], loc[1] + top), score)
+    return found
+
+def locate_members(screenshot_gray, member_names, templates, band=None):
+    """
+    Stage 2 (locate): finds each member's stat box in a grayscale screenshot. Searches the given
+    (top, bottom) band first and falls back to the whole frame for anyone not found there.
+    Returns {member: (x, y) of its top-left corner}.
+    """
+    members = [member for member in member_names if templates.get(member) is not None]  # TemplateCache already warned about the rest
+
+    height = screenshot_gray.shape[0]
+    matches = {}
+    if band:
+        matches = _search(screenshot_gray, max(0, band[0] - BAND_MARGIN), min(height, band[1] + BAND_MARGIN), members, templates, templates.scale)
+    missing = [member for member in members if matches.get(member, (None, -1.0))[1] < MATCH_THRESHOLD]
+    if missing:
+        if band:
+            print(f"  - {', '.join(missing)} not in the expected band, searching the full frame")
+        matches.update(_search(screenshot_gray, 0, height, missing, templates, templates.scale))
+    return {member: loc for member, (loc, score) in matches.items() if score >= MATCH_THRESHOLD}
+
+def crop_fan_counts(screenshot, locations, scan_id, filename_timestamp, archiver=None):
+    """Stage 3 (crop): slices each located member's fan count out of the screenshot. Returns {member: crop array}."""
+    crops = {}
+    for member, top_left in locations.items():
+        fan_box = (top_left[0] + fanCoordinates[0], top_left[1] + fanCoordinates[1],
+                   top_left[0] + fanCoordinates[2], top_left[1] + fanCoordinates[3])
+        crops[member] = screenshot[fan_box[1]:fan_box[3], fan_box[0]:fan_box[2]]
+        if archiver:
+            archiver.save_crop(crops[member], scan_id, filename_timestamp, member)
+        print(f"  - Cropped fan count for {member}")
+    return crops
+
+def start_ocr(crops, executor):
+    """Stage 4 (OCR), first half: queues every crop on the OCR pool. Returns [(member, future)]."""
+    return [(member, executor.submit(extract_data_from_array, crop, member)) for member, crop in crops.items()]
+
+def collect_ocr(pending, display_timestamp, timer):
+    """
+    Stage 4 (OCR), second half: waits for the reads, timed as 'ocr'. Returns fan_log rows for the
+    crops that produced a number, in crop order, each with the read's `confidence`.
+    """
+    new_log_entries = []
+    for member_name, future in pending:
+        with timer.time('ocr'):
+            fan_count, confidence, engine = future.result()
         if fan_count:
             new_log_entries.append({
-                "timestamp": formatted_display_timestamp,
+                "timestamp": display_timestamp,
                 "inGameName": member_name,
-                "fanCount": fan_count
+                "fanCount": fan_count,
+                "confidence": confidence
             })
-            print(f"  - Extracted {fan_count} for {member_name}")
+            flag = " (LOW CONFIDENCE)" if confidence < LOW_CONFIDENCE else ""
+            print(f"  - Extracted {fan_count} for {member_name} [{engine} {confidence:.0f}%]{flag}")
         else:
             print(f"  - WARNING: Failed to extract fan count for {member_name}")
-    except IndexError:
-        print(f"  - WARNING: Could not parse member name from filename: {filename}")
+    return new_log_entries
 
-if new_log_entries:
-    output_filename = 'fan_log.csv'
-    fieldnames = ["timestamp", "inGameName", "fanCount"]
+def append_to_fan_log(new_log_entries, output_filename='fan_log.csv'):
+    """
+    Stage 5 (append): adds the scan's rows to the fan log, writing the header for a new file,
+    and to its binary sidecar if that was up to date (otherwise the next reader rebuilds it).
+    """
+    if not new_log_entries:
+        print("\n--- No new fan counts to log. ---")
+        return
     file_exists = os.path.isfile(output_filename)
-
+    store = FanLogStore(output_filename)
+    sidecar_in_sync = store.in_sync()
     try:
         with open(output_filename, 'a', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer = csv.DictWriter(f, fieldnames=FAN_LOG_FIELDS, extrasaction='ignore')
             if not file_exists:
                 writer.writeheader()
             writer.writerows(new_log_entries)
         print(f"\n--- SUCCESS added {len(new_log_entries)} new entries to {output_filename}! ---")
     except Exception as e:
         print(f"\n--- ERROR writing to {output_filename}: {e} ---")
-else:
-    print("\n--- No new fan counts to log. ---")
+        return
+    if sidecar_in_sync:
+        try:
+            store.append(new_log_entries)
+        except Exception as e:
+            print(f"  - WARNING: Could not append to {store.path}, it will be rebuilt on next read: {e}")
+
+class ScanPipeline:
+    """
+    Producer/consumer processing for one scan. The capture side calls submit() with each
+    screenshot as soon as it exists; a worker thread locates and crops it right away and queues
+    its crops on the OCR pool, so all of that overlaps the GUI's scroll waits. finish() waits for
+    the stragglers and returns the scan's fan_log rows in shot order.
+    """
+    def __init__(self, scan_id, filename_timestamp, display_timestamp, timer, archiver=None, club_members=None, templates=None, bands=None):
+        self.scan_id = scan_id
+        self.filename_timestamp = filename_timestamp
+        self.display_timestamp = display_timestamp
+        self.timer = timer
+        self.archiver = archiver
+        self.club_members = club_members if club_members is not None else load_club_members()
+        if templates is None:
+            with timer.time('templates'):
+                templates = TemplateCache(self.club_members)
+        self.templates = templates
+        self.bands = bands or MemberBands(path=None)
+
+        self._queue = queue.Queue()
+        self._pending_ocr = []
+        self._ocr_executor = ThreadPoolExecutor(max_workers=max(1, OCR_WORKERS), thread_name_prefix="ocr")
+        self._worker = threading.Thread(target=self._run, name="scan-pipeline", daemon=True)
+        self._worker.start()
+
+    def submit(self, shot_index, screenshot):
+        """Hands over a screenshot (BGR array, or a path to one on disk) for processing."""
+        self._queue.put((shot_index, screenshot))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            shot_index, screenshot = item
+            try:
+                self._process(shot_index, screenshot)
+            except Exception as e:
+                # One bad screenshot shouldn't cost the rest of the scan
+                print(f"  - ERROR processing screenshot {shot_index + 1}: {e}")
+
+    def _process(self, shot_index, screenshot):
+        if isinstance(screenshot, str):
+            print(f"Processing screenshot {os.path.basename(screenshot)}...")
+            with self.timer.time('load'):
+                screenshot = load_screenshot(screenshot)
+        else:
+            print(f"Processing screenshot {shot_index + 1}...")
+        with self.timer.time('locate'):
+            screenshot_gray = cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY)
+            locations = locate_members(screenshot_gray, members_for_screenshot(shot_index, self.club_members), self.templates, self.bands.band_for(shot_index))
+            for member, (x, y) in locations.items():
+                self.bands.record(shot_index, y, y + self.templates.get(member)[0].shape[0])
+        with self.timer.time('crop'):
+            crops = crop_fan_counts(screenshot, locations, self.scan_id, self.filename_timestamp, self.archiver)
+        self._pending_ocr.extend(start_ocr(crops, self._ocr_executor))
+
+    def finish(self):
+        """
+        Waits for every submitted screenshot ('drain': the worker's locate/crop backlog) and then
+        for its OCR ('ocr'). Returns the scan's fan_log rows.
+        """
+        with self.timer.time('drain'):
+            self._queue.put(None)
+            self._worker.join()
+        rows = collect_ocr(self._pending_ocr, self.display_timestamp, self.timer)
+        self._ocr_executor.shutdown()
+        return rows
+
+def process_scan(screenshots, scan_id, filename_timestamp, display_timestamp, timer, archiver=None, club_members=None, templates=None, bands=None):
+    """
+    Runs locate -> crop -> OCR over one scan's screenshots (in shot order). Each screenshot is
+    a BGR array, or a path to one on disk (replay). Returns its fan_log rows.
+    """
+    pipeline = ScanPipeline(scan_id, filename_timestamp, display_timestamp, timer, archiver, club_members, templates, bands)
+    for i, screenshot in enumerate(screenshots):
+        pipeline.submit(i, screenshot)
+    return pipeline.finish()
+
+# --- Entry Points ---
+
+def run_live_scan(archive_images=ARCHIVE_IMAGES):
+    """Captures a fresh scan from the game and appends it to fan_log.csv."""
+    timer = StageTimer()
+    scan_start = time.perf_counter()
+    archiver = ImageArchiver() if archive_images else None
+
+    # 1. Navigate to the Club Member Screen and 2. Capture Screenshots
+    print("--- 1. Navigating to Club Member Screen and Capturing Screenshots ---")
+    scan_id = load_scan_id_from_csv() + 1
+    central = pytz.timezone("America/Chicago")
+    now_central = datetime.now(central)
+    filename_timestamp = now_central.strftime("%Y%m%d%H%M")
+    formatted_display_timestamp = now_central.strftime("%Y/%m/%d %H:%M")
+    print(f"Scan Time: {formatted_display_timestamp} | Scan ID: {scan_id}")
+
+    # 3. Locate Members, Crop Fan Counts and Extract Data, each screenshot as soon as it's taken
+    bands = MemberBands()
+    pipeline = ScanPipeline(scan_id, filename_timestamp, formatted_display_timestamp, timer, archiver, bands=bands)
+    with timer.time('capture'):
+        capture_screenshots(scan_id, filename_timestamp, archiver, on_capture=pipeline.submit)
+    save_scan_id_to_csv(scan_id)
+
+    print("\n--- 2. Finishing Fan Count Extraction ---")
+    new_log_entries = pipeline.finish()
+    bands.save()
+
+    # 4. Append to fan_log.csv
+    with timer.time('append'):
+        append_to_fan_log(new_log_entries)
+    timer.report(wall_seconds=time.perf_counter() - scan_start)
+
+    # 5. Let the archive writes finish; they never held up the log
+    if archiver:
+        archiver.close()
+
+def find_archived_scans(directory):
+    """Groups archived raw screenshots by scan. Returns [(filename_timestamp, scan_id, [paths in shot order])]."""
+    scans = {}
+    for entry in os.scandir(directory):
+        match = RAW_SCREENSHOT_PATTERN.match(entry.name)
+        if entry.is_file() and match:
+            filename_timestamp, scan_id, shot = match.groups()
+            scans.setdefault((filename_timestamp, int(scan_id)), []).append((int(shot), entry.path))
+    return [(ts, scan_id, [path for _, path in sorted(shots)]) for (ts, scan_id), shots in sorted(scans.items())]
+
+def compare_to_fan_log(replayed_rows, reference_log):
+    """OCR accuracy: the share of replayed rows whose digits match the reference log for that scan and member."""
+    reference = pd.read_csv(reference_log, dtype=str)
+    reference['fanCount'] = reference['fanCount'].str.replace(r'\D', '', regex=True)
+    expected = reference.drop_duplicates(['timestamp', 'inGameName'], keep='last').set_index(['timestamp', 'inGameName'])['fanCount']
+
+    compared = matched = 0
+    for row in replayed_rows:
+        key = (row['timestamp'], row['inGameName'])
+        if key in expected.index:
+            compared += 1
+            matched += expected[key] == row['fanCount']
+    accuracy = matched / compared if compared else float('nan')
+    print(f"\n--- OCR accuracy vs {reference_log}: {matched}/{compared} rows match ({accuracy:.1%}) ---")
+    return accuracy
+
+def replay(directory=screenshots_folder, output_filename='dataGet/data/replay_fan_log.csv', reference_log=None):
+    """
+    Re-runs locate -> crop -> OCR over archived raw screenshots, with no GUI, and appends the
+    rows to output_filename (not the live fan_log.csv by default). Crops stay in memory.
+    """
+    timer = StageTimer()
+    replay_start = time.perf_counter()
+    scans = find_archived_scans(directory)
+    print(f"--- Replaying {len(scans)} archived scan(s) from {directory} ---")
+
+    club_members = load_club_members()
+    with timer.time('templates'):
+        templates = TemplateCache(club_members)
+    bands = MemberBands(path=None)  # Learned from the replayed scans themselves, never saved
+
+    replayed_rows = []
+    for filename_timestamp, scan_id, screenshot_filenames in scans:
+        display_timestamp = datetime.strptime(filename_timestamp, "%Y%m%d%H%M").strftime("%Y/%m/%d %H:%M")
+        print(f"\nScan Time: {display_timestamp} | Scan ID: {scan_id}")
+        rows = process_scan(screenshot_filenames, scan_id, filename_timestamp, display_timestamp, timer, club_members=club_members, templates=templates, bands=bands)
+        with timer.time('append'):
+            append_to_fan_log(rows, output_filename)
+        replayed_rows.extend(rows)
+
+    timer.report(scans=len(scans), wall_seconds=time.perf_counter() - replay_start)
+    if reference_log:
+        compare_to_fan_log(replayed_rows, reference_log)
+    return replayed_rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Capture club fan counts, or replay archived screenshots.")
+    parser.add_argument('--replay', nargs='?', const=screenshots_folder, metavar='DIR',
+                        help="Process archived raw screenshots headlessly instead of capturing new ones.")
+    parser.add_argument('--output', default='dataGet/data/replay_fan_log.csv', help="Where replayed rows are appended.")
+    parser.add_argument('--compare', metavar='FAN_LOG', help="Reference log to measure replayed OCR accuracy against.")
+    parser.add_argument('--no-archive', action='store_true', help="Don't write raw screenshots or crops to disk during a live scan.")
+    parser.add_argument('--ocr-workers', type=int, default=OCR_WORKERS, help="How many crops to OCR at once.")
+    parser.add_argument('--ocr-backend', choices=["glyph", "tesseract"], default=OCR_BACKEND, help="Digit reader to try first.")
+    parser.add_argument('--learn-glyphs', action='store_true', help="Learn the digit glyphs from archived crops and fan_log.csv, then exit.")
+    args = parser.parse_args()
+    OCR_WORKERS = args.ocr_workers
+    OCR_BACKEND = args.ocr_backend
+
+    if args.learn_glyphs:
+        classifier = GlyphClassifier.learn()
+        if classifier:
+            classifier.save()
+            print(f"--- Saved digit glyphs to {digit_glyphs_file} ---")
+    elif args.replay:
+        replay(args.replay, args.output, args.compare)
+    else:
+        run_live_scan(archive_images=not args.no_archive)
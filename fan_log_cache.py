@@ -0,0 +1,145 @@
+import pandas as pd
+import os
+import asyncio
+import threading
+import json
+from functools import cached_property
+
+class FanLogSnapshot:
+    """
+    An immutable, parsed copy of the enriched fan log with pre-indexed views.
+    Views are built lazily on first use and then reused until the file changes.
+    """
+    def __init__(self, df: pd.DataFrame, signature: tuple):
+        self.df = df
+        self.signature = signature
+
+    @property
+    def empty(self):
+        return self.df.empty
+
+    @cached_property
+    def latest_timestamp(self):
+        return self.df['timestamp'].max() if not self.df.empty else None
+
+    @cached_property
+    def latest_per_member(self) -> pd.DataFrame:
+        """The most recent row for every member, indexed by inGameName."""
+        latest = self.df.loc[self.df.groupby('inGameName')['timestamp'].idxmax()]
+        return latest.set_index('inGameName', drop=False)
+
+    @cached_property
+    def rows_by_member(self) -> dict:
+        """inGameName -> that member's rows, sorted by timestamp."""
+        return {name: group for name, group in self.df.groupby('inGameName', sort=False)}
+
+    @cached_property
+    def rows_by_timestamp(self) -> dict:
+        """timestamp -> every member's row from that scan."""
+        return {ts: group for ts, group in self.df.groupby('timestamp', sort=False)}
+
+    def latest_for(self, inGameName: str):
+        """Returns the member's most recent row as a Series, or None."""
+        try:
+            return self.latest_per_member.loc[inGameName]
+        except KeyError:
+            return None
+
+    def rows_for(self, inGameName: str) -> pd.DataFrame:
+        """Returns all of a member's rows (oldest first), or an empty frame."""
+        return self.rows_by_member.get(inGameName, self.df.iloc[0:0])
+
+    def rows_at(self, timestamp) -> pd.DataFrame:
+        """Returns the rows of a single scan, or an empty frame."""
+        return self.rows_by_timestamp.get(timestamp, self.df.iloc[0:0])
+
+
+class FanLogCache:
+    """
+    Process-level cache for enriched_fan_log.csv.
+    analysis.py rewrites the whole file on every run, so the cache re-parses it only when
+    the file's (mtime, size) signature changes; otherwise callers get the same snapshot back.
+    """
+    def __init__(self, path: str, timezone: str = 'US/Central'):
+        self.path = path
+        self.timezone = timezone
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def _signature(self):
+        stat = os.stat(self.path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _parse(self) -> pd.DataFrame:
+        df = pd.read_csv(self.path)
+        # The log mixes -05:00/-06:00 offsets across DST, so parse via UTC to keep a real datetime dtype
+        df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True).dt.tz_convert(self.timezone)
+        return df.sort_values('timestamp', kind='stable').reset_index(drop=True)
+
+    def get(self) -> FanLogSnapshot:
+        """
+        Returns the current snapshot, re-reading the file only if it has changed.
+        Raises FileNotFoundError if the log does not exist.
+        """
+        signature = self._signature()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.signature == signature:
+            return snapshot
+
+        with self._lock:
+            # Another thread may have finished the reload while we waited
+            signature = self._signature()
+            if self._snapshot is None or self._snapshot.signature != signature:
+                self._snapshot = FanLogSnapshot(self._parse(), signature)
+            return self._snapshot
+
+    async def load(self) -> FanLogSnapshot:
+        """Async version of get(); any re-parse happens on a worker thread."""
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.signature == self._signature():
+            return snapshot
+        return await asyncio.to_thread(self.get)
+
+
+class FanLogManifest:
+    """
+    Watches the small JSON manifest analysis.py writes next to the enriched log.
+    check() costs a single stat() when nothing has changed. A change stays pending, and keeps
+    being returned by check(), until the caller has acted on it and calls mark_consumed().
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._loaded_mtime_ns = None
+        self._checked_mtime_ns = None
+        self._consumed_mtime_ns = None
+        self.data = None
+
+    def read(self):
+        """
+        Returns the current manifest dict, re-reading the file only if it changed. Does not
+        consume anything, so it's safe to call from anywhere.
+        Raises FileNotFoundError if analysis.py hasn't written one yet.
+        """
+        mtime_ns = os.stat(self.path).st_mtime_ns
+        if mtime_ns != self._loaded_mtime_ns:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            data['latest_timestamp'] = pd.Timestamp(data['latest_timestamp'])
+            self.data = data
+            self._loaded_mtime_ns = mtime_ns
+        return self.data
+
+    def check(self):
+        """
+        Returns the manifest dict if it changed since the last mark_consumed(), otherwise None.
+        Raises FileNotFoundError if analysis.py hasn't written one yet.
+        """
+        data = self.read()
+        if self._loaded_mtime_ns == self._consumed_mtime_ns:
+            return None
+        self._checked_mtime_ns = self._loaded_mtime_ns
+        return data
+
+    def mark_consumed(self):
+        """Marks the manifest last returned by check() as handled, so check() stops returning it."""
+        self._consumed_mtime_ns = self._checked_mtime_ns
@@ -0,0 +1,208 @@
+import numpy as np
+import pandas as pd
+import os
+import json
+import argparse
+
+FANLOG_CSV = 'fan_log.csv'
+TIMEZONE = 'US/Central'
+
+# Both read paths hand back this resolution, whatever pandas would infer for strings or epoch seconds
+TIMESTAMP_UNIT = 'us'
+
+# One fixed-size record per fan_log.csv row, after a 16-byte header
+RECORD_DTYPE = np.dtype([('timestamp', '<i8'), ('member_id', '<i4'), ('fanCount', '<i8')])
+HEADER = b'FANLOG\x00\x01' + b'\x00' * 8
+
+def parse_fan_log_csv(path: str = FANLOG_CSV, timezone: str = TIMEZONE) -> pd.DataFrame:
+    """
+    Reads fan_log.csv the way every consumer always has: drop blank rows, strip the thousands
+    separators, parse the Central-time timestamps and drop anything that didn't parse.
+    Returns timestamp (tz-aware), inGameName and fanCount (int64) in file order.
+    """
+    df = pd.read_csv(path, dtype={'inGameName': str, 'fanCount': str})
+    df.dropna(subset=['inGameName', 'fanCount'], inplace=True)
+    df['fanCount'] = pd.to_numeric(df['fanCount'].astype(str).str.replace(',', '', regex=False), errors='coerce')
+    df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
+    df.dropna(subset=['fanCount', 'timestamp'], inplace=True)
+    df['fanCount'] = df['fanCount'].astype('int64')
+    df['timestamp'] = df['timestamp'].dt.tz_localize(timezone, ambiguous='infer').dt.as_unit(TIMESTAMP_UNIT)
+    return df[['timestamp', 'inGameName', 'fanCount']].reset_index(drop=True)
+
+
+class FanLogStore:
+    """
+    A normalized, append-only binary copy of fan_log.csv: int64 epoch timestamps, int32 member ids
+    and int64 fan counts, with the id -> inGameName dictionary in a JSON file beside it.
+
+    dataGet.py appends to it right after appending to the CSV, and stamps the CSV's (mtime, size)
+    into the dictionary file. Readers trust the sidecar only while that stamp matches the CSV, so a
+    hand-edited CSV is simply re-parsed and the sidecar rebuilt from it.
+    """
+    def __init__(self, csv_path: str = FANLOG_CSV, timezone: str = TIMEZONE):
+        base, _ = os.path.splitext(csv_path)
+        self.csv_path = csv_path
+        self.path = base + '.bin'
+        self.meta_path = base + '.members.json'
+        self.timezone = timezone
+
+    def _csv_signature(self):
+        stat = os.stat(self.csv_path)
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def _load_meta(self):
+        try:
+            with open(self.meta_path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _save_meta(self, meta):
+        temp_path = self.meta_path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(temp_path, self.meta_path)
+
+    def in_sync(self) -> bool:
+        """True if the sidecar holds exactly what the CSV holds right now."""
+        meta = self._load_meta()
+        return (meta is not None and os.path.exists(self.path) and os.path.exists(self.csv_path)
+                and meta.get('csv_signature') == self._csv_signature())
+
+    def records(self) -> np.ndarray:
+        """Memory-maps the sidecar's records (read-only). A torn trailing record is ignored."""
+        count = (os.path.getsize(self.path) - len(HEADER)) // RECORD_DTYPE.itemsize
+        if count <= 0:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        return np.memmap(self.path, dtype=RECORD_DTYPE, mode='r', offset=len(HEADER), shape=(count,))
+
+    def members(self) -> list:
+        """The member dictionary: member_id is the index into this list."""
+        meta = self._load_meta()
+        return meta['members'] if meta else []
+
+    def to_dataframe(self, categorical: bool = False) -> pd.DataFrame:
+        """
+        The sidecar in the same shape and dtypes as parse_fan_log_csv(). With categorical=True,
+        inGameName comes back as a categorical built straight from the stored member ids, its
+        categories in dictionary (first-seen) order.
+        """
+        records = self.records()
+        member_ids = np.asarray(records['member_id'])
+        if categorical:
+            names = pd.Categorical.from_codes(member_ids, categories=pd.Index(self.members(), dtype=str))
+        else:
+            names = pd.Series(np.array(self.members(), dtype=object)[member_ids] if len(records) else [], dtype=object).astype(str)
+        timestamps = pd.to_datetime(np.asarray(records['timestamp']), unit='s', utc=True)
+        return pd.DataFrame({
+            'timestamp': timestamps.tz_convert(self.timezone).as_unit(TIMESTAMP_UNIT),
+            'inGameName': names,
+            'fanCount': np.asarray(records['fanCount'], dtype='int64'),
+        })
+
+    def _encode(self, df: pd.DataFrame, members: list) -> np.ndarray:
+        """Turns parsed rows into records, adding any new names to `members` in place."""
+        ids = {name: i for i, name in enumerate(members)}
+        for name in df['inGameName']:
+            if name not in ids:
+                ids[name] = len(members)
+                members.append(name)
+        records = np.empty(len(df), dtype=RECORD_DTYPE)
+        records['timestamp'] = (df['timestamp'] - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)
+        records['member_id'] = df['inGameName'].map(ids).to_numpy()
+        records['fanCount'] = df['fanCount'].to_numpy()
+        return records
+
+    def rebuild(self) -> pd.DataFrame:
+        """Re-parses the whole CSV into a fresh sidecar. Returns the parsed rows."""
+        df = parse_fan_log_csv(self.csv_path, self.timezone)
+        members = []
+        records = self._encode(df, members)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(HEADER)
+            f.write(records.tobytes())
+        os.replace(temp_path, self.path)
+        self._save_meta({'members': members, 'csv_signature': self._csv_signature()})
+        return df
+
+    def append(self, rows: list):
+        """
+        Appends rows just written to the CSV (dicts with timestamp '%Y/%m/%d %H:%M', inGameName, fanCount).
+        Only call this if in_sync() was True before the CSV append, otherwise the sidecar would skip rows.
+        """
+        df = pd.DataFrame(rows, columns=['timestamp', 'inGameName', 'fanCount'])
+        df['fanCount'] = pd.to_numeric(df['fanCount'].astype(str).str.replace(',', '', regex=False), errors='coerce')
+        df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
+        df.dropna(subset=['inGameName', 'fanCount', 'timestamp'], inplace=True)
+        df['fanCount'] = df['fanCount'].astype('int64')
+        df['timestamp'] = df['timestamp'].dt.tz_localize(self.timezone, ambiguous='NaT')
+        df.dropna(subset=['timestamp'], inplace=True)  # An ambiguous DST hour can't be placed; the next reader rebuilds
+
+        meta = self._load_meta()
+        members = list(meta['members'])
+        records = self._encode(df, members)
+        if len(members) != len(meta['members']):
+            # New names go in the dictionary before any record points at them
+            self._save_meta({'members': members, 'csv_signature': meta['csv_signature']})
+        with open(self.path, 'ab') as f:
+            f.write(records.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        if len(df) == len(rows):
+            self._save_meta({'members': members, 'csv_signature': self._csv_signature()})
+
+    def verify(self) -> bool:
+        """Checks the sidecar row for row against a fresh parse of the CSV."""
+        expected = parse_fan_log_csv(self.csv_path, self.timezone)
+        actual = self.to_dataframe()
+        if not expected.dtypes.equals(actual.dtypes):
+            print(f"  - MISMATCH in dtypes: {dict(expected.dtypes)} vs {dict(actual.dtypes)}")
+            return False
+        if len(expected) != len(actual):
+            print(f"  - MISMATCH: {self.csv_path} has {len(expected)} rows, {self.path} has {len(actual)}")
+            return False
+        differs = ((expected['timestamp'] != actual['timestamp']) | (expected['inGameName'] != actual['inGameName'])
+                   | (expected['fanCount'] != actual['fanCount']))
+        if differs.any():
+            first = differs.idxmax()
+            print(f"  - MISMATCH on {differs.sum()} row(s), first at row {first}: "
+                  f"{tuple(expected.loc[first])} vs {tuple(actual.loc[first])}")
+            return False
+        print(f"  - {self.path} matches {self.csv_path} ({len(actual)} rows)")
+        return True
+
+
+def read_fan_log(csv_path: str = FANLOG_CSV, timezone: str = TIMEZONE, categorical: bool = False) -> pd.DataFrame:
+    """
+    The parsed fan log (timestamp tz-aware, inGameName, fanCount int64), from the binary sidecar
+    when it is in sync with the CSV, otherwise from the CSV, rebuilding the sidecar on the way.
+    categorical=True returns inGameName as a categorical (see member_registry.py).
+    Raises FileNotFoundError if the CSV doesn't exist.
+    """
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"{csv_path} not found")
+    store = FanLogStore(csv_path, timezone)
+    if store.in_sync():
+        return store.to_dataframe(categorical)
+    try:
+        df = store.rebuild()
+    except OSError as e:
+        print(f"  - WARNING: Could not write fan log sidecar ({e}), reading the CSV directly")
+        df = parse_fan_log_csv(csv_path, timezone)
+    if categorical:
+        # Same category order the sidecar's dictionary would give: first seen in the CSV
+        df['inGameName'] = pd.Categorical(df['inGameName'], categories=pd.unique(df['inGameName']))
+    return df
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or check the binary sidecar for fan_log.csv.")
+    parser.add_argument('--csv', default=FANLOG_CSV)
+    parser.add_argument('--rebuild', action='store_true', help="Rebuild the sidecar from the CSV.")
+    args = parser.parse_args()
+
+    store = FanLogStore(args.csv)
+    if args.rebuild or not store.in_sync():
+        store.rebuild()
+        print(f"--- Rebuilt {store.path} from {args.csv} ---")
+    store.verify()
@@ -3,6 +3,7 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 import pytz
+from fan_log_store import read_fan_log
 
 # --- NEW: Import the function from your main script ---
 from analysis import get_club_month_window
@@ -13,18 +14,13 @@ def generate_stats():
     """
     try:
         members_df = pd.read_csv("Umamusume Pretty Derby_ Cash Crew Fans - members.csv")
-        fanlog_df = pd.read_csv("Umamusume Pretty Derby_ Cash Crew Fans - fanLog.csv")
+        fanlog_df = read_fan_log("Umamusume Pretty Derby_ Cash Crew Fans - fanLog.csv")
     except FileNotFoundError:
         print("Error: Make sure 'members.csv' and 'fanLog.csv' are in the same directory.")
         return
 
-    # --- Data Cleaning and Timezone Handling ---
-    fanlog_df['fanCount'] = pd.to_numeric(fanlog_df['fanCount'].astype(str).str.replace(',', '', regex=False), errors='coerce')
-    fanlog_df['timestamp'] = pd.to_datetime(fanlog_df['timestamp'], errors='coerce')
-    fanlog_df.dropna(subset=['fanCount', 'timestamp'], inplace=True)
-    
+    # --- Timezone Handling (read_fan_log returns cleaned, Central-localized rows) ---
     central_tz = pytz.timezone('US/Central')
-    fanlog_df['timestamp'] = fanlog_df['timestamp'].dt.tz_localize(central_tz)
 
     # --- Calculation Logic ---
     generation_ct = datetime.now(central_tz)
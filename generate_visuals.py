@@ -9,6 +9,7 @@ import pytz
 import matplotlib.patheffects as pe
 import io
 import discord
+from member_registry import MemberRegistry, load_member_registry
 
 OUTPUT_DIR = 'Club_Report_Output'
 
@@ -234,7 +235,7 @@ def generate_prestige_leaderboard(individual_log_df, last_updated_str, generated
     print("  - Generating prestige_leaderboard.png")
 
     # --- 1. Data Preparation ---
-    latest_prestige = individual_log_df.loc[individual_log_df.groupby('inGameName')['timestamp'].idxmax()]
+    latest_prestige = individual_log_df.loc[individual_log_df.groupby('inGameName', observed=True)['timestamp'].idxmax()]
     top_15 = latest_prestige.nlargest(30, 'monthlyPrestige').sort_values('monthlyPrestige', ascending=True)
 
     # --- 2. Custom Color Mapping ---
@@ -670,7 +671,7 @@ def generate_log_image(member_data_df, title, filename, generated_str, limit = 3
     plt.close(fig)
 
 def save_all_member_logs():
-    individual_log_df = pd.read_csv('enriched_fan_log.csv')
+    individual_log_df = load_member_registry().encode(pd.read_csv('enriched_fan_log.csv', dtype={'inGameName': 'category'}))
     
     last_updated_str, generated_str, start_date, end_date = get_report_updated_generated_rankwindow_timestamps()
     
@@ -683,25 +684,25 @@ def save_all_member_logs():
         ]
     
     # Step 1: Group by day and aggregate the raw numbers
-    daily_summary_df = log_data_limited.groupby(['inGameName', 'date']).agg(
+    daily_summary_df = log_data_limited.groupby(['inGameName', 'date'], observed=True).agg(
         dailyFanGain=('fanGain', 'sum'),
         dailyPrestigeGain=('prestigeGain', 'sum'),
         timestamp=('timestamp', 'last')  # Get the last timestamp for the day
     ).reset_index()
 
     # Step 2: Merge the final daily prestige values back in
-    prestige_info = log_data_limited.loc[log_data_limited.groupby(['inGameName', 'date'])['timestamp'].idxmax()][
+    prestige_info = log_data_limited.loc[log_data_limited.groupby(['inGameName', 'date'], observed=True)['timestamp'].idxmax()][
         ['inGameName', 'date', 'monthlyPrestige', 'prestigeRank', 'pointsToNextRank']
     ]
     daily_summary_df = pd.merge(daily_summary_df, prestige_info, on=['inGameName', 'date'], how='left')
 
     # Step 3: Calculate the cumulative "Month's Fans"
     daily_summary_df = daily_summary_df.sort_values(by=['inGameName', 'date'])
-    daily_summary_df['monthlyFanGain'] = daily_summary_df.groupby('inGameName')['dailyFanGain'].cumsum()
+    daily_summary_df['monthlyFanGain'] = daily_summary_df.groupby('inGameName', observed=True)['dailyFanGain'].cumsum()
 
     # Step 4: Calculate daily rank and rank change
     daily_summary_df['rank'] = daily_summary_df.groupby('date')['monthlyFanGain'].rank(method='dense', ascending=False)
-    daily_summary_df['previous_rank'] = daily_summary_df.groupby('inGameName')['rank'].shift(1)
+    daily_summary_df['previous_rank'] = daily_summary_df.groupby('inGameName', observed=True)['rank'].shift(1)
     daily_summary_df['rank_delta'] = daily_summary_df['previous_rank'] - daily_summary_df['rank']
 
     # Step 5: Calculate "Fans to Next Rank"
@@ -730,7 +731,7 @@ def save_all_member_logs():
             print(f"  - Saved log for {safe_member_name}.")
     
 def save_top10():
-    individual_log_df = pd.read_csv('enriched_fan_log.csv')
+    individual_log_df = load_member_registry().encode(pd.read_csv('enriched_fan_log.csv', dtype={'inGameName': 'category'}))
     
     last_updated_str, generated_str, start_date, end_date = get_report_updated_generated_rankwindow_timestamps()
     
@@ -742,9 +743,9 @@ def save_top10():
         (individual_log_df['timestamp'] <= end_date)
         ]
 
-    monthly_summary = log_data_limited.groupby('inGameName')['fanGain'].sum().reset_index()
+    monthly_summary = log_data_limited.groupby('inGameName', observed=True)['fanGain'].sum().reset_index()
     monthly_summary.rename(columns={'fanGain': 'totalMonthlyGain'}, inplace=True)
-    top_10 = monthly_summary.nlargest(10, 'totalMonthlyGain').copy()
+    top_10 = MemberRegistry.decode(monthly_summary.nlargest(10, 'totalMonthlyGain'))
     
     fig, ax = plt.subplots(figsize=(12, 8))
 
@@ -777,9 +778,9 @@ def save_top10():
     plt.close(fig)
     print("  - Saved monthly_leaderboard.png")
     
-    alltime_summary = individual_log_df.groupby('inGameName')['fanGain'].sum().reset_index()
+    alltime_summary = individual_log_df.groupby('inGameName', observed=True)['fanGain'].sum().reset_index()
     alltime_summary.rename(columns={'fanGain': 'allTimeFanGain'}, inplace=True)
-    alltime_top_10 = alltime_summary.nlargest(10, 'allTimeFanGain').copy()
+    alltime_top_10 = MemberRegistry.decode(alltime_summary.nlargest(10, 'allTimeFanGain'))
 
     fig, ax = plt.subplots(figsize=(12, 8))
 
@@ -832,7 +833,7 @@ def create_all_visuals(members_df, summary_df, individual_log_df, club_log_df, c
 
     final_csv_df = pd.merge(individual_log_df, members_df[['inGameName', 'memberID']], on='inGameName', how='left')
 
-    latest_ranks = daily_summary_df.loc[daily_summary_df.groupby('inGameName')['timestamp'].idxmax()][['inGameName', 'rank']]
+    latest_ranks = daily_summary_df.loc[daily_summary_df.groupby('inGameName', observed=True)['timestamp'].idxmax()][['inGameName', 'rank']]
     final_csv_df = pd.merge(final_csv_df, latest_ranks, on='inGameName', how='left')
 
     csv_output_cols = [
@@ -874,11 +875,16 @@ def main():
     try:
         members_df = pd.read_csv('members.csv')
         ranks_df = pd.read_csv('ranks.csv')
-        individual_log_df = pd.read_csv('enriched_fan_log.csv')
+        individual_log_df = pd.read_csv('enriched_fan_log.csv', dtype={'inGameName': 'category'})
         individual_log_df['timestamp'] = pd.to_datetime(individual_log_df['timestamp'])
         # --- FIX: Create the 'date' column for merging ---
         individual_log_df['date'] = individual_log_df['timestamp'].dt.date
 
+        # Members are keyed by shared categorical codes; names are decoded only for charts
+        registry = MemberRegistry.from_members(members_df)
+        registry.encode(individual_log_df)
+        registry.encode(members_df)
+
         print("  - Successfully loaded enriched fan log and supporting files.")
     except FileNotFoundError as e:
         print(f"FATAL ERROR: Missing data file {e}. Cannot generate visuals.")
@@ -894,21 +900,21 @@ def main():
 
 
 
-    daily_summary_df = individual_log_df.groupby(['inGameName', 'date']).agg(
+    daily_summary_df = individual_log_df.groupby(['inGameName', 'date'], observed=True).agg(
         dailyFanGain=('fanGain', 'sum'),
         dailyPrestigeGain=('prestigeGain', 'sum'),
         timestamp=('timestamp', 'last')
     ).reset_index()
-    prestige_info = individual_log_df.loc[individual_log_df.groupby(['inGameName', 'date'])['timestamp'].idxmax()][
+    prestige_info = individual_log_df.loc[individual_log_df.groupby(['inGameName', 'date'], observed=True)['timestamp'].idxmax()][
         ['inGameName', 'date', 'monthlyPrestige', 'prestigeRank', 'pointsToNextRank']
     ]
     daily_summary_df = pd.merge(daily_summary_df, prestige_info, on=['inGameName', 'date'])
 
     daily_summary_df['timestamp'] = pd.to_datetime(daily_summary_df['timestamp']) # Ensure datetime type
     daily_summary_df = daily_summary_df.sort_values(by=['inGameName', 'date'])
-    daily_summary_df['monthlyFanGain'] = daily_summary_df.groupby('inGameName')['dailyFanGain'].cumsum()
+    daily_summary_df['monthlyFanGain'] = daily_summary_df.groupby('inGameName', observed=True)['dailyFanGain'].cumsum()
     daily_summary_df['rank'] = daily_summary_df.groupby('date')['monthlyFanGain'].rank(method='dense', ascending=False)
-    daily_summary_df['previous_rank'] = daily_summary_df.groupby('inGameName')['rank'].shift(1)
+    daily_summary_df['previous_rank'] = daily_summary_df.groupby('inGameName', observed=True)['rank'].shift(1)
     daily_summary_df['rank_delta'] = daily_summary_df['previous_rank'] - daily_summary_df['rank']
     def get_fans_to_next(df):
         df = df.sort_values('rank')
@@ -940,7 +946,7 @@ def main():
         })
     daily_club_summary_df = pd.DataFrame(daily_club_summary_list)
 
-    summary_df = daily_summary_df.loc[daily_summary_df.groupby('inGameName')['timestamp'].idxmax()].copy()
+    summary_df = daily_summary_df.loc[daily_summary_df.groupby('inGameName', observed=True)['timestamp'].idxmax()].copy()
     summary_df.rename(columns={'monthlyFanGain': 'totalMonthlyGain'}, inplace=True)
 
     summary_with_ranks = summary_df.sort_values('totalMonthlyGain', ascending=False).copy()
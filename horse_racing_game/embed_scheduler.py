@@ -0,0 +1,128 @@
+# embed_scheduler.py
+import asyncio
+import discord
+
+PRIORITY_BETTING = 0  # Odds/pot refreshes during the betting window
+PRIORITY_LIVE = 1     # Round-by-round race updates
+PRIORITY_CRITICAL = 2 # State changes (race started/cancelled) that must not be dropped or delayed
+
+class EmbedEditScheduler:
+    """
+    Coalesces embed edits for every live race message under one shared rate budget.
+
+    submit() only records the newest embed wanted for a message; a single worker sends it
+    when the message's debounce interval has passed, so a burst of bets becomes one edit.
+    An embed identical to the last one sent is skipped, and when several races are waiting
+    the highest-priority (then oldest) edit goes first. Edits never exceed
+    `max_edits_per_window` per `window_seconds` across all messages.
+    """
+    def __init__(self, min_interval: float = 2.0, max_edits_per_window: int = 5, window_seconds: float = 5.0):
+        self.min_interval = min_interval
+        self.max_edits_per_window = max_edits_per_window
+        self.window_seconds = window_seconds
+        self._pending = {}    # message.id -> {'message', 'embed', 'priority', 'queued_at', 'waiters'}
+        self._last_sent = {}  # message.id -> (embed dict, monotonic time)
+        self._recent_edits = []
+        self._wakeup = None
+        self._worker = None
+        self.stats = {'submitted': 0, 'sent': 0, 'skipped_unchanged': 0, 'coalesced': 0, 'failed': 0}
+
+    def submit(self, message: discord.Message, embed: discord.Embed, priority: int = PRIORITY_BETTING) -> asyncio.Future:
+        """
+        Queues `embed` as the latest content for `message`, replacing anything not yet sent.
+        Returns a future that resolves once this content (or a newer one) is on Discord.
+        """
+        loop = asyncio.get_running_loop()
+        self.stats['submitted'] += 1
+        waiter = loop.create_future()
+        entry = self._pending.get(message.id)
+        if entry:
+            self.stats['coalesced'] += 1
+            entry['embed'] = embed.copy()
+            entry['priority'] = max(entry['priority'], priority)
+            entry['waiters'].append(waiter)
+        else:
+            self._pending[message.id] = {'message': message, 'embed': embed.copy(), 'priority': priority,
+                                         'queued_at': loop.time(), 'waiters': [waiter]}
+
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run())
+        return waiter
+
+    async def send_now(self, message: discord.Message, embed: discord.Embed):
+        """Submits at critical priority and waits for the edit, for state changes later code depends on."""
+        await self.submit(message, embed, PRIORITY_CRITICAL)
+
+    def forget(self, message: discord.Message):
+        """Drops a finished race's message so the scheduler stops tracking it."""
+        entry = self._pending.pop(message.id, None)
+        if entry:
+            self._resolve(entry)
+        self._last_sent.pop(message.id, None)
+
+    def _resolve(self, entry):
+        for waiter in entry['waiters']:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _next_ready(self, now):
+        """Returns (message_id, seconds_to_wait). The id is None if nothing is ready yet."""
+        ready, earliest = [], None
+        for message_id, entry in self._pending.items():
+            last = self._last_sent.get(message_id)
+            due = last[1] + self.min_interval if last and entry['priority'] < PRIORITY_CRITICAL else now
+            if due <= now:
+                ready.append((-entry['priority'], entry['queued_at'], message_id))
+            else:
+                earliest = due if earliest is None else min(earliest, due)
+        if ready:
+            return min(ready)[2], 0
+        return None, (earliest - now) if earliest is not None else None
+
+    async def _take_rate_token(self):
+        """Waits until one more edit fits inside the shared budget."""
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            self._recent_edits = [t for t in self._recent_edits if now - t < self.window_seconds]
+            if len(self._recent_edits) < self.max_edits_per_window:
+                self._recent_edits.append(now)
+                return
+            await asyncio.sleep(self.window_seconds - (now - self._recent_edits[0]))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            message_id, wait = self._next_ready(loop.time())
+            if message_id is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._take_rate_token()
+            entry = self._pending.pop(message_id, None)
+            if entry is None:  # forgotten while we waited for the budget
+                continue
+
+            embed_dict = entry['embed'].to_dict()
+            last = self._last_sent.get(message_id)
+            if last and last[0] == embed_dict:
+                self.stats['skipped_unchanged'] += 1
+                self._recent_edits.pop()  # Nothing was sent, give the token back
+                self._resolve(entry)
+                continue
+
+            try:
+                await entry['message'].edit(embed=entry['embed'])
+                self.stats['sent'] += 1
+                self._last_sent[message_id] = (embed_dict, loop.time())
+            except discord.HTTPException as e:
+                self.stats['failed'] += 1
+                print(f"Failed to edit race message {message_id}: {e}")
+            self._resolve(entry)
@@ -9,9 +9,13 @@ import re
 import asyncio
 import json
 import random
-from .race_logic import Race, Horse
+from .race_logic import Race
+from .race_simulator_v1 import simulate_race
+from .race_ledger import RaceLedger, RaceLedgerWAL, recover_unfinished_races
+from .embed_scheduler import EmbedEditScheduler, PRIORITY_BETTING, PRIORITY_LIVE
 from . import skills # We don't use it directly, but race_logic needs it
-from .race_logic_v2 import Horse as HorseV2, Race as RaceV2, Bookie
+from .race_logic_v2 import Race as RaceV2, Bookie
+from .race_field import build_race_horses, generate_random_horse_field
 from .race_bots import BotManager
 from market import database
 import numpy as np
@@ -40,45 +44,13 @@ BOT_PERSONALITIES = {
 }
 
 active_races = {}  # In-memory dictionary to hold live Race objects
+race_ledgers = {}  # race_id -> RaceLedger, the live book for each race until it is exported to CSV
+race_ledger_wal = RaceLedgerWAL()
+embed_scheduler = EmbedEditScheduler()  # Shared by every race so concurrent races split one edit budget
 
-DEFINED_HORSES = ["Sakura Bakushin Oh", "Marzensty", "El", "Oguri Hat", "Gold Trip", "Earth Rut"]
-
-HORSE_NAME_PARTS = {
-    "adjectives": ["Galloping", "Midnight", "Dusty", "Iron", "Star", "Thunder", "Shadow", "Golden", "Baggins", "Cheating", "BOT", "Nice", "Mean", "Godly", "Inspector", "Dishonest", "Old School", "Broken", "Neon", "Lucky", "Turbo", "Sticky", "Captain", "Major", "Wild", "Furious", "Stoic", "Noble", "Cash"],
-    "nouns": ["Bullet", "Fury", "Runner", "Chaser", "Stallion", "Dreamer", "Comet", "Baggins", "Cheater", "God", "Nature", "Gadget", "Wave", "Insomnia", "Twice", "Epidemic", "King", "Queen", "Jester", "Engine", "Glitch", "Rocket", "Mirror", "Major", "Pilgrim", "Mountain", "Crew"]
-}
-HORSE_STRATEGIES = ["Front Runner", "Pace Chaser", "Late Surger", "End Closer"]
-GENERIC_SKILLS = ["Straightaway Adept", "Homestretch Haste", "Slipstream", "Late Start"]
-UNIQUE_HORSES = {
-    "Sakura Bakushin Oh": {"strategy": "Front Runner", "skills": ["Huge Lead"]},
-    "Marzensty": {"strategy": "Front Runner", "skills": ["Early Lead"]},
-    "El": {"strategy": "Pace Chaser", "skills": ["Victoria por plata"]},
-    "Oguri Hat": {"strategy": "Pace Chaser", "skills": ["Trumpet Blast"]},
-    "Gold Trip": {"strategy": "End Closer", "skills": ["Uma Stan"]},
-    "Earth Rut": {"strategy": "Pace Chaser", "skills": ["Fiery Satisfaction"]},
-}
-
-def generate_race_field(num_horses_needed):
-    """
-    Generates a list of horse names for a race, prioritizing defined horses
-    and filling the rest with unique, randomly generated names.
-    """
-    # 1. Start with the list of defined horses.
-    available_horses = DEFINED_HORSES[:]
-
-    # 2. Generate additional random horses if needed.
-    while len(available_horses) < num_horses_needed:
-        adj = random.choice(HORSE_NAME_PARTS["adjectives"])
-        noun = random.choice(HORSE_NAME_PARTS["nouns"])
-        new_name = f"{adj} {noun}"
-
-        # 3. Ensure the new name is unique before adding it.
-        if new_name not in available_horses:
-            available_horses.append(new_name)
-
-    # 4. Shuffle the list and return the exact number needed for the race.
-    random.shuffle(available_horses)
-    return available_horses[:num_horses_needed]
+BETTING_TICK_SECONDS = 1      # How often the betting window re-renders; unchanged renders are never sent
+SNIPER_CHECK_SECONDS = 5      # Sniper bots roll for a bet on this cadence, as before
+COUNTDOWN_STEP_SECONDS = 10   # The countdown is shown in steps so the embed only changes when something did
 
 # --- Helper Functions for Racing ---
 def get_or_create_csv(filepath, headers):
@@ -113,41 +85,26 @@ def initialize_race_files():
         bot_data = [{'bot_name': name, 'bankroll': 10000, 'total_bets': 0, 'total_winnings': 0} for name in BOT_PERSONALITIES]
         pd.DataFrame(bot_data).to_csv(bot_ledger_file, index=False)
 
-async def _record_bet(race, bettor_id, horse_number, bet_amount):
-    """Calculates live odds and time, then records the bet to the CSV."""
-    loop = asyncio.get_running_loop()
-
-    races_df = await loop.run_in_executor(
-        None,
-        lambda: pd.read_csv('horse_racing_game/data/races.csv', parse_dates=['start_time'])
-    )
-
-    race_info = races_df[races_df['race_id'] == race.race_id].iloc[0]
-    start_time = race_info['start_time']
-
-    if start_time.tzinfo is None:
-        start_time = start_time.tz_localize('UTC')
-
+def _record_bet(race, bettor_id, horse_number, bet_amount):
+    """Records a bet in the race's in-memory ledger (and its WAL) at the current pool odds."""
+    ledger = race_ledgers[race.race_id]
     duration = timedelta(seconds=120)
-    time_elapsed = datetime.now(pytz.utc) - start_time
+    time_elapsed = datetime.now(pytz.utc) - ledger.start_time
     time_left = (duration - time_elapsed).total_seconds()
+    return ledger.record_bet(bettor_id, horse_number, bet_amount, time_left, is_human=bettor_id not in BOT_PERSONALITIES)
+
+async def _sync_race_ledger_wal():
+    """Waits until every WAL record so far is on disk, off the event loop. Await it before confirming a bet."""
+    await asyncio.get_running_loop().run_in_executor(None, race_ledger_wal.sync)
 
-    bets_df = await loop.run_in_executor(None, pd.read_csv, 'horse_racing_game/data/race_bets.csv')
-    race_bets = bets_df[bets_df['race_id'] == race.race_id]
-    total_pot = race_bets['bet_amount'].sum()
-    bets_on_horse = race_bets[race_bets['horse_number'] == horse_number]['bet_amount'].sum()
-    odds = (total_pot - bets_on_horse) / bets_on_horse if bets_on_horse > 0 else total_pot
-
-    new_bet = pd.DataFrame([{
-        'race_id': race.race_id,
-        'bettor_id': bettor_id,
-        'horse_number': horse_number,
-        'bet_amount': bet_amount,
-        'odds_at_bet': round(odds, 2),
-        'time_left_in_window': round(time_left, 2),
-        'winnings': 0
-    }])
-    await loop.run_in_executor(None, lambda: new_bet.to_csv('horse_racing_game/data/race_bets.csv', mode='a', header=False, index=False))
+async def _export_race_ledger(race):
+    """Writes a finished race's ledger out to the CSVs and drops it from memory and the WAL."""
+    ledger = race_ledgers.pop(race.race_id, None)
+    if ledger is None:
+        return
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, ledger.export)
+    await loop.run_in_executor(None, race_ledger_wal.compact)
 
 async def place_starting_bot_bets(race, channel):
     """Gets starter bots to bet on different horses."""
@@ -170,11 +127,21 @@ async def place_starting_bot_bets(race, channel):
         if bet_amount > 0:
             bot_ledgers.loc[bot_ledgers['bot_name'] == bot_name, 'bankroll'] -= bet_amount
             bot_ledgers.loc[bot_ledgers['bot_name'] == bot_name, 'total_bets'] += bet_amount
-            await _record_bet(race, bot_name, horse.number, bet_amount)
+            _record_bet(race, bot_name, horse.number, bet_amount)
 
+    await _sync_race_ledger_wal()
     await loop.run_in_executor(None, lambda: bot_ledgers.to_csv('horse_racing_game/data/bot_ledgers.csv', index=False))
     await channel.send("A flurry of early bets have come in from the regular crowd!")
 
+FAIR_ODDS_SIMULATIONS = 20000
+
+def fair_odds_text(race, horse):
+    """The simulated win/place chances for a horse, shown next to the pool odds."""
+    probabilities = race.fair_probabilities.get(horse.number)
+    if not probabilities:
+        return ""
+    return f" | Fair: {probabilities['win']:.0%} win, {probabilities['place']:.0%} place"
+
 async def run_complete_race(bot, channel, message, race):
     """
     A single, robust function that handles the entire race lifecycle.
@@ -186,6 +153,7 @@ async def run_complete_race(bot, channel, message, race):
 
         sniper_bots = [name for name, props in BOT_PERSONALITIES.items() if props['type'] == 'sniper']
         snipers_who_have_bet = []
+        next_sniper_check = 0
 
         while True:
             time_elapsed = datetime.now(pytz.utc) - start_time
@@ -194,28 +162,28 @@ async def run_complete_race(bot, channel, message, race):
                 break
 
             try:
-                loop = asyncio.get_running_loop()
-                bets_df = await loop.run_in_executor(None, pd.read_csv, 'horse_racing_game/data/race_bets.csv')
-                bets_df = bets_df.query(f"race_id == {race.race_id}")
-                total_pot = bets_df['bet_amount'].sum()
+                ledger = race_ledgers[race.race_id]
+                total_pot = ledger.total_pot
 
                 embed = message.embeds[0]
                 field_text = ""
                 for horse in race.horses:
-                    bets_on_horse = bets_df[bets_df['horse_number'] == horse.number]['bet_amount'].sum()
-                    odds = (total_pot - bets_on_horse) / bets_on_horse if bets_on_horse > 0 else 0
+                    bets_on_horse = ledger.horse_totals.get(horse.number, 0)
+                    odds = ledger.odds_for(horse.number)
                     odds_str = f"{odds:.1f}:1" if bets_on_horse > 0 else "--:--"
-                    field_text += f"`[{horse.number}]` **{horse.name}** ({horse.strategy}) - Odds: {odds_str}\n"
+                    field_text += f"`[{horse.number}]` **{horse.name}** ({horse.strategy}) - Odds: {odds_str}{fair_odds_text(race, horse)}\n"
 
                 embed.set_field_at(0, name="THE FIELD", value=field_text, inline=False)
-                minutes, seconds = divmod(int(time_remaining.total_seconds()), 60)
+                shown_seconds = math.ceil(time_remaining.total_seconds() / COUNTDOWN_STEP_SECONDS) * COUNTDOWN_STEP_SECONDS
+                minutes, seconds = divmod(shown_seconds, 60)
                 embed.set_field_at(1, name="Betting Window", value=f"Closing in {minutes}m {seconds}s")
                 embed.description = f"The total pot is now **{format_cc(total_pot)}**!"
-                await message.edit(embed=embed)
+                embed_scheduler.submit(message, embed, PRIORITY_BETTING)
             except Exception as e:
                 print(f"Error updating odds (expected during testing with no bets): {e}")
 
-            if time_remaining.total_seconds() <= 10:
+            if time_elapsed.total_seconds() >= next_sniper_check and time_remaining.total_seconds() <= 10:
+                next_sniper_check = time_elapsed.total_seconds() + SNIPER_CHECK_SECONDS
                 for sniper_name in sniper_bots:
                     if sniper_name not in snipers_who_have_bet:
                         if random.randint(1, 50) == 1:
@@ -236,40 +204,38 @@ async def run_complete_race(bot, channel, message, race):
                                     bot_ledgers.loc[bot_ledgers['bot_name'] == sniper_name, 'bankroll'] -= bet_amount
                                     bot_ledgers.loc[bot_ledgers['bot_name'] == sniper_name, 'total_bets'] += bet_amount
 
-                                    bet_df = pd.DataFrame([{'race_id': race.race_id, 'bettor_id': sniper_name, 'horse_number': chosen_horse.number, 'bet_amount': bet_amount}])
-                                    bet_df.to_csv('horse_racing_game/data/race_bets.csv', mode='a', header=False, index=False)
+                                    _record_bet(race, sniper_name, chosen_horse.number, bet_amount)
+                                    await _sync_race_ledger_wal()
                                     await loop.run_in_executor(None, lambda: bot_ledgers.to_csv('horse_racing_game/data/bot_ledgers.csv', index=False))
 
                                     await channel.send(f"A huge last-minute bet has just come in! **{sniper_name}** places **{format_cc(bet_amount)}** on **{chosen_horse.name}**!")
 
-            await asyncio.sleep(5)
+            await asyncio.sleep(BETTING_TICK_SECONDS)
 
         print(f"Countdown finished for Race ID: {race.race_id}. Checking for bets...")
-        loop = asyncio.get_running_loop()
-        bets_df = await loop.run_in_executor(None, pd.read_csv, 'horse_racing_game/data/race_bets.csv')
-        race_bets = bets_df[bets_df['race_id'] == race.race_id]
+        ledger = race_ledgers[race.race_id]
 
-        if race_bets.empty:
+        if not ledger.bets:
             print(f"No bets placed for Race ID: {race.race_id}. Cancelling.")
-            races_df = await loop.run_in_executor(None, pd.read_csv, 'horse_racing_game/data/races.csv')
-            races_df.loc[races_df['race_id'] == race.race_id, 'status'] = 'cancelled'
-            await loop.run_in_executor(None, lambda: races_df.to_csv('horse_racing_game/data/races.csv', index=False))
+            ledger.set_status('cancelled')
+            await _export_race_ledger(race)
 
             cancel_embed = discord.Embed(title="🏇 Race Cancelled 🏇", description="This race has been cancelled due to a lack of bets.", color=discord.Color.red())
-            await message.edit(embed=cancel_embed)
+            await embed_scheduler.send_now(message, cancel_embed)
+            embed_scheduler.forget(message)
             if channel.id in active_races: del active_races[channel.id]
             return
 
         print(f"Bets found! Starting race simulation for Race ID: {race.race_id}")
-        races_df = await loop.run_in_executor(None, pd.read_csv, 'horse_racing_game/data/races.csv')
-        races_df.loc[races_df['race_id'] == race.race_id, 'status'] = 'running'
-        await loop.run_in_executor(None, lambda: races_df.to_csv('horse_racing_game/data/races.csv', index=False))
+        ledger.set_status('running')
+        await _sync_race_ledger_wal()
 
         start_embed = discord.Embed(title="🏁 THE PADDOCK DASH IS UNDERWAY! 🏁", description="The betting window has closed. And they're off!", color=discord.Color.blue())
         start_embed.add_field(name="THE FIELD", value=message.embeds[0].fields[0].value, inline=False)
-        await message.edit(embed=start_embed)
+        await embed_scheduler.send_now(message, start_embed)
 
-        live_race_embed = (await channel.fetch_message(message.id)).embeds[0]
+        live_race_embed = start_embed.copy()
+        round_update = None
 
         while not race.is_finished():
             race.run_round()
@@ -287,9 +253,13 @@ async def run_complete_race(bot, channel, message, race):
 
             live_race_embed.set_field_at(0, name=f"LIVE RACE - Round {race.round_number}", value=track_display, inline=False)
             live_race_embed.description = "\n".join(race.log)
-            await message.edit(embed=live_race_embed)
+            round_update = embed_scheduler.submit(message, live_race_embed, PRIORITY_LIVE)
             await asyncio.sleep(6)
 
+        if round_update:
+            await round_update  # Make sure the final standings are on screen before the results
+        embed_scheduler.forget(message)
+
         print(f"Race finished for Race ID: {race.race_id}. Processing results...")
         finishers = [h for h in race.horses if h.position >= race.track_length]
 
@@ -318,14 +288,11 @@ async def run_complete_race(bot, channel, message, race):
             final_winner = tied_winners[0]
 
         loop = asyncio.get_running_loop()
-        races_df = await loop.run_in_executor(None, pd.read_csv, 'horse_racing_game/data/races.csv')
-        bets_df = await loop.run_in_executor(None, pd.read_csv, 'horse_racing_game/data/race_bets.csv')
         crew_coins_df = await loop.run_in_executor(None, lambda: pd.read_csv('horse_racing_game/data/crew_coins.csv', dtype={'discord_id': str}))
         bot_ledgers = await loop.run_in_executor(None, pd.read_csv, 'horse_racing_game/data/bot_ledgers.csv')
         jackpot_ledger = await loop.run_in_executor(None, pd.read_csv, 'horse_racing_game/data/jackpot_ledger.csv')
 
-        race_bets = bets_df[bets_df['race_id'] == race.race_id]
-        total_pot = race_bets['bet_amount'].sum()
+        total_pot = ledger.total_pot
         track_fee = total_pot * 0.0789
         winnings_pool = total_pot - track_fee
         jackpot_ledger.loc[0, 'current_jackpot'] += track_fee
@@ -339,17 +306,19 @@ async def run_complete_race(bot, channel, message, race):
             await channel.send(f"🎉 **THE WINNER'S PURSE HAS BEEN HIT!** An extra **{format_cc(current_jackpot)}** has been added to the prize pool!")
 
         payout_summary = "No one bet on the winner."
+        bet_winnings = {}
         winner_horse_obj = next((h for h in race.horses if h.name == final_winner.name), None)
         if winner_horse_obj:
-            winning_bets = race_bets[race_bets['horse_number'] == winner_horse_obj.number]
-            total_winning_bets_amount = winning_bets['bet_amount'].sum()
+            total_winning_bets_amount = ledger.horse_totals.get(winner_horse_obj.number, 0)
 
             if total_winning_bets_amount > 0:
                 payout_summary = ""
-                for index, bet in winning_bets.iterrows():
+                for index, bet in enumerate(ledger.bets):
+                    if bet['horse_number'] != winner_horse_obj.number:
+                        continue
                     bettor_id = str(bet['bettor_id'])
                     winnings = winnings_pool * (bet['bet_amount'] / total_winning_bets_amount)
-                    bets_df.loc[index, 'winnings'] = winnings
+                    bet_winnings[index] = winnings
 
                     if bettor_id in BOT_PERSONALITIES:
                         bot_ledgers.loc[bot_ledgers['bot_name'] == bettor_id, 'bankroll'] += winnings
@@ -386,7 +355,8 @@ async def run_complete_race(bot, channel, message, race):
             log_df['race_id'] = race.race_id
             log_df.to_csv('horse_racing_game/data/race_events.csv', mode='a', header=False, index=False)
 
-        await loop.run_in_executor(None, lambda: bets_df.to_csv('horse_racing_game/data/race_bets.csv', index=False))
+        ledger.settle(final_winner.name, bet_winnings)
+        await _export_race_ledger(race)
         await loop.run_in_executor(None, lambda: crew_coins_df.to_csv('horse_racing_game/data/crew_coins.csv', index=False))
         await loop.run_in_executor(None, lambda: bot_ledgers.to_csv('horse_racing_game/data/bot_ledgers.csv', index=False))
         await loop.run_in_executor(None, lambda: jackpot_ledger.to_csv('horse_racing_game/data/jackpot_ledger.csv', index=False))
@@ -398,10 +368,23 @@ async def run_complete_race(bot, channel, message, race):
     except Exception as e:
         print(f"A critical error occurred in the main race loop for Race ID {race.race_id}: {e}")
         if channel.id in active_races: del active_races[channel.id]
+        embed_scheduler.forget(message)
+        ledger = race_ledgers.get(race.race_id)
+        if ledger:
+            # Hand the bets to the CSVs as 'interrupted' so /refund_race can return them
+            if ledger.status != 'finished':
+                ledger.set_status('interrupted')
+            try:
+                await _export_race_ledger(race)
+            except Exception as export_error:
+                print(f"Could not export ledger for Race ID {race.race_id} (kept in WAL for recovery): {export_error}")
 
 
 def setup(bot):
     initialize_race_files()
+    recovered = recover_unfinished_races(race_ledger_wal)
+    if recovered:
+        print(f"Recovered {len(recovered)} unfinished race(s) from the race ledger WAL: {recovered}")
 
     @bot.group(invoke_without_command=True)
     async def race(ctx):
@@ -424,27 +407,31 @@ def setup(bot):
         race_id = int(datetime.now().timestamp())
         new_race = Race(race_id=race_id, track_length=track_length)
 
-        horse_names_for_this_race = generate_race_field(num_horses)
-
-        for i, horse_name in enumerate(horse_names_for_this_race, 1):
-            if horse_name in UNIQUE_HORSES:
-                horse_data = UNIQUE_HORSES[horse_name]
-                h = Horse(number=i, name=horse_name, strategy=horse_data['strategy'], skills=horse_data['skills'][:])
-            else:
-                skills_list = random.sample(GENERIC_SKILLS, k=random.randint(0, 2))
-                h = Horse(number=i, name=horse_name, strategy=random.choice(HORSE_STRATEGIES), skills=skills_list)
+        for h in build_race_horses(num_horses):
             new_race.add_horse(h)
 
+        # --- Fair odds: thousands of simulated races, run off the event loop ---
+        try:
+            loop = asyncio.get_running_loop()
+            new_race.fair_probabilities = await loop.run_in_executor(None, simulate_race, new_race, FAIR_ODDS_SIMULATIONS)
+        except Exception as e:
+            print(f"Could not simulate fair odds for Race ID {race_id}: {e}")
+
         embed = discord.Embed(title=f"🏇 Race #{race_id} - Morning Line", description="Calculating odds... Betting is now open!", color=discord.Color.green())
         field_text = ""
         for horse in new_race.horses:
-            field_text += f"`[{horse.number}]` **{horse.name}** ({horse.strategy}) - Odds: --:--\n"
+            field_text += f"`[{horse.number}]` **{horse.name}** ({horse.strategy}) - Odds: --:--{fair_odds_text(new_race, horse)}\n"
         embed.add_field(name="THE FIELD", value=field_text, inline=False)
         embed.add_field(name="Betting Window", value="Closing in 2m 0s")
         race_message = await ctx.send(embed=embed)
 
         start_time = datetime.now(pytz.utc)
-        races_df = pd.DataFrame([{'race_id': race_id, 'message_id': race_message.id, 'channel_id': race_message.channel.id, 'track_length': track_length, 'status': 'betting', 'winner': None, 'start_time': start_time.isoformat()}])
+        race_row = {'race_id': race_id, 'message_id': race_message.id, 'channel_id': race_message.channel.id, 'track_length': track_length, 'status': 'betting', 'winner': None, 'start_time': start_time.isoformat()}
+        ledger = RaceLedger(race_id, race_ledger_wal)
+        ledger.open(race_row)
+        race_ledgers[race_id] = ledger
+        await _sync_race_ledger_wal()
+        races_df = pd.DataFrame([race_row])
         races_df.to_csv('horse_racing_game/data/races.csv', mode='a', header=False, index=False)
         horses_data = [{'race_id': race_id, 'horse_number': h.number, 'horse_name': h.name, 'position': 0, 'strategy': h.strategy, 'skills': ",".join(h.skills)} for h in new_race.horses]
         pd.DataFrame(horses_data).to_csv('horse_racing_game/data/race_horses.csv', mode='a', header=False, index=False)
@@ -487,14 +474,11 @@ def setup(bot):
                 return await ctx.send(f"You don't have enough CC. Your balance is {format_cc(user_balance)}.", ephemeral=True)
 
             crew_coins_df.loc[crew_coins_df['discord_id'] == bettor_id, 'balance'] -= amount
-            await _record_bet(race, bettor_id, horse_number, amount)
+            _record_bet(race, bettor_id, horse_number, amount)
+            await _sync_race_ledger_wal()
             await ctx.send(f"✅ Your bet of **{format_cc(amount)}** on horse **#{horse_number}** has been placed!", ephemeral=True)
 
-            all_bets_df = await loop.run_in_executor(None, pd.read_csv, 'horse_racing_game/data/race_bets.csv')
-            race_bets = all_bets_df[all_bets_df['race_id'] == race.race_id]
-            human_bets = race_bets[~race_bets['bettor_id'].isin(BOT_PERSONALITIES.keys())]
-
-            if len(human_bets) == 1:
+            if race_ledgers[race.race_id].human_bet_count == 1:
                 print("First human bet detected, triggering BagginsTheBookie...")
                 bot_ledgers = await loop.run_in_executor(None, pd.read_csv, 'horse_racing_game/data/bot_ledgers.csv')
                 bookie_row = bot_ledgers[bot_ledgers['bot_name'] == 'BagginsTheBookie']
@@ -509,12 +493,12 @@ def setup(bot):
                         baggins_choice = random.choice(possible_horses)
                         baggins_horse_name = next((h.name for h in race.horses if h.number == baggins_choice), "Unknown Horse")
 
-                        await _record_bet(race, 'BagginsTheBookie', baggins_choice, baggins_bet_amount)
+                        _record_bet(race, 'BagginsTheBookie', baggins_choice, baggins_bet_amount)
+                        await _sync_race_ledger_wal()
 
                         await ctx.channel.send(f"**BagginsTheBookie** has entered the fray, placing a bet of **{format_cc(baggins_bet_amount)}** on **#{baggins_choice} {baggins_horse_name}**!")
                         await loop.run_in_executor(None, lambda: bot_ledgers.to_csv('horse_racing_game/data/bot_ledgers.csv', index=False))
 
-            await loop.run_in_executor(None, lambda: all_bets_df.to_csv('horse_racing_game/data/race_bets.csv', index=False))
             await loop.run_in_executor(None, lambda: crew_coins_df.to_csv('horse_racing_game/data/crew_coins.csv', index=False))
 
         except Exception as e:
@@ -534,6 +518,10 @@ def setup(bot):
         open(lock_file, 'w').close()
 
         try:
+            if race_id in race_ledgers:
+                await ctx.send(f"Race `{race_id}` is still running. Refund it once it has finished or been interrupted.", ephemeral=True)
+                return
+
             races_df = pd.read_csv('horse_racing_game/data/races.csv')
             bets_df = pd.read_csv('horse_racing_game/data/race_bets.csv')
             crew_coins_df = pd.read_csv('horse_racing_game/data/crew_coins.csv', dtype={'discord_id': str})
@@ -645,33 +633,3 @@ def setup(bot):
         }
 
         await ctx.send("V2 Race created successfully!", ephemeral=True)
-
-def generate_random_horse_field(num_horses: int) -> list:
-    """
-    Reads the attributes config and generates a list of unique, random horses.
-    """
-    try:
-        with open('horse_racing_game/configs/horse_attributes.json', 'r') as f:
-            config = json.load(f)
-    except FileNotFoundError:
-        print("ERROR: horse_attributes.json not found. Cannot generate horses.")
-        return []
-
-    adjectives = list(config['adjectives'].keys())
-    nouns = list(config['nouns'].keys())
-    strategies = list(config['strategies'].keys())
-
-    generated_horses = []
-    used_names = set()
-
-    while len(generated_horses) < num_horses:
-        adj = random.choice(adjectives)
-        noun = random.choice(nouns)
-        name = f"{adj} {noun}"
-
-        if name not in used_names:
-            used_names.add(name)
-            strategy = random.choice(strategies)
-            generated_horses.append(HorseV2(name, strategy))
-
-    return generated_horses
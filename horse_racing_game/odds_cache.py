@@ -0,0 +1,107 @@
+import json
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+ODDS_CACHE_FILE = 'horse_racing_game/data/odds_cache.json'
+# Bump whenever race_logic_v2.simulate_win_counts changes how a race plays out, so odds
+# simulated under the old rules are never served again
+ODDS_MODEL_VERSION = 1
+
+def field_signature(means: np.ndarray, sigmas: np.ndarray, distance: float, simulations: int):
+    """
+    Builds a canonical, order-independent key for a race field.
+
+    A horse's simulated behaviour is fully described by its per-phase (mean, sigma) after the
+    distance penalty, so horses are reduced to those tuples and sorted. The simulation count and
+    ODDS_MODEL_VERSION are part of the key, so changing either never reuses older odds. Returns
+    the key and the permutation that maps canonical order back to the caller's horse order.
+    """
+    rows = [tuple(np.round(means[i], 6)) + tuple(np.round(sigmas[i], 6)) for i in range(len(means))]
+    order = sorted(range(len(rows)), key=lambda i: rows[i])
+    canonical = (ODDS_MODEL_VERSION, int(simulations), round(float(distance), 3), tuple(rows[i] for i in order))
+    key = hashlib.sha1(repr(canonical).encode()).hexdigest()
+    return key, order
+
+
+class OddsCache:
+    """
+    Win counts per race field signature, kept in an in-memory LRU and persisted to a JSON file.
+    Each entry stores the counts and how many simulations produced them.
+    """
+    def __init__(self, path: str = ODDS_CACHE_FILE, max_entries: int = 512):
+        self.path = path
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                stored = json.load(f)
+            for key, entry in stored.items():
+                self._entries[key] = {"win_counts": np.array(entry['win_counts'], dtype=np.int64),
+                                      "simulations": int(entry['simulations'])}
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        except (json.JSONDecodeError, KeyError, OSError) as e:
+            print(f"Warning: Could not read odds cache '{self.path}': {e}. Starting empty.")
+
+    def _save(self):
+        if not self.path:
+            return
+        payload = {key: {"win_counts": entry['win_counts'].tolist(), "simulations": entry['simulations']}
+                   for key, entry in self._entries.items()}
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(payload, f)
+        os.replace(temp_path, self.path)
+
+    def get_win_counts(self, means: np.ndarray, sigmas: np.ndarray, distance: float, simulations: int, simulate):
+        """
+        Returns (win_counts, total_simulations) in the caller's horse order, with exactly
+        `simulations` races behind them. simulate(means, sigmas, distance, n) is only called
+        when the cache has no entry for this field, simulation count and model version.
+        """
+        key, order = field_signature(means, sigmas, distance, simulations)
+        canonical_means, canonical_sigmas = means[order], sigmas[order]
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is not None:
+            canonical_counts, total = entry['win_counts'], entry['simulations']
+        else:
+            canonical_counts = simulate(canonical_means, canonical_sigmas, distance, simulations)
+            total = simulations
+            with self._lock:
+                self._entries[key] = {"win_counts": canonical_counts, "simulations": total}
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                try:
+                    self._save()
+                except OSError as e:
+                    print(f"Warning: Could not write odds cache '{self.path}': {e}")
+
+        # Map canonical order back to the race's horse order
+        win_counts = np.empty_like(canonical_counts)
+        win_counts[order] = canonical_counts
+        return win_counts, total
+
+
+_default_cache = None
+
+def get_default_odds_cache() -> OddsCache:
+    """The process-wide cache shared by every Bookie that isn't given its own."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = OddsCache()
+    return _default_cache
@@ -1,27 +1,52 @@
 import json
 import random
 import asyncio
+import time
+import numpy as np
+from types import SimpleNamespace
 from market import database # We will call our new database functions from here
 
+# Integer codes so a whole tick's decisions can be made with array operations
+TIMING_CODES = {'early': 0, 'mid': 1, 'late': 2, 'any': 3}        # Unknown timings never bet
+PREFERENCE_CODES = {'favorite': 0, 'longshot': 1, 'value': 2}     # Anything else bets at random
+
 class BotManager:
     """
     Manages the AI bot population, their profiles, and their betting behavior
     during a race's betting window.
     """
 
-    def __init__(self, race_id, bookie):
+    def __init__(self, race_id, bookie, bots: list = None, rng: np.random.Generator = None, verbose: bool = True):
         """
         Initializes the BotManager for a specific race.
 
         Args:
             race_id (int): The unique ID of the race being managed.
             bookie (Bookie): The Bookie object managing the current race's odds.
+            bots (list): Bot profiles to use instead of bot_personalities.json.
+            rng (np.random.Generator): Random source for the vectorized betting decisions.
+            verbose (bool): Print per-race progress (off for offline simulations).
         """
         self.race_id = race_id
+        self.verbose = verbose
         self.bookie = bookie
-        self.bots = self._load_bot_profiles()
+        self.rng = rng or np.random.default_rng()
+        self.bots = bots if bots is not None else self._load_bot_profiles()
         self.participating_bots = self._get_participating_bots()
         self.bets_placed_this_race = {bot['name']: 0 for bot in self.bots}
+        self._build_bot_arrays()
+
+    def _build_bot_arrays(self):
+        """Packs the participating bots' profiles into parallel arrays, one slot per bot."""
+        bots = self.participating_bots
+        self.bot_names = np.array([bot['name'] for bot in bots], dtype=object)
+        self.bot_timing = np.array([TIMING_CODES.get(bot.get('bet_timing', 'any'), -1) for bot in bots], dtype=np.int8)
+        self.bot_preference = np.array([PREFERENCE_CODES.get(bot.get('target_preference', 'random'), -1) for bot in bots], dtype=np.int8)
+        self.bot_max_bets = np.array([bot.get('max_bets_per_race', 1) for bot in bots], dtype=np.int32)
+        self.bot_is_percentage = np.array([bot.get('wager_strategy') == 'percentage' for bot in bots], dtype=bool)
+        self.bot_wager_amount = np.array([bot['wager_amount'] for bot in bots], dtype=np.float64)
+        self.bot_bankroll = np.array([bot['bankroll'] for bot in bots], dtype=np.float64)
+        self.bot_bets_placed = np.zeros(len(bots), dtype=np.int32)
 
     def _load_bot_profiles(self) -> list:
         """Loads the bot personality profiles from the JSON config."""
@@ -41,7 +66,8 @@ class BotManager:
         for bot in self.bots:
             if random.random() < bot.get('bet_frequency', 0.5):
                 participants.append(bot)
-        print(f"BOTS: {len(participants)} bots are participating in race #{self.race_id}.")
+        if self.verbose:
+            print(f"BOTS: {len(participants)} bots are participating in race #{self.race_id}.")
         return participants
 
     def _get_target_horse(self, preference: str, current_odds: dict) -> str:
@@ -75,71 +101,158 @@ class BotManager:
             return random.choice(list(current_odds.keys()))
 
 
+    def _preference_targets(self, current_odds: dict):
+        """
+        Resolves every preference to a horse once per tick, using the same rules as
+        _get_target_horse. Returns (horse_names, targets indexed by PREFERENCE_CODES).
+        """
+        horse_names = list(current_odds)
+        odds = np.array([current_odds[name]['odds'] for name in horse_names], dtype=np.float64)
+        win_rates = np.array([current_odds[name]['win_rate'] for name in horse_names], dtype=np.float64)
+        by_odds = np.argsort(odds, kind='stable')
+        targets = np.array([
+            by_odds[0],                                  # favorite
+            by_odds[int(len(horse_names) * 0.75)],       # longshot: bottom 25% of odds
+            np.argmax(win_rates / (odds + 1)),           # value
+        ])
+        return horse_names, targets
+
+    def decide_tick(self, tick: int, num_ticks: int, current_odds: dict):
+        """
+        Decides every bot's action for one tick in a single vectorized pass.
+        Returns (bot_indices, horse_names, wagers) for the bots that bet this tick.
+        """
+        if not current_odds or len(self.bot_names) == 0:
+            return np.array([], dtype=np.int64), [], np.array([], dtype=np.int64)
+
+        current_time_ratio = (tick + 1) / num_ticks # e.g., 0.1, 0.2, ... 1.0
+        in_window = np.array([
+            current_time_ratio <= 0.3,                  # early
+            0.3 < current_time_ratio < 0.8,             # mid
+            current_time_ratio >= 0.8,                  # late
+            True,                                       # any
+        ])
+
+        # Bots with bets left, inside their window, win a roll spread out over that window
+        wants_to_bet = (self.bot_bets_placed < self.bot_max_bets) & (self.bot_timing >= 0)
+        wants_to_bet &= in_window[np.maximum(self.bot_timing, 0)]
+        wants_to_bet &= self.rng.random(len(self.bot_names)) < (1.0 / (num_ticks / 2))
+        bettors = np.flatnonzero(wants_to_bet)
+
+        # Targets: preference lookups for everyone at once, random picks for the rest
+        horse_names, preference_targets = self._preference_targets(current_odds)
+        preferences = self.bot_preference[bettors]
+        random_targets = self.rng.integers(0, len(horse_names), len(bettors))
+        targets = np.where(preferences >= 0, preference_targets[np.maximum(preferences, 0)], random_targets)
+
+        # Wagers: a share of bankroll or a flat amount, in whole CC
+        wagers = np.where(self.bot_is_percentage[bettors],
+                          self.bot_bankroll[bettors] * self.bot_wager_amount[bettors],
+                          self.bot_wager_amount[bettors]).astype(np.int64)
+
+        placing = wagers > 0
+        return bettors[placing], [horse_names[t] for t in targets[placing]], wagers[placing]
+
+    async def _submit_bets(self, bettors, horse_names, wagers, current_odds: dict):
+        """Sends one tick's bets as a single batched transaction and applies the per-bot results."""
+        bets = [
+            (self.bot_names[i], horse_name, int(wager), current_odds[horse_name]['odds'])
+            for i, horse_name, wager in zip(bettors, horse_names, wagers)
+        ]
+        placed = await asyncio.to_thread(database.place_bet_batch_transaction, self.race_id, bets)
+        if placed is None:
+            print(f"BOTS: Batch of {len(bets)} bets failed for race #{self.race_id}; these bots will try again next tick.")
+            return
+
+        succeeded = np.array([name in placed for name in self.bot_names[bettors]], dtype=bool)
+        self.bot_bets_placed[bettors[succeeded]] += 1
+        np.subtract.at(self.bot_bankroll, bettors[succeeded], wagers[succeeded])
+        for i in bettors[succeeded]:
+            bot = self.participating_bots[i]
+            self.bets_placed_this_race[bot['name']] += 1
+            # In a real scenario, we'd update the bot's bankroll in the DB
+            bot['bankroll'] = float(self.bot_bankroll[i])
+
+        print(f"BOT ACTION: {int(succeeded.sum())} bots placed {int(wagers[succeeded].sum())} CC in bets on race #{self.race_id}.")
+        if not succeeded.all():
+            failed = ", ".join(self.bot_names[bettors[~succeeded]])
+            print(f"BOTS: {int((~succeeded).sum())} bets rejected (insufficient funds or no wallet): {failed}")
+
     async def run_betting_cycle(self, duration_seconds: int = 120, tick_interval: int = 10):
         """
         The main engine loop that simulates bot betting over time.
+        Each tick is one vectorized decision pass and at most one database transaction.
 
         Args:
             duration_seconds (int): The total length of the betting window.
             tick_interval (int): How often the loop should wake up to check for bets.
         """
         num_ticks = duration_seconds // tick_interval
-        
+
         for i in range(num_ticks):
-            current_time_ratio = (i + 1) / num_ticks # e.g., 0.1, 0.2, ... 1.0
-
-            for bot in self.participating_bots:
-                # Check if bot has already placed its max number of bets
-                if self.bets_placed_this_race[bot['name']] >= bot.get('max_bets_per_race', 1):
-                    continue
-
-                # Determine if this is the right time for the bot to bet
-                timing = bot.get('bet_timing', 'any')
-                should_bet_now = False
-                if (timing == 'early' and current_time_ratio <= 0.3) or \
-                   (timing == 'mid' and 0.3 < current_time_ratio < 0.8) or \
-                   (timing == 'late' and current_time_ratio >= 0.8) or \
-                   (timing == 'any'):
-                    
-                    # This is the bot's window, give it a chance to bet
-                    # The probability is spread out over its available window
-                    if random.random() < (1.0 / (num_ticks / 2)): # Simple probability
-                        should_bet_now = True
-
-                if should_bet_now:
-                    # --- IT'S TIME TO BET ---
-                    # 1. Select Target
-                    target_horse = self._get_target_horse(
-                        bot.get('target_preference', 'random'),
-                        self.bookie.morning_line_odds # For now, uses morning line
-                    )
-                    if not target_horse: continue
-
-                    # 2. Calculate Wager
-                    wager = 0
-                    if bot.get('wager_strategy') == 'percentage':
-                        wager = bot['bankroll'] * bot['wager_amount']
-                    else: # flat
-                        wager = bot['wager_amount']
-                    
-                    wager = int(wager) # Bet whole numbers
-                    if wager <= 0: continue
-                    
-                    # 3. Place Bet via Database
-                    print(f"BOT ACTION: {bot['name']} is placing a {wager} CC bet on {target_horse}.")
-                    success = database.place_bet_transaction(
-                        race_id=self.race_id,
-                        bettor_id=bot['name'],
-                        horse_name=target_horse,
-                        amount=wager,
-                        odds=self.bookie.morning_line_odds[target_horse]['odds']
-                    )
-
-                    if success:
-                        self.bets_placed_this_race[bot['name']] += 1
-                        # In a real scenario, we'd update the bot's bankroll in the DB
-                        bot['bankroll'] -= wager 
-            
+            current_odds = self.bookie.morning_line_odds # For now, uses morning line
+            bettors, horse_names, wagers = self.decide_tick(i, num_ticks, current_odds)
+            if len(bettors) > 0:
+                await self._submit_bets(bettors, horse_names, wagers, current_odds)
+
             await asyncio.sleep(tick_interval)
-        
-        print(f"BOTS: Betting cycle complete for race #{self.race_id}.")
\ No newline at end of file
+
+        print(f"BOTS: Betting cycle complete for race #{self.race_id}.")
+
+
+def benchmark_betting_engine(num_bots: int = 1000, num_horses: int = 10, num_ticks: int = 12, seed: int = 7):
+    """
+    Times one full betting window's decisions for a large bot population, vectorized
+    versus the old one-bot-at-a-time loop. The database is not touched: the point is that
+    the per-tick cost no longer grows with a Python loop and a connection per bet.
+    """
+    with open('horse_racing_game/configs/bot_personalities.json', 'r') as f:
+        templates = json.load(f)
+    bots = []
+    for i in range(num_bots):
+        bot = dict(templates[i % len(templates)])
+        bot['name'] = f"{bot['name']}_{i}"
+        bot['bet_frequency'] = 1.0
+        bots.append(bot)
+
+    rng = np.random.default_rng(seed)
+    win_rates = rng.dirichlet(np.ones(num_horses))
+    odds = {f"Horse {h}": {"win_rate": float(w), "odds": float(1 / w - 1)} for h, w in enumerate(win_rates)}
+    bookie = SimpleNamespace(morning_line_odds=odds)
+
+    manager = BotManager(race_id=0, bookie=bookie, bots=[dict(b) for b in bots], rng=rng)
+    start = time.perf_counter()
+    vectorized_bets = 0
+    for tick in range(num_ticks):
+        bettors, horse_names, wagers = manager.decide_tick(tick, num_ticks, odds)
+        manager.bot_bets_placed[bettors] += 1
+        vectorized_bets += len(bettors)
+    vectorized_seconds = time.perf_counter() - start
+
+    legacy = BotManager(race_id=0, bookie=bookie, bots=[dict(b) for b in bots], rng=rng)
+    start = time.perf_counter()
+    legacy_bets = 0
+    for tick in range(num_ticks):
+        ratio = (tick + 1) / num_ticks
+        for bot in legacy.participating_bots:
+            if legacy.bets_placed_this_race[bot['name']] >= bot.get('max_bets_per_race', 1):
+                continue
+            timing = bot.get('bet_timing', 'any')
+            if ((timing == 'early' and ratio <= 0.3) or (timing == 'mid' and 0.3 < ratio < 0.8) or
+                    (timing == 'late' and ratio >= 0.8) or timing == 'any') and random.random() < (1.0 / (num_ticks / 2)):
+                target = legacy._get_target_horse(bot.get('target_preference', 'random'), odds)
+                wager = int(bot['bankroll'] * bot['wager_amount'] if bot.get('wager_strategy') == 'percentage' else bot['wager_amount'])
+                if target and wager > 0:
+                    legacy.bets_placed_this_race[bot['name']] += 1
+                    legacy_bets += 1
+    legacy_seconds = time.perf_counter() - start
+
+    print(f"--- Bot betting benchmark: {num_bots} bots, {num_ticks} ticks ---")
+    print(f"Vectorized: {vectorized_seconds * 1000:.1f} ms for {vectorized_bets} bets in {num_ticks} transactions")
+    print(f"Per-bot loop: {legacy_seconds * 1000:.1f} ms for {legacy_bets} bets in {legacy_bets} transactions")
+    return vectorized_seconds, legacy_seconds
+
+
+if __name__ == "__main__":
+    # Run from the repo root: python -m horse_racing_game.race_bots
+    benchmark_betting_engine()
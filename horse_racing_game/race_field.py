@@ -0,0 +1,89 @@
+# race_field.py
+import random
+from .race_logic import Horse
+from .race_logic_v2 import Horse as HorseV2, get_attribute_registry
+
+# --- Race field generation, shared by the live game and the offline season simulator ---
+
+DEFINED_HORSES = ["Sakura Bakushin Oh", "Marzensty", "El", "Oguri Hat", "Gold Trip", "Earth Rut"]
+
+HORSE_NAME_PARTS = {
+    "adjectives": ["Galloping", "Midnight", "Dusty", "Iron", "Star", "Thunder", "Shadow", "Golden", "Baggins", "Cheating", "BOT", "Nice", "Mean", "Godly", "Inspector", "Dishonest", "Old School", "Broken", "Neon", "Lucky", "Turbo", "Sticky", "Captain", "Major", "Wild", "Furious", "Stoic", "Noble", "Cash"],
+    "nouns": ["Bullet", "Fury", "Runner", "Chaser", "Stallion", "Dreamer", "Comet", "Baggins", "Cheater", "God", "Nature", "Gadget", "Wave", "Insomnia", "Twice", "Epidemic", "King", "Queen", "Jester", "Engine", "Glitch", "Rocket", "Mirror", "Major", "Pilgrim", "Mountain", "Crew"]
+}
+HORSE_STRATEGIES = ["Front Runner", "Pace Chaser", "Late Surger", "End Closer"]
+GENERIC_SKILLS = ["Straightaway Adept", "Homestretch Haste", "Slipstream", "Late Start"]
+UNIQUE_HORSES = {
+    "Sakura Bakushin Oh": {"strategy": "Front Runner", "skills": ["Huge Lead"]},
+    "Marzensty": {"strategy": "Front Runner", "skills": ["Early Lead"]},
+    "El": {"strategy": "Pace Chaser", "skills": ["Victoria por plata"]},
+    "Oguri Hat": {"strategy": "Pace Chaser", "skills": ["Trumpet Blast"]},
+    "Gold Trip": {"strategy": "End Closer", "skills": ["Uma Stan"]},
+    "Earth Rut": {"strategy": "Pace Chaser", "skills": ["Fiery Satisfaction"]},
+}
+
+def generate_race_field(num_horses_needed):
+    """
+    Generates a list of horse names for a race, prioritizing defined horses
+    and filling the rest with unique, randomly generated names.
+    """
+    # 1. Start with the list of defined horses.
+    available_horses = DEFINED_HORSES[:]
+
+    # 2. Generate additional random horses if needed.
+    while len(available_horses) < num_horses_needed:
+        adj = random.choice(HORSE_NAME_PARTS["adjectives"])
+        noun = random.choice(HORSE_NAME_PARTS["nouns"])
+        new_name = f"{adj} {noun}"
+
+        # 3. Ensure the new name is unique before adding it.
+        if new_name not in available_horses:
+            available_horses.append(new_name)
+
+    # 4. Shuffle the list and return the exact number needed for the race.
+    random.shuffle(available_horses)
+    return available_horses[:num_horses_needed]
+
+def build_race_horses(num_horses: int) -> list:
+    """
+    Builds a full v1 field: defined horses keep their signature strategy and skills,
+    generated horses get a random strategy and up to two generic skills.
+    """
+    horses = []
+    for i, horse_name in enumerate(generate_race_field(num_horses), 1):
+        if horse_name in UNIQUE_HORSES:
+            horse_data = UNIQUE_HORSES[horse_name]
+            horses.append(Horse(number=i, name=horse_name, strategy=horse_data['strategy'], skills=horse_data['skills'][:]))
+        else:
+            skills_list = random.sample(GENERIC_SKILLS, k=random.randint(0, 2))
+            horses.append(Horse(number=i, name=horse_name, strategy=random.choice(HORSE_STRATEGIES), skills=skills_list))
+    return horses
+
+def generate_random_horse_field(num_horses: int) -> list:
+    """
+    Reads the attributes config and generates a list of unique, random horses.
+    """
+    try:
+        registry = get_attribute_registry()
+    except FileNotFoundError:
+        print("ERROR: horse_attributes.json not found. Cannot generate horses.")
+        return []
+
+    adjectives = registry.adjective_names
+    nouns = registry.noun_names
+    strategies = registry.strategy_names
+
+    generated_horses = []
+    used_names = set()
+
+    while len(generated_horses) < num_horses:
+        adj = random.choice(adjectives)
+        noun = random.choice(nouns)
+        name = f"{adj} {noun}"
+
+        if name not in used_names:
+            used_names.add(name)
+            strategy = random.choice(strategies)
+            generated_horses.append(HorseV2(name, strategy))
+
+    return generated_horses
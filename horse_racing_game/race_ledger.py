@@ -0,0 +1,210 @@
+# race_ledger.py
+import os
+import json
+import threading
+from datetime import datetime
+import pandas as pd
+
+RACE_LEDGER_WAL = 'horse_racing_game/data/race_ledger.wal'
+RACES_CSV = 'horse_racing_game/data/races.csv'
+RACE_BETS_CSV = 'horse_racing_game/data/race_bets.csv'
+
+BET_COLUMNS = ['race_id', 'bettor_id', 'horse_number', 'bet_amount', 'odds_at_bet', 'time_left_in_window', 'winnings']
+
+class RaceLedgerWAL:
+    """
+    Append-only write-ahead log for live race state, one JSON record per line.
+
+    Every bet, status change and settlement is appended before the in-memory ledger applies it,
+    and callers await sync() (in an executor) before confirming anything, so a crash mid-race
+    loses nothing: on startup, recover_unfinished_races() replays the log for any race that
+    never reached the CSVs.
+
+    append() runs on the event loop but only writes and flushes; the fsync happens in sync(),
+    where concurrent callers share one fsync. One lock covers append() and the whole of
+    compact(), so a record can't be appended between compact's read and its replace.
+    """
+    def __init__(self, path: str = RACE_LEDGER_WAL):
+        self.path = path
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._appended = 0  # Records appended so far
+        self._synced = 0    # Records known to be on disk
+
+    def append(self, record: dict):
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(record) + "\n")
+            self._appended += 1
+
+    def sync(self):
+        """Blocks until every record appended so far is on disk. Blocking; run it in an executor."""
+        with self._sync_lock:
+            target = self._appended
+            if self._synced >= target:
+                return  # Another caller's fsync already covered these records
+            # fsync flushes the file, not just this descriptor; reopening by path also picks up
+            # the new file if compact() replaced it, and compact() fsyncs what it rewrites
+            with open(self.path, 'a') as f:
+                os.fsync(f.fileno())
+            self._synced = target
+
+    def replay(self):
+        """Yields every intact record in the log. A torn final line (crash mid-write) is skipped."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"Warning: Skipping unreadable record in {self.path}.")
+
+    def compact(self):
+        """
+        Rewrites the log keeping only records for races that have not been exported yet.
+        Blocking; run it in an executor. Appends from live races wait for it to finish.
+        """
+        with self._lock:
+            records = list(self.replay())
+            exported = {record['race_id'] for record in records if record['type'] == 'exported'}
+            kept = [record for record in records if record['race_id'] not in exported]
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w') as f:
+                for record in kept:
+                    f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+
+
+class RaceLedger:
+    """
+    The in-memory book for a single race: every bet, the running pot and per-horse totals.
+    Odds and pot lookups are O(1) and never touch the disk; the CSVs are written once, by export().
+    """
+    def __init__(self, race_id: int, wal: RaceLedgerWAL = None):
+        self.race_id = race_id
+        self.wal = wal
+        self.bets = []
+        self.total_pot = 0
+        self.horse_totals = {}
+        self.human_bet_count = 0
+        self.status = 'betting'
+        self.winner = None
+        self.race_row = None
+        self.start_time = None
+
+    def _log(self, record: dict):
+        if self.wal:
+            self.wal.append({'race_id': self.race_id, **record})
+
+    def open(self, race_row: dict):
+        """Logs the race's creation (the races.csv row) so recovery knows about it."""
+        self._log({'type': 'open', 'race': race_row})
+        self._apply_open(race_row)
+
+    def _apply_open(self, race_row: dict):
+        self.race_row = race_row
+        self.start_time = datetime.fromisoformat(race_row['start_time'])
+
+    def odds_for(self, horse_number: int) -> float:
+        """Current pool odds on a horse (to 1), or 0 if nobody has backed it yet."""
+        bets_on_horse = self.horse_totals.get(horse_number, 0)
+        return (self.total_pot - bets_on_horse) / bets_on_horse if bets_on_horse > 0 else 0
+
+    def record_bet(self, bettor_id: str, horse_number: int, bet_amount: int, time_left: float, is_human: bool = False) -> dict:
+        """Records a bet at the odds in effect before it was placed, matching the old CSV behaviour."""
+        bets_on_horse = self.horse_totals.get(horse_number, 0)
+        odds = (self.total_pot - bets_on_horse) / bets_on_horse if bets_on_horse > 0 else self.total_pot
+        bet = {
+            'race_id': self.race_id,
+            'bettor_id': str(bettor_id),
+            'horse_number': horse_number,
+            'bet_amount': bet_amount,
+            'odds_at_bet': round(odds, 2),
+            'time_left_in_window': round(time_left, 2),
+            'winnings': 0
+        }
+        self._log({'type': 'bet', 'bet': bet, 'is_human': is_human})
+        self._apply_bet(bet, is_human)
+        return bet
+
+    def _apply_bet(self, bet: dict, is_human: bool):
+        self.bets.append(bet)
+        self.total_pot += bet['bet_amount']
+        self.horse_totals[bet['horse_number']] = self.horse_totals.get(bet['horse_number'], 0) + bet['bet_amount']
+        if is_human:
+            self.human_bet_count += 1
+
+    def set_status(self, status: str):
+        self._log({'type': 'status', 'status': status})
+        self.status = status
+
+    def settle(self, winner_name: str, winnings: dict):
+        """Records the result. winnings maps bet index (position in self.bets) to the amount paid."""
+        self._log({'type': 'settled', 'winner': winner_name, 'winnings': {str(i): w for i, w in winnings.items()}})
+        self._apply_settlement(winner_name, winnings)
+
+    def _apply_settlement(self, winner_name: str, winnings: dict):
+        for i, amount in winnings.items():
+            self.bets[int(i)]['winnings'] = amount
+        self.winner = winner_name
+        self.status = 'finished'
+
+    def export(self):
+        """
+        Writes the finished race to the CSVs: its bets are appended to race_bets.csv and
+        its row in races.csv gets the final status and winner. Blocking; run it in an executor.
+        """
+        if self.bets:
+            pd.DataFrame(self.bets, columns=BET_COLUMNS).to_csv(RACE_BETS_CSV, mode='a', header=False, index=False)
+
+        races_df = pd.read_csv(RACES_CSV)
+        if self.race_row and not (races_df['race_id'] == self.race_id).any():
+            races_df = pd.concat([races_df, pd.DataFrame([self.race_row])], ignore_index=True)
+        races_df.loc[races_df['race_id'] == self.race_id, 'status'] = self.status
+        if self.winner is not None:
+            races_df['winner'] = races_df['winner'].astype(object)
+            races_df.loc[races_df['race_id'] == self.race_id, 'winner'] = self.winner
+        races_df.to_csv(RACES_CSV, index=False)
+        self._log({'type': 'exported'})
+
+    @classmethod
+    def from_records(cls, race_id: int, records: list, wal: RaceLedgerWAL = None):
+        """Rebuilds a ledger from its WAL records without re-logging them."""
+        ledger = cls(race_id, wal)
+        for record in records:
+            if record['type'] == 'open':
+                ledger._apply_open(record['race'])
+            elif record['type'] == 'bet':
+                ledger._apply_bet(record['bet'], record.get('is_human', False))
+            elif record['type'] == 'status':
+                ledger.status = record['status']
+            elif record['type'] == 'settled':
+                ledger._apply_settlement(record['winner'], record['winnings'])
+        return ledger
+
+
+def recover_unfinished_races(wal: RaceLedgerWAL) -> list:
+    """
+    Exports every race in the WAL that was opened but never exported (the bot stopped mid-race).
+    Unsettled races are marked 'interrupted' so /refund_race can return their bets.
+    Returns the recovered race IDs.
+    """
+    records_by_race = {}
+    for record in wal.replay():
+        records_by_race.setdefault(record['race_id'], []).append(record)
+
+    recovered = []
+    for race_id, records in records_by_race.items():
+        if any(record['type'] == 'exported' for record in records):
+            continue
+        ledger = RaceLedger.from_records(race_id, records, wal)
+        if ledger.status != 'finished':
+            ledger.status = 'interrupted'
+        ledger.export()
+        recovered.append(race_id)
+
+    wal.compact()
+    return recovered
@@ -1,6 +1,7 @@
 # race_logic.py
 import random
-from skills import SKILL_DEFINITIONS
+from bisect import bisect_left, bisect_right, insort
+from .skills import SKILL_DEFINITIONS
 
 # A simple dice roller
 def roll_dice(num_dice, sides=6):
@@ -19,6 +20,57 @@ class Horse:
     def __repr__(self):
         return f"Horse(#{self.number} {self.name}, Pos: {self.position})"
 
+class PositionIndex:
+    """
+    A sorted view of the field's positions for one round, updated as each horse moves.
+
+    Horses are ranked by position (highest first) with ties broken by their order in
+    race.horses, the same as a stable sort. Rank, k-th place, nearby counts and passes
+    are all answered with binary searches instead of re-sorting or scanning the field.
+    """
+    def __init__(self, horses):
+        self._order = {horse: i for i, horse in enumerate(horses)}
+        self._horses = list(horses)
+        self._ranked = sorted((-horse.position, i) for i, horse in enumerate(horses))
+        self._positions = sorted(horse.position for horse in horses)
+        self._indexed_position = {horse: horse.position for horse in horses}
+
+    def move(self, horse, new_position):
+        """Records a horse's new position."""
+        old_position = self._indexed_position[horse]
+        if old_position == new_position:
+            return
+        order = self._order[horse]
+        del self._ranked[bisect_left(self._ranked, (-old_position, order))]
+        insort(self._ranked, (-new_position, order))
+        del self._positions[bisect_left(self._positions, old_position)]
+        insort(self._positions, new_position)
+        self._indexed_position[horse] = new_position
+
+    def rank(self, horse):
+        """1-based rank of a horse."""
+        return bisect_left(self._ranked, (-self._indexed_position[horse], self._order[horse])) + 1
+
+    def horse_at_rank(self, k):
+        """The horse in k-th place (1-based). Raises IndexError if there is no such place."""
+        return self._horses[self._ranked[k - 1][1]]
+
+    def count_in_range(self, low, high):
+        """Number of horses with low <= position <= high."""
+        return bisect_right(self._positions, high) - bisect_left(self._positions, low)
+
+    def count_between(self, low, high):
+        """Number of horses with low < position < high."""
+        if high <= low:
+            return 0
+        return bisect_left(self._positions, high) - bisect_right(self._positions, low)
+
+    def nearby_count(self, horse, space_range):
+        """Number of other horses within space_range of this horse."""
+        position = self._indexed_position[horse]
+        return self.count_in_range(position - space_range, position + space_range) - 1
+
+
 class Race:
     """Manages the state and simulation of a single horse race."""
     def __init__(self, race_id, track_length):
@@ -30,9 +82,12 @@ class Race:
         self.log = []
         self.full_race_log = []
         self.structured_log = []
+        self.index = PositionIndex(self.horses)
+        self.fair_probabilities = {} # {horse_number: {"win": p, "place": p}} from race_simulator_v1
 
     def add_horse(self, horse):
         self.horses.append(horse)
+        self.index = PositionIndex(self.horses)
 
     def get_leg(self, position):
         percent_complete = (position / self.track_length) * 100
@@ -102,6 +157,9 @@ class Race:
              self.is_final_round = True
              self.log.append("🔔 The final bell rings! This is the last round!")
 
+        # Rebuilt once per round (race.horses is re-sorted between rounds), then kept current as horses move
+        self.index = PositionIndex(self.horses)
+
         for horse in sorted(self.horses, key=lambda h: h.number):
             current_leg = self.get_leg(horse.position)
             skill_bonus, extra_movement = 0, 0
@@ -131,9 +189,10 @@ class Race:
             total_movement = max(0, base_roll_total + skill_bonus)
             pos_before = horse.position
             horse.position += total_movement
+            self.index.move(horse, horse.position)
 
             # --- POST-ROLL SKILL CHECKS ---
-            horses_passed = len([h for h in self.horses if h != horse and pos_before < h.position < horse.position])
+            horses_passed = self.index.count_between(pos_before, horse.position)
             extra_movement = 0
             context = {"horses_passed": horses_passed}
 
@@ -146,6 +205,7 @@ class Race:
                         extra_movement += effect.get("extra_movement", 0)
             
             horse.position += extra_movement
+            self.index.move(horse, horse.position)
 
             # --- LOGGING ---
             rolls_str = ' + '.join(map(str, base_rolls))
@@ -1,14 +1,96 @@
 import json
+import os
 import random
+import threading
 import numpy as np
+from collections import namedtuple
 from copy import deepcopy
+from types import MappingProxyType
+
+HORSE_ATTRIBUTES_FILE = 'horse_racing_game/configs/horse_attributes.json'
+RACE_PHASES = ('early_race', 'mid_race', 'late_race')
+
+# Compact, immutable stat record shared by every horse with the same name/strategy combination
+StatProfile = namedtuple('StatProfile', ['means', 'sigmas', 'preferred_distance'])
+
+class HorseAttributeRegistry:
+    """
+    An immutable, pre-indexed view of horse_attributes.json.
+    Strategies, adjectives and nouns are reduced to plain numbers once, and the resulting
+    StatProfile for each (name, strategy) is memoized so horses share it instead of each
+    holding a copy of the config.
+    """
+    def __init__(self, config: dict, mtime_ns: int = None):
+        self.mtime_ns = mtime_ns
+        self.strategies = MappingProxyType({
+            name: (tuple(stats[phase]['mean'] for phase in RACE_PHASES),
+                   tuple(stats[phase]['sigma'] for phase in RACE_PHASES))
+            for name, stats in config['strategies'].items()
+        })
+        self.adjectives = MappingProxyType({
+            name: values.get('sigma_modifier', 0) for name, values in config['adjectives'].items()
+        })
+        self.nouns = MappingProxyType({
+            name: (values.get('mean_modifier', 0), values.get('preferred_distance', 2400))
+            for name, values in config['nouns'].items()
+        })
+        self.strategy_names = tuple(self.strategies)
+        self.adjective_names = tuple(self.adjectives)
+        self.noun_names = tuple(self.nouns)
+        self._profiles = {}
+
+    def profile(self, name: str, strategy: str) -> StatProfile:
+        """Returns the (memoized) StatProfile for a horse name and strategy."""
+        key = (name, strategy)
+        profile = self._profiles.get(key)
+        if profile is not None:
+            return profile
+
+        try:
+            adjective, noun = name.split(' ', 1)
+        except ValueError:
+            print(f"Warning: Could not parse name '{name}'. Using default modifiers.")
+            adjective, noun = None, None
+
+        base_means, base_sigmas = self.strategies[strategy]
+        sigma_modifier = self.adjectives.get(adjective, 0)
+        mean_modifier, preferred_distance = self.nouns.get(noun, (0, 2400))
+
+        profile = StatProfile(
+            means=tuple(mean + mean_modifier for mean in base_means),
+            # Ensure sigma is at least 1 to avoid statistical errors
+            sigmas=tuple(max(1, sigma + sigma_modifier) for sigma in base_sigmas),
+            preferred_distance=preferred_distance
+        )
+        self._profiles[key] = profile
+        return profile
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_attribute_registry(path: str = HORSE_ATTRIBUTES_FILE) -> HorseAttributeRegistry:
+    """Returns the shared attribute registry, reloading it only if the config file has changed."""
+    global _registry
+    mtime_ns = os.stat(path).st_mtime_ns
+    registry = _registry
+    if registry is not None and registry.mtime_ns == mtime_ns:
+        return registry
+    with _registry_lock:
+        if _registry is None or _registry.mtime_ns != mtime_ns:
+            with open(path, 'r') as f:
+                _registry = HorseAttributeRegistry(json.load(f), mtime_ns)
+        return _registry
 
 class Horse:
     """
     Represents a procedurally generated horse with a unique statistical profile
     derived from its name and a central configuration file.
+
+    Horses are immutable (all race state lives on the Race), so copying a race
+    for a Monte Carlo run shares its Horse objects instead of cloning them.
     """
-    
+    __slots__ = ('name', 'strategy_name', 'profile')
+
     def __init__(self, name: str, strategy: str):
         """
         Initializes a Horse object.
@@ -19,47 +101,22 @@ class Horse:
         """
         self.name = name
         self.strategy_name = strategy
-        self.stats = {} # Will hold the final calculated stats
-
-        # Load the configuration file that defines all attributes
-        with open('horse_racing_game/configs/horse_attributes.json', 'r') as f:
-            self.attributes_config = json.load(f)
-            
-        self._calculate_stats()
-
-    def _calculate_stats(self):
-        """
-        Parses the horse's name and the attributes configuration to calculate
-        the final mean (μ) and sigma (σ) for each phase of the race.
-        """
-        try:
-            adjective, noun = self.name.split(' ', 1)
-        except ValueError:
-            print(f"Warning: Could not parse name '{self.name}'. Using default modifiers.")
-            adjective, noun = None, None
+        self.profile = get_attribute_registry().profile(name, strategy)
 
-        # 1. Get base stats from the horse's strategy
-        strategy_stats = self.attributes_config['strategies'][self.strategy_name]
+    def __deepcopy__(self, memo):
+        return self
 
-        # 2. Get modifiers from the adjective and noun
-        adj_mod = self.attributes_config['adjectives'].get(adjective, {"sigma_modifier": 0})
-        noun_mod = self.attributes_config['nouns'].get(noun, {"mean_modifier": 0, "preferred_distance": 2400})
+    @property
+    def preferred_distance(self):
+        return self.profile.preferred_distance
 
-        # 3. Calculate final stats for each race phase
-        for phase in ['early_race', 'mid_race', 'late_race']:
-            base_mean = strategy_stats[phase]['mean']
-            base_sigma = strategy_stats[phase]['sigma']
-            
-            final_mean = base_mean + noun_mod['mean_modifier']
-            final_sigma = base_sigma + adj_mod['sigma_modifier']
-            
-            self.stats[phase] = {
-                "mean": final_mean,
-                "sigma": max(1, final_sigma) # Ensure sigma is at least 1 to avoid statistical errors
-            }
-        
-        # 4. Store preferred distance
-        self.preferred_distance = noun_mod['preferred_distance']
+    @property
+    def stats(self) -> dict:
+        """The final mean (μ) and sigma (σ) for each phase of the race, as a plain dict."""
+        return {
+            phase: {"mean": self.profile.means[i], "sigma": self.profile.sigmas[i]}
+            for i, phase in enumerate(RACE_PHASES)
+        }
 
     def display_stats(self):
         """A helper method for debugging and verification."""
@@ -68,7 +125,7 @@ class Horse:
         for phase, values in self.stats.items():
             print(f"  {phase.title()}: μ = {values['mean']}, σ = {values['sigma']}")
         print("-" * 20)
-        
+
 # # --- Test Code ---
 # horse1 = Horse("Iron Fury", "Pace Chaser")
 # horse1.display_stats()
@@ -129,10 +186,10 @@ class Race:
         current_phase = self._get_current_phase()
         self.log.append(f"--- Round {self.round_number} ({current_phase.replace('_', ' ').title()}) ---")
 
+        phase_index = RACE_PHASES.index(current_phase)
         for horse in self.horses:
-            stats = horse.stats[current_phase]
-            base_mean = stats['mean']
-            sigma = stats['sigma']
+            base_mean = horse.profile.means[phase_index]
+            sigma = horse.profile.sigmas[phase_index]
             
             # Apply the distance suitability penalty to the mean
             distance_multiplier = self._calculate_distance_penalty(horse)
@@ -178,27 +235,126 @@ class Race:
 #     print(entry)
 
 import json
+import math
 import random
+import time
 import numpy as np
 from copy import deepcopy # Needed for Monte Carlo simulation
+from .odds_cache import get_default_odds_cache
 
 # (The Horse and Race classes from the previous epic remain here)
 
+# --- Vectorized Monte Carlo Engine ---
+PHASES = RACE_PHASES
+FINISHERS_TO_END_RACE = 5
+
+def phase_indices(first_round: int, num_rounds: int) -> np.ndarray:
+    """
+    Phase index (0=early, 1=mid, 2=late) for rounds first_round+1 .. first_round+num_rounds,
+    using the same boundaries as Race._get_current_phase.
+    """
+    rounds = np.arange(first_round + 1, first_round + num_rounds + 1)
+    return np.where(rounds <= 3, 0, np.where(rounds <= 15, 1, 2))
+
+def simulate_win_counts(means: np.ndarray, sigmas: np.ndarray, distance: float, simulations: int,
+                        rng: np.random.Generator = None, chunk_size: int = 5000) -> np.ndarray:
+    """
+    Simulates many races at once and returns how often each horse won.
+
+    Args:
+        means (np.ndarray): (horses x 3) per-phase means, distance penalty already applied.
+        sigmas (np.ndarray): (horses x 3) per-phase sigmas.
+        distance (float): Race distance in meters.
+        simulations (int): Number of races to simulate.
+
+    Each block draws a (rounds x simulations x horses) movement array, clips it at zero,
+    and accumulates it over rounds. A race ends on the first round where enough horses
+    are past the line; its winner is the horse furthest along at that round, exactly as in
+    Race.is_finished / Race.get_results (ties go to the earlier horse, like the stable sort).
+    """
+    rng = rng or np.random.default_rng()
+    means = np.asarray(means, dtype=float)
+    sigmas = np.asarray(sigmas, dtype=float)
+    num_horses = means.shape[0]
+    finishers_needed = min(FINISHERS_TO_END_RACE, num_horses)
+    # Drawing the normals is most of the cost, so draw little past the round a race usually ends:
+    # when the horse needed to make up the finishers (the 5th fastest) gets there at its slowest
+    # phase mean. The few races still running get short follow-up blocks.
+    slowest_means = np.sort(means.min(axis=1))[::-1]
+    first_rounds = int(math.ceil(distance / max(float(slowest_means[finishers_needed - 1]), 1.0))) + 1
+    extra_rounds = 4
+
+    win_counts = np.zeros(num_horses, dtype=np.int64)
+    for chunk_start in range(0, simulations, chunk_size):
+        chunk = min(chunk_size, simulations - chunk_start)
+        positions = np.zeros((chunk, num_horses), dtype=np.float32)
+        active = np.arange(chunk)
+        rounds_done = 0
+
+        while active.size:
+            block_rounds = first_rounds if rounds_done == 0 else extra_rounds
+            phases = phase_indices(rounds_done, block_rounds)
+            # Same as rng.normal(means, sigmas) per round, but float32 and without broadcasting
+            # loc/scale for every draw
+            cumulative = rng.standard_normal((block_rounds, active.size, num_horses), dtype=np.float32)
+            cumulative *= sigmas[:, phases].T[:, None, :].astype(np.float32)
+            cumulative += means[:, phases].T[:, None, :].astype(np.float32)
+            np.maximum(cumulative, 0, out=cumulative) # A horse cannot move backwards
+            if rounds_done:
+                cumulative[0] += positions[active]
+            for r in range(1, block_rounds): # Round by round is much faster than np.cumsum here
+                cumulative[r] += cumulative[r - 1]
+
+            # Positions never go down, so the rounds a horse spends short of the line are the
+            # index of the round it crosses; the race ends when the last needed finisher crosses
+            crossing_round = (cumulative < distance).sum(axis=0)  # (sims x horses)
+            finish_round = np.partition(crossing_round, finishers_needed - 1, axis=1)[:, finishers_needed - 1]
+            done = finish_round < block_rounds
+
+            done_idx = np.nonzero(done)[0]
+            final_positions = cumulative[finish_round[done_idx], done_idx, :]
+            win_counts += np.bincount(final_positions.argmax(axis=1), minlength=num_horses)
+
+            positions[active] = cumulative[-1]
+            active = active[~done]
+            rounds_done += block_rounds
+
+    return win_counts
+
+def chi_square_homogeneity(counts_a: np.ndarray, counts_b: np.ndarray) -> dict:
+    """
+    Chi-square test that two sets of win counts come from the same distribution.
+    The p-value uses the Wilson-Hilferty normal approximation, so no scipy is needed.
+    """
+    table = np.vstack([counts_a, counts_b]).astype(float)
+    table = table[:, table.sum(axis=0) > 0] # Horses that never won in either engine carry no information
+    expected = table.sum(axis=1, keepdims=True) * table.sum(axis=0, keepdims=True) / table.sum()
+    statistic = float(((table - expected) ** 2 / expected).sum())
+    dof = table.shape[1] - 1
+    if dof <= 0:
+        return {"statistic": statistic, "dof": dof, "p_value": 1.0}
+    z = ((statistic / dof) ** (1 / 3) - (1 - 2 / (9 * dof))) / math.sqrt(2 / (9 * dof))
+    p_value = 0.5 * math.erfc(z / math.sqrt(2))
+    return {"statistic": statistic, "dof": dof, "p_value": p_value}
+
 class Bookie:
     """
     Manages the odds and betting for a given race, acting as the house.
     """
     
-    def __init__(self, race_to_manage, house_vig=0.08):
+    def __init__(self, race_to_manage, house_vig=0.08, odds_cache=None):
         """
         Initializes the Bookie.
 
         Args:
             race_to_manage (Race): The Race object this bookie is managing.
             house_vig (float): The house edge or "vig" (e.g., 0.08 for 8%).
+            odds_cache (OddsCache): Where simulated win counts are reused from.
+                Defaults to the shared on-disk cache.
         """
         self.race = race_to_manage
         self.house_vig = house_vig
+        self.odds_cache = odds_cache
         self.morning_line_odds = {}
         self.bets = [] # Using an in-memory list as discussed
         self.total_liability = {horse.name: 0 for horse in self.race.horses}
@@ -219,10 +375,48 @@ class Bookie:
         
         return max(0.1, final_odds) # Ensure odds are never zero or negative
 
-    def run_monte_carlo(self, simulations: int = 10000):
+    def _phase_arrays(self):
+        """Builds the (horses x 3) mean and sigma arrays the vectorized engine consumes."""
+        means = np.empty((len(self.race.horses), len(PHASES)))
+        sigmas = np.empty_like(means)
+        for i, horse in enumerate(self.race.horses):
+            distance_multiplier = self.race._calculate_distance_penalty(horse)
+            means[i] = np.multiply(horse.profile.means, distance_multiplier)
+            sigmas[i] = horse.profile.sigmas
+        return means, sigmas
+
+    def _set_odds_from_win_counts(self, win_counts, simulations: int):
+        for horse, wins in zip(self.race.horses, win_counts):
+            win_rate = int(wins) / simulations
+            self.morning_line_odds[horse.name] = {
+                "win_rate": win_rate,
+                "odds": self._calculate_odds_from_win_rate(win_rate)
+            }
+
+    def run_monte_carlo(self, simulations: int = 10000, use_cache: bool = True, verbose: bool = True):
         """
-        Runs a Monte Carlo simulation to determine the win probabilities
+        Runs a vectorized Monte Carlo simulation to determine the win probabilities
         for each horse and sets the morning line odds.
+
+        With use_cache, a field whose stats have been simulated before with the same
+        number of simulations reuses those results instead of simulating again.
+        """
+        if verbose: print(f"Running Monte Carlo simulation with {simulations} iterations...")
+        means, sigmas = self._phase_arrays()
+        if use_cache:
+            cache = self.odds_cache or get_default_odds_cache()
+            win_counts, simulations = cache.get_win_counts(
+                means, sigmas, self.race.distance, simulations, simulate_win_counts
+            )
+        else:
+            win_counts = simulate_win_counts(means, sigmas, self.race.distance, simulations)
+        self._set_odds_from_win_counts(win_counts, simulations)
+        if verbose: print(f"Monte Carlo simulation complete ({simulations} races behind these odds). Morning line odds are set.")
+
+    def run_monte_carlo_sequential(self, simulations: int = 10000):
+        """
+        The original one-race-at-a-time simulation, kept as the reference implementation
+        that validate_monte_carlo() checks the vectorized engine against.
         """
         print(f"Running Monte Carlo simulation with {simulations} iterations...")
         win_counts = {horse.name: 0 for horse in self.race.horses}
@@ -251,6 +445,30 @@ class Bookie:
             }
         
         print("Monte Carlo simulation complete. Morning line odds are set.")
+        return win_counts
+
+    def validate_monte_carlo(self, simulations: int = 5000) -> dict:
+        """
+        Runs both engines on this race and chi-square tests their win counts.
+        A small p-value (e.g. < 0.01) means the engines disagree.
+        """
+        start = time.perf_counter()
+        sequential_counts = self.run_monte_carlo_sequential(simulations)
+        sequential_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        means, sigmas = self._phase_arrays()
+        vectorized_counts = simulate_win_counts(means, sigmas, self.race.distance, simulations)
+        vectorized_seconds = time.perf_counter() - start
+
+        sequential_counts = np.array([sequential_counts[h.name] for h in self.race.horses])
+        result = chi_square_homogeneity(sequential_counts, vectorized_counts)
+        result.update({
+            "sequential_counts": dict(zip((h.name for h in self.race.horses), sequential_counts.tolist())),
+            "vectorized_counts": dict(zip((h.name for h in self.race.horses), vectorized_counts.tolist())),
+            "speedup": sequential_seconds / vectorized_seconds if vectorized_seconds > 0 else float('inf'),
+        })
+        return result
         
     def place_bet(self, bettor_id: str, horse_name: str, amount: int):
         if horse_name not in self.morning_line_odds:
@@ -295,4 +513,8 @@ class Bookie:
 # print("\n--- Morning Line Odds ---")
 # for name, data in bookie.morning_line_odds.items():
 #     # Fractional odds are often displayed as "X to 1"
-#     print(f"{name}: {data['odds']:.2f} to 1 (Win Rate: {data['win_rate']:.2%})")
\ No newline at end of file
+#     print(f"{name}: {data['odds']:.2f} to 1 (Win Rate: {data['win_rate']:.2%})")
+# # --- Monte Carlo Engine Validation ---
+# bookie = Bookie(Race(test_horses, distance=1600))
+# check = bookie.validate_monte_carlo(simulations=5000)
+# print(f"chi2={check['statistic']:.2f} dof={check['dof']} p={check['p_value']:.3f} speedup={check['speedup']:.0f}x")
@@ -0,0 +1,168 @@
+# race_simulator_v1.py
+import numpy as np
+
+# --- Vectorized Monte Carlo for the dice-based (v1) race engine ---
+# Mirrors Race.run_round in race_logic.py rule for rule, but advances every simulated
+# race at once: each horse's turn is a handful of array operations over all simulations.
+# Horses still move one at a time within a round (skills look at positions mid-round),
+# so the loops are rounds x horses x skills, never simulations.
+
+LEG_OPENING, LEG_MIDDLE, LEG_FINAL = 0, 1, 2
+MAX_DICE = 4
+FINAL_ROUND_LOOKAHEAD = 18
+
+# (num_dice, modifier) per strategy and leg, matching Race._calculate_base_roll
+STRATEGY_DICE = {
+    "Front Runner": ((3, 0), (2, 0), (2, -2)),
+    "Pace Chaser":  ((2, 0), (2, 1), (2, 2)),
+    "Late Surger":  ((2, -1), (2, 0), (3, 2)),
+    "End Closer":   ((1, 0), (2, -2), (4, 0)),
+}
+DEFAULT_DICE = ((2, 0), (2, 0), (2, 0))
+
+def _legs(positions, track_length):
+    """Leg index for each position, using the same percentage cut-offs as Race.get_leg."""
+    percent_complete = positions / track_length * 100
+    return np.where(percent_complete <= 30, LEG_OPENING, np.where(percent_complete <= 75, LEG_MIDDLE, LEG_FINAL))
+
+
+class _RoundView:
+    """
+    Rank/proximity lookups for one horse's turn, computed once and shared by all of its skill checks.
+    Ties in rank are broken by the horses' order in race.horses, like PositionIndex in race_logic.py.
+    """
+    def __init__(self, positions, list_order, i):
+        mine = positions[:, i:i + 1]
+        others = np.ones(positions.shape[1], dtype=bool)
+        others[i] = False
+        other_positions = positions[:, others]
+        ahead = (other_positions > mine) | ((other_positions == mine) & (list_order[:, others] < list_order[:, i:i + 1]))
+        self.rank = 1 + ahead.sum(axis=1)
+        self.best_other = other_positions.max(axis=1) if other_positions.shape[1] else np.full(len(positions), -np.inf)
+        gaps = other_positions - mine
+        self.nearby = (np.abs(gaps) <= 2).sum(axis=1)
+        self.slipstream = ((gaps == 1) | (gaps == 2)).any(axis=1)
+
+
+# Each pre-roll skill compiles to (condition, chance, roll_bonus) over a _RoundView.
+# Effects that are not a roll bonus (Huge Lead) are handled by name in simulate_race.
+PRE_ROLL_SKILLS = {
+    "Huge Lead": (
+        lambda v, leg, pos, state: (leg == LEG_MIDDLE) & (v.rank == 1) & (pos >= v.best_other + 8),
+        lambda v: 50, lambda v: 0),
+    "Victoria por plata": (
+        lambda v, leg, pos, state: (leg == LEG_FINAL) & (v.rank <= 2),
+        lambda v: 40, lambda v: 3),
+    "Trumpet Blast": (
+        lambda v, leg, pos, state: state['final_round'],
+        lambda v: 60, lambda v: 5),
+    "Uma Stan": (
+        lambda v, leg, pos, state: (leg != LEG_OPENING) & (v.nearby > 0),
+        lambda v: np.minimum(100, 10 * v.nearby), lambda v: v.nearby),
+    "Straightaway Adept": (
+        lambda v, leg, pos, state: leg == LEG_MIDDLE,
+        lambda v: 30, lambda v: 2),
+    "Homestretch Haste": (
+        lambda v, leg, pos, state: leg == LEG_FINAL,
+        lambda v: 35, lambda v: 3),
+    "Slipstream": (
+        lambda v, leg, pos, state: v.slipstream,
+        lambda v: 40, lambda v: 3),
+    "Late Start": (
+        lambda v, leg, pos, state: np.full(len(pos), state['round_number'] == 1),
+        lambda v: 20, lambda v: -1),
+}
+PASSIVE_SKILLS = {"Early Lead"}
+POST_ROLL_SKILLS = {"Fiery Satisfaction"}
+
+
+def simulate_race(race, simulations: int = 20000, rng: np.random.Generator = None) -> dict:
+    """
+    Simulates the rest of a v1 Race (from its current state) many times over.
+
+    Returns {horse_number: {"win": p, "place": p}} where "place" means finishing 1st or 2nd
+    in the final standings, and a photo finish is split evenly like the live tiebreaker roll.
+    """
+    rng = rng or np.random.default_rng()
+    horses = list(race.horses)
+    num_horses = len(horses)
+    for horse in horses:
+        for skill_name in horse.skills:
+            if skill_name not in PRE_ROLL_SKILLS and skill_name not in PASSIVE_SKILLS and skill_name not in POST_ROLL_SKILLS:
+                raise KeyError(f"Skill '{skill_name}' has no vectorized definition in race_simulator_v1.")
+
+    track_length = race.track_length
+    positions = np.tile(np.array([h.position for h in horses], dtype=np.int64), (simulations, 1))
+    list_order = np.tile(np.arange(num_horses), (simulations, 1))  # index of each horse in race.horses
+    penalty_negated = np.tile(np.array([h.final_leg_penalty_negated for h in horses]), (simulations, 1))
+    final_round = np.full(simulations, race.is_final_round)
+    finished = (positions >= track_length).any(axis=1)
+    round_number = race.round_number
+    turn_order = sorted(range(num_horses), key=lambda i: horses[i].number)
+    dice_table = {i: np.array(STRATEGY_DICE.get(horses[i].strategy, DEFAULT_DICE)) for i in range(num_horses)}
+
+    while not finished.all():
+        active = ~finished
+        round_number += 1
+        final_round |= active & ((positions + FINAL_ROUND_LOOKAHEAD) >= track_length).any(axis=1)
+        state = {'final_round': final_round, 'round_number': round_number}
+
+        for i in turn_order:
+            horse = horses[i]
+            pos_before = positions[:, i].copy()
+            leg = _legs(pos_before, track_length)
+
+            # --- PRE-ROLL SKILL CHECKS ---
+            skill_bonus = np.zeros(simulations, dtype=np.int64)
+            view = None
+            for skill_name in horse.skills:
+                compiled = PRE_ROLL_SKILLS.get(skill_name)
+                if compiled is None:
+                    continue
+                condition, chance, bonus = compiled
+                if view is None:
+                    view = _RoundView(positions, list_order, i)
+                activated = condition(view, leg, pos_before, state) & (rng.integers(1, 101, simulations) <= chance(view))
+                if skill_name == "Huge Lead":
+                    penalty_negated[:, i] |= activated
+                skill_bonus += np.where(activated, bonus(view), 0)
+
+            # --- MOVEMENT PHASE ---
+            num_dice, modifier = dice_table[i][leg].T
+            if horse.strategy == "Front Runner":
+                modifier = np.where((leg == LEG_FINAL) & penalty_negated[:, i], 0, modifier)
+            if "Early Lead" in horse.skills:
+                modifier = modifier + np.where(leg == LEG_OPENING, 2, 0)
+            dice = rng.integers(1, 7, (simulations, MAX_DICE))
+            dice_total = np.where(np.arange(MAX_DICE) < num_dice[:, None], dice, 0).sum(axis=1)
+            total_movement = np.maximum(0, dice_total + modifier + skill_bonus)
+            pos_after = pos_before + total_movement
+
+            # --- POST-ROLL SKILL CHECKS ---
+            if "Fiery Satisfaction" in horse.skills:
+                others = np.arange(num_horses) != i
+                horses_passed = ((pos_before[:, None] < positions[:, others]) & (positions[:, others] < pos_after[:, None])).sum(axis=1)
+                activated = (_legs(pos_after, track_length) == LEG_FINAL) & (horses_passed > 0) & (rng.integers(1, 101, simulations) <= 50)
+                pos_after = pos_after + np.where(activated, horses_passed, 0)
+
+            positions[:, i] = np.where(active, pos_after, pos_before)
+
+        # race.horses is re-sorted by position (stable) at the end of every round
+        new_order = np.lexsort((list_order, -positions), axis=1)
+        list_order = np.where(active[:, None], np.argsort(new_order, axis=1), list_order)
+        finished = (positions >= track_length).any(axis=1)
+
+    # --- RESULTS ---
+    top = positions.max(axis=1, keepdims=True)
+    tied = positions == top
+    win_share = tied / tied.sum(axis=1, keepdims=True)  # Photo finishes go to a fair tiebreaker
+    placed = list_order < 2
+
+    return {
+        horses[i].number: {"win": float(win_share[:, i].mean()), "place": float(placed[:, i].mean())}
+        for i in range(num_horses)
+    }
+
+def fair_odds_from_probability(probability: float) -> float:
+    """Fractional odds with no house edge, e.g. 0.25 -> 3.0 (3:1)."""
+    return (1 / probability) - 1 if probability > 0 else float('inf')
@@ -0,0 +1,300 @@
+# season_simulator.py
+import os
+import json
+import time
+import random
+import argparse
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from .race_logic import Race
+from .race_logic_v2 import Race as RaceV2, Bookie
+from .race_field import build_race_horses, generate_random_horse_field
+from .race_bots import BotManager
+from .odds_cache import OddsCache
+
+# --- Offline season simulator ---
+# Plays thousands of races end to end in memory (field generation, bot and synthetic
+# human betting, the race itself, settlement) to see how the house and the bots fare
+# over a long season. Nothing here touches Discord, the CSVs or the database.
+
+SEASON_OUTPUT_DIR = 'horse_racing_game/data/season_sim'
+
+# Mirrors the live v1 game in game_manager.py
+V1_STARTER_BOTS = ["StartingGateSally", "PaddockPete", "FirstTurnFrank", "BackstretchBarry",
+                   "HomestretchHarry", "GrandstandGus", "ClubhouseClara"]
+V1_SNIPER_BOTS = ["SniperSam", "DailyDoubleDoug", "PhotoFinishPhil"]
+V1_BOOKIE_BOT = "BagginsTheBookie"
+V1_BOT_STARTING_BANKROLL = 10000
+V1_SNIPER_CHECKS = 2  # Snipers roll every 5s in the last 10s of the window
+
+DEFAULT_SEASON_CONFIG = {
+    "engine": "v1",
+    "num_horses": 10,
+    "track_length": 60,           # v1
+    "distance": 2400,             # v2
+    "track_fee": 0.0789,          # v1 cut of every pot, paid into the jackpot
+    "jackpot_chance": 1 / 200,    # v1 chance the jackpot is added to the winners' pool
+    "house_vig": 0.08,            # v2 Bookie.house_vig
+    "morning_line_simulations": 500,  # v2 odds per race; the bulk of a v2 race's cost
+    "betting_ticks": 12,          # v2 BotManager ticks per betting window
+    "humans_per_race": 2.0,       # Poisson mean of synthetic human bets per race
+    "human_bet_median": 500,      # Lognormal median of a human bet, in CC
+    "human_bet_spread": 0.8,      # Lognormal sigma
+    "human_favorite_bias": 1.0,   # v2: 0 picks horses uniformly, 1 in proportion to win rate
+    "trajectory_every": 100,      # Record bot bankrolls every N races
+}
+
+
+def _human_bets(rng, config, num_horses, weights=None):
+    """Synthetic human bets for one race: a list of (horse_index, amount)."""
+    count = rng.poisson(config['humans_per_race'])
+    amounts = np.maximum(1, rng.lognormal(np.log(config['human_bet_median']), config['human_bet_spread'], count)).astype(int)
+    horses = rng.choice(num_horses, size=count, p=weights)
+    return list(zip(horses.tolist(), amounts.tolist()))
+
+
+def _simulate_v1_race(rng, config, bankrolls, state):
+    """
+    One parimutuel race, following run_complete_race: starter bots, BagginsTheBookie's
+    counter-bet on the first human bet, last-second snipers, the track fee into the jackpot
+    and a pool split among the winning bets. Returns the race record.
+    """
+    race = Race(race_id=state['races_run'], track_length=config['track_length'])
+    for horse in build_race_horses(config['num_horses']):
+        race.add_horse(horse)
+    num_horses = len(race.horses)
+    bets = []  # (bettor, horse_index, amount); horse_index is the horse's position in the field
+
+    # --- Betting window ---
+    if num_horses >= len(V1_STARTER_BOTS):
+        for bot_name, horse_index in zip(V1_STARTER_BOTS, rng.choice(num_horses, len(V1_STARTER_BOTS), replace=False)):
+            bankroll = bankrolls[bot_name]
+            amount = min(int(rng.integers(int(bankroll * 0.01), int(bankroll * 0.05) + 1)), int(bankroll))
+            if amount > 0:
+                bets.append((bot_name, int(horse_index), amount))
+
+    for i, (horse_index, amount) in enumerate(_human_bets(rng, config, num_horses)):
+        bets.append(('human', horse_index, amount))
+        if i == 0:
+            bankroll = bankrolls[V1_BOOKIE_BOT]
+            baggins_amount = min(int(rng.integers(int(amount * 0.6), int(amount * 1.2) + 1)), int(bankroll))
+            others = [h for h in range(num_horses) if h != horse_index]
+            if others and baggins_amount > 0:
+                bets.append((V1_BOOKIE_BOT, int(rng.choice(others)), baggins_amount))
+
+    for bot_name in V1_SNIPER_BOTS:
+        if rng.random() < 1 - (49 / 50) ** V1_SNIPER_CHECKS:
+            bankroll = bankrolls[bot_name]
+            amount = min(int(rng.integers(int(bankroll * 0.15), int(bankroll * 0.30) + 1)), int(bankroll))
+            if amount > 0:
+                bets.append((bot_name, int(rng.integers(num_horses)), amount))
+
+    total_pot = sum(amount for _, _, amount in bets)
+    if not bets:
+        return {"rounds": 0, "total_pot": 0, "payouts": 0, "house_pnl": 0.0, "cancelled": True}
+    for bettor, _, amount in bets:
+        if bettor != 'human':
+            bankrolls[bettor] -= amount
+
+    # --- The race ---
+    numbers = [horse.number for horse in race.horses]
+    while not race.is_finished():
+        race.run_round()
+    top_position = max(h.position for h in race.horses)
+    tied_winners = [h for h in race.horses if h.position == top_position]
+    winner_index = numbers.index(tied_winners[int(rng.integers(len(tied_winners)))].number)
+
+    # --- Settlement ---
+    track_fee = total_pot * config['track_fee']
+    winnings_pool = total_pot - track_fee
+    state['jackpot'] += track_fee
+    jackpot_paid = 0.0
+    if rng.random() < config['jackpot_chance'] and state['jackpot'] > 0:
+        jackpot_paid = state['jackpot']
+        winnings_pool += jackpot_paid
+        state['jackpot'] = 0.0
+
+    winning_total = sum(amount for _, horse_index, amount in bets if horse_index == winner_index)
+    payouts = 0.0
+    if winning_total > 0:
+        for bettor, horse_index, amount in bets:
+            if horse_index == winner_index:
+                winnings = winnings_pool * (amount / winning_total)
+                payouts += winnings
+                if bettor != 'human':
+                    bankrolls[bettor] += winnings
+
+    # The house keeps the fee (held in the jackpot) and any pool nobody bet on the winner for
+    return {"rounds": race.round_number, "total_pot": total_pot, "payouts": payouts,
+            "house_pnl": total_pot - payouts, "cancelled": False, "jackpot_paid": jackpot_paid}
+
+
+def _simulate_v2_race(rng, config, bot_profiles, odds_cache, state):
+    """
+    One fixed-odds race: the Bookie sets morning-line odds, BotManager's vectorized
+    decisions place the bot bets, humans lean towards likely winners, and winning
+    bets are paid at their locked-in odds. Returns the race record.
+    """
+    race = RaceV2(horses=generate_random_horse_field(config['num_horses']), distance=config['distance'])
+    bookie = Bookie(race, house_vig=config['house_vig'], odds_cache=odds_cache)
+    bookie.run_monte_carlo(config['morning_line_simulations'], verbose=False)
+    odds = bookie.morning_line_odds
+    horse_names = [horse.name for horse in race.horses]
+
+    bets = []  # (bettor, horse_name, amount, locked_in_odds)
+    manager = BotManager(state['races_run'], bookie, bots=bot_profiles, rng=rng, verbose=False)
+    for tick in range(config['betting_ticks']):
+        bettors, targets, wagers = manager.decide_tick(tick, config['betting_ticks'], odds)
+        for i, horse_name, wager in zip(bettors, targets, wagers):
+            bot = manager.participating_bots[i]
+            if bot['bankroll'] < wager:  # The wallet debit would be rejected
+                continue
+            bot['bankroll'] -= int(wager)
+            manager.bot_bankroll[i] = bot['bankroll']
+            manager.bot_bets_placed[i] += 1
+            bets.append((bot['name'], horse_name, int(wager), odds[horse_name]['odds']))
+
+    win_rates = np.array([odds[name]['win_rate'] for name in horse_names]) + 1e-9
+    weights = win_rates ** config['human_favorite_bias']
+    for horse_index, amount in _human_bets(rng, config, len(horse_names), weights / weights.sum()):
+        horse_name = horse_names[horse_index]
+        bets.append(('human', horse_name, amount, odds[horse_name]['odds']))
+
+    while not race.is_finished():
+        race.run_round()
+    winner = race.get_results()[0].name
+
+    total_pot = sum(amount for _, _, amount, _ in bets)
+    payouts = 0.0
+    bankroll_by_name = {bot['name']: bot for bot in bot_profiles}
+    for bettor, horse_name, amount, locked_in_odds in bets:
+        if horse_name == winner:
+            winnings = amount * (1 + locked_in_odds)
+            payouts += winnings
+            if bettor in bankroll_by_name:
+                bankroll_by_name[bettor]['bankroll'] += winnings
+
+    return {"rounds": race.round_number, "total_pot": total_pot, "payouts": payouts,
+            "house_pnl": total_pot - payouts, "cancelled": not bets, "jackpot_paid": 0.0}
+
+
+def run_season_shard(shard_index: int, num_races: int, config: dict, seed: int) -> dict:
+    """
+    Plays `num_races` consecutive races with one bot population. Runs in a worker process,
+    so all randomness (including the engines' use of `random` and `np.random`) is seeded here.
+    """
+    random.seed(seed)
+    np.random.seed(seed % (2 ** 32))
+    rng = np.random.default_rng(seed)
+    state = {'races_run': 0, 'jackpot': 0.0}
+    odds_cache = OddsCache(path=None)  # In-memory only; workers must not fight over the shared file
+
+    if config['engine'] == 'v1':
+        bankrolls = {name: float(V1_BOT_STARTING_BANKROLL) for name in V1_STARTER_BOTS + V1_SNIPER_BOTS + [V1_BOOKIE_BOT]}
+        read_bankrolls = lambda: bankrolls
+    else:
+        with open('horse_racing_game/configs/bot_personalities.json', 'r') as f:
+            bot_profiles = json.load(f)
+        read_bankrolls = lambda: {bot['name']: bot['bankroll'] for bot in bot_profiles}
+
+    records, trajectory = [], []
+    for race_number in range(num_races):
+        if config['engine'] == 'v1':
+            record = _simulate_v1_race(rng, config, bankrolls, state)
+        else:
+            record = _simulate_v2_race(rng, config, bot_profiles, odds_cache, state)
+        state['races_run'] += 1
+        record.update({"shard": shard_index, "race": race_number})
+        records.append(record)
+        if race_number % config['trajectory_every'] == 0 or race_number == num_races - 1:
+            trajectory.extend({"shard": shard_index, "race": race_number, "bot": name, "bankroll": bankroll}
+                              for name, bankroll in read_bankrolls().items())
+
+    return {"races": records, "trajectory": trajectory, "final_jackpot": state['jackpot']}
+
+
+def simulate_season(num_races: int = 100000, config: dict = None, workers: int = None,
+                    shard_size: int = 5000, seed: int = 0) -> dict:
+    """
+    Splits the season into shards of `shard_size` races and plays them across a process pool.
+    Each shard starts from fresh bot bankrolls, so trajectories are per shard.
+    Returns {"races": DataFrame, "trajectory": DataFrame, "summary": dict}.
+    """
+    config = {**DEFAULT_SEASON_CONFIG, **(config or {})}
+    shard_sizes = [shard_size] * (num_races // shard_size)
+    if num_races % shard_size:
+        shard_sizes.append(num_races % shard_size)
+    seeds = np.random.SeedSequence(seed).generate_state(len(shard_sizes)).tolist()
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_season_shard, i, size, config, seeds[i]) for i, size in enumerate(shard_sizes)]
+        shards = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+
+    races_df = pd.DataFrame([record for shard in shards for record in shard['races']])
+    trajectory_df = pd.DataFrame([point for shard in shards for point in shard['trajectory']])
+    return {"races": races_df, "trajectory": trajectory_df,
+            "summary": summarize_season(races_df, trajectory_df, config, elapsed)}
+
+
+def summarize_season(races_df: pd.DataFrame, trajectory_df: pd.DataFrame, config: dict, elapsed: float) -> dict:
+    """House P&L distribution, race-length stats and where the bots ended up."""
+    ran = races_df[~races_df['cancelled']]
+    pnl = ran['house_pnl']
+    shard_pnl = ran.groupby('shard')['house_pnl'].sum()
+    final_bankrolls = trajectory_df.sort_values('race').groupby(['shard', 'bot'])['bankroll'].last().groupby('bot').describe()
+    return {
+        "config": config,
+        "races": int(len(races_df)),
+        "cancelled": int(races_df['cancelled'].sum()),
+        "seconds": round(elapsed, 1),
+        "house_pnl": {
+            "total": float(pnl.sum()),
+            "per_race_mean": float(pnl.mean()),
+            "per_race_std": float(pnl.std()),
+            "per_race_percentiles": {str(q): float(pnl.quantile(q)) for q in (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)},
+            "hold_percentage": float(pnl.sum() / ran['total_pot'].sum() * 100) if ran['total_pot'].sum() else 0.0,
+            "losing_races": int((pnl < 0).sum()),
+            "per_shard": {"mean": float(shard_pnl.mean()), "min": float(shard_pnl.min()), "max": float(shard_pnl.max())},
+        },
+        "race_rounds": {
+            "mean": float(ran['rounds'].mean()),
+            "min": int(ran['rounds'].min()),
+            "max": int(ran['rounds'].max()),
+            "percentiles": {str(q): float(ran['rounds'].quantile(q)) for q in (0.05, 0.5, 0.95)},
+        },
+        "bot_final_bankrolls": final_bankrolls[['mean', 'min', 'max']].round(2).to_dict(orient='index'),
+    }
+
+
+def write_season_outputs(results: dict, output_dir: str = SEASON_OUTPUT_DIR):
+    """Writes races.csv, bot_trajectories.csv and summary.json for later analysis."""
+    os.makedirs(output_dir, exist_ok=True)
+    results['races'].to_csv(os.path.join(output_dir, 'races.csv'), index=False)
+    results['trajectory'].to_csv(os.path.join(output_dir, 'bot_trajectories.csv'), index=False)
+    with open(os.path.join(output_dir, 'summary.json'), 'w') as f:
+        json.dump(results['summary'], f, indent=2)
+
+
+if __name__ == "__main__":
+    # Run from the repo root, e.g.: python -m horse_racing_game.season_simulator --races 100000 --engine v1
+    parser = argparse.ArgumentParser(description="Simulate a full racing season offline.")
+    parser.add_argument('--races', type=int, default=100000)
+    parser.add_argument('--engine', choices=['v1', 'v2'], default='v1')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--shard-size', type=int, default=5000)
+    parser.add_argument('--track-fee', type=float, default=DEFAULT_SEASON_CONFIG['track_fee'])
+    parser.add_argument('--house-vig', type=float, default=DEFAULT_SEASON_CONFIG['house_vig'])
+    parser.add_argument('--humans', type=float, default=DEFAULT_SEASON_CONFIG['humans_per_race'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=SEASON_OUTPUT_DIR)
+    args = parser.parse_args()
+
+    season_config = {"engine": args.engine, "track_fee": args.track_fee,
+                     "house_vig": args.house_vig, "humans_per_race": args.humans}
+    results = simulate_season(args.races, season_config, args.workers, args.shard_size, args.seed)
+    write_season_outputs(results, args.output)
+    print(json.dumps({k: v for k, v in results['summary'].items() if k != 'config'}, indent=2))
+    print(f"Season written to {args.output}")
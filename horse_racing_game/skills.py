@@ -3,19 +3,13 @@ import random
 
 # --- Helper Condition Functions ---
 # These functions check if a skill's conditions are met. They are kept separate for clarity.
+# They read the race's PositionIndex, which run_round keeps current as each horse moves.
 
-def _get_rank(horse, all_horses):
-    sorted_horses = sorted(all_horses, key=lambda h: h.position, reverse=True)
-    return sorted_horses.index(horse) + 1
+def _get_rank(horse, race):
+    return race.index.rank(horse)
 
-def _get_nearby_horses_count(horse, all_horses, space_range):
-    count = 0
-    for other_horse in all_horses:
-        if horse == other_horse:
-            continue
-        if abs(horse.position - other_horse.position) <= space_range:
-            count += 1
-    return count
+def _get_nearby_horses_count(horse, race, space_range):
+    return race.index.nearby_count(horse, space_range)
 
 # --- Skill Definitions ---
 
@@ -26,8 +20,8 @@ SKILL_DEFINITIONS = {
         "trigger_phase": "pre-roll",
         "condition": lambda horse, race: (
             race.get_leg(horse.position) == "Middle" and
-            _get_rank(horse, race.horses) == 1 and
-            horse.position >= (sorted(race.horses, key=lambda h: h.position, reverse=True)[1].position + 8)
+            _get_rank(horse, race) == 1 and
+            horse.position >= (race.index.horse_at_rank(2).position + 8)
         ),
         "chance": 50,
         "effect": lambda horse, race: {"negate_final_penalty": True}
@@ -42,7 +36,7 @@ SKILL_DEFINITIONS = {
         "trigger_phase": "pre-roll",
         "condition": lambda horse, race: (
             race.get_leg(horse.position) == "Final" and
-            _get_rank(horse, race.horses) <= 2
+            _get_rank(horse, race) <= 2
         ),
         "chance": 40,
         "effect": lambda horse, race: {"roll_bonus": 3}
@@ -59,10 +53,10 @@ SKILL_DEFINITIONS = {
         "trigger_phase": "pre-roll",
         "condition": lambda horse, race: (
             race.get_leg(horse.position) in ["Middle", "Final"] and
-            _get_nearby_horses_count(horse, race.horses, 2) > 0
+            _get_nearby_horses_count(horse, race, 2) > 0
         ),
-        "chance": lambda horse, race: min(100, 10 * _get_nearby_horses_count(horse, race.horses, 2)),
-        "effect": lambda horse, race: {"roll_bonus": _get_nearby_horses_count(horse, race.horses, 2)}
+        "chance": lambda horse, race: min(100, 10 * _get_nearby_horses_count(horse, race, 2)),
+        "effect": lambda horse, race: {"roll_bonus": _get_nearby_horses_count(horse, race, 2)}
     },
     "Fiery Satisfaction": {
         "description": "Increase velocity when passing another runner towards the back on the final corner.",
@@ -93,10 +87,7 @@ SKILL_DEFINITIONS = {
     "Slipstream": {
         "description": "If 1-2 spaces behind another horse, 40% chance to gain +3 on a roll.",
         "trigger_phase": "pre-roll",
-        "condition": lambda horse, race: any(
-            (other.position - horse.position) in [1, 2]
-            for other in race.horses if other != horse
-        ),
+        "condition": lambda horse, race: race.index.count_in_range(horse.position + 1, horse.position + 2) > 0,
         "chance": 40,
         "effect": lambda horse, race: {"roll_bonus": 3}
     },
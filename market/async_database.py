@@ -0,0 +1,842 @@
+# market/async_database.py
+import asyncpg
+import asyncio
+import logging
+import json
+import pandas as pd
+from market.database import PG_HOST, PG_PORT, PG_USER, PG_PASSWORD, PG_DATABASE
+
+# This module mirrors the bot-facing half of market/database.py on top of an
+# asyncpg connection pool, so bot commands can await their queries (and run
+# independent ones concurrently) instead of blocking the event loop.
+# The synchronous DAL stays the source of truth for analysis.py and the scripts.
+
+POOL_MIN_SIZE = 1
+POOL_MAX_SIZE = 10
+
+_pool = None
+_pool_lock = asyncio.Lock()
+
+class _Rollback(Exception):
+    """Raised inside a transaction block to abort it without logging an error."""
+
+async def _init_connection(conn):
+    """Decodes json/jsonb columns to Python objects, matching psycopg2's behaviour."""
+    for type_name in ('json', 'jsonb'):
+        await conn.set_type_codec(type_name, encoder=json.dumps, decoder=json.loads, schema='pg_catalog')
+
+async def get_pool():
+    """Returns the shared connection pool, creating it on first use."""
+    global _pool
+    if _pool is not None:
+        return _pool
+    async with _pool_lock:
+        if _pool is None:
+            try:
+                _pool = await asyncpg.create_pool(
+                    host=PG_HOST,
+                    port=PG_PORT,
+                    user=PG_USER,
+                    password=PG_PASSWORD,
+                    database=PG_DATABASE,
+                    min_size=POOL_MIN_SIZE,
+                    max_size=POOL_MAX_SIZE,
+                    init=_init_connection
+                )
+            except (asyncpg.PostgresError, OSError) as e:
+                logging.error(f"Error creating async PostgreSQL pool: {e}")
+                return None
+    return _pool
+
+async def close_pool():
+    """Closes the shared connection pool (call on bot shutdown)."""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+async def _fetch_df(conn, query: str, *args) -> pd.DataFrame:
+    """
+    Runs a query as a prepared statement and returns the rows as a DataFrame.
+    Column names come from the statement itself, so empty results keep their schema.
+    """
+    statement = await conn.prepare(query)
+    rows = await statement.fetch(*args)
+    columns = [attr.name for attr in statement.get_attributes()]
+    # coerce_float mirrors pd.read_sql, which turns NUMERIC Decimals into floats
+    return pd.DataFrame.from_records([tuple(row) for row in rows], columns=columns, coerce_float=True)
+
+### BOT SPECIFIC DATA ACCESS FUNCTIONS ###
+async def get_user_details(discord_id: str):
+    """
+    Fetches a user's core details (balance, in-game name) from the balances table.
+    Returns an asyncpg Record (dict-like), or None if the user is not found.
+    """
+    pool = await get_pool()
+    if not pool: return None
+    async with pool.acquire() as conn:
+        return await conn.fetchrow("SELECT ingamename, balance FROM balances WHERE discord_id = $1;", discord_id)
+
+async def get_user_balance_by_discord_id(discord_id: str):
+    """Fetches a single user's balance from the database."""
+    pool = await get_pool()
+    if not pool: return None
+    async with pool.acquire() as conn:
+        return await conn.fetchval("SELECT balance FROM balances WHERE discord_id = $1;", discord_id)
+
+async def get_discord_id_by_name(ingamename: str) -> str:
+    """Fetches a user's discord_id by their in-game name."""
+    pool = await get_pool()
+    if not pool: return None
+    async with pool.acquire() as conn:
+        return await conn.fetchval("SELECT discord_id FROM balances WHERE ingamename = $1;", ingamename)
+
+async def get_stock_by_ticker_or_name(identifier: str):
+    """
+    Fetches all data for a single stock by its ticker or in-game name.
+    Returns a dictionary of the stock's data or None if not found.
+    """
+    pool = await get_pool()
+    if not pool: return None
+    async with pool.acquire() as conn:
+        result = await conn.fetchrow("SELECT * FROM stock_prices WHERE ticker ILIKE $1;", identifier)
+        if not result:
+            result = await conn.fetchrow("SELECT * FROM stock_prices WHERE ingamename ILIKE $1;", identifier)
+    return dict(result) if result else None
+
+async def get_user_details_by_identifier(identifier: str) -> dict | None:
+    """Finds a user's details by their in-game name or ticker."""
+    pool = await get_pool()
+    if not pool: return None
+    async with pool.acquire() as conn:
+        user = await conn.fetchrow("SELECT discord_id, ingamename FROM balances WHERE ingamename = $1", identifier)
+        if not user:
+            stock = await conn.fetchrow("SELECT ingamename FROM stock_prices WHERE ticker ILIKE $1", identifier)
+            if stock:
+                user = await conn.fetchrow("SELECT discord_id, ingamename FROM balances WHERE ingamename = $1", stock['ingamename'])
+    return dict(user) if user else None
+
+async def get_market_data_from_db():
+    """
+    Fetches all core market tables from the database and returns them as a
+    dictionary of pandas DataFrames.
+    """
+    pool = await get_pool()
+    if not pool:
+        logging.error("Cannot fetch market data, no database connection.")
+        return None
+    try:
+        async with pool.acquire() as conn:
+            balances_df = await _fetch_df(conn, "SELECT * FROM balances")
+            stock_prices_df = await _fetch_df(conn, "SELECT * FROM stock_prices")
+            portfolios_df = await _fetch_df(conn, "SELECT * FROM portfolios")
+            shop_upgrades_df = await _fetch_df(conn, "SELECT * FROM shop_upgrades")
+            market_state_df = await _fetch_df(conn, "SELECT * FROM market_state")
+    except (Exception, asyncpg.PostgresError) as error:
+        logging.error(f"Error fetching market data from DB: {error}")
+        return None
+
+    market_state_df['state_value'] = market_state_df['state_value'].replace("NaN", "Test")
+    balances_df.rename(columns={'ingamename': 'inGameName'}, inplace=True)
+    stock_prices_df.rename(columns={'ingamename': 'inGameName'}, inplace=True)
+    portfolios_df.rename(columns={'stock_ingamename': 'stock_inGameName'}, inplace=True)
+
+    return {
+        'crew_coins': balances_df,
+        'stock_prices': stock_prices_df,
+        'portfolios': portfolios_df,
+        'shop_upgrades': shop_upgrades_df,
+        'market_state': market_state_df,
+    }
+
+async def get_portfolio_details(discord_id: str):
+    """
+    Fetches a user's complete portfolio with calculated cost basis and joins
+    with current stock prices to get all data needed for the /portfolio command.
+    """
+    pool = await get_pool()
+    if not pool: return pd.DataFrame()
+    query = """
+    WITH CostBasis AS (
+        SELECT
+            actor_id,
+            item_name,
+            SUM(item_quantity) AS total_shares_bought,
+            SUM(ABS(cc_amount) - fee_paid) AS total_cost
+        FROM transactions
+        WHERE transaction_type = 'INVEST' AND actor_id = $1
+        GROUP BY actor_id, item_name
+    )
+    SELECT
+        p.stock_ingamename,
+        p.shares_owned,
+        s.current_price,
+        s.ticker,
+        CASE
+            WHEN cb.total_shares_bought > 0 THEN cb.total_cost / cb.total_shares_bought
+            ELSE 0
+        END AS cost_basis
+    FROM portfolios p
+    JOIN stock_prices s ON p.stock_ingamename = s.ingamename
+    LEFT JOIN CostBasis cb ON p.investor_discord_id = cb.actor_id AND s.ingamename || '''s Stock' = cb.item_name
+    WHERE p.investor_discord_id = $1;
+    """
+    async with pool.acquire() as conn:
+        return await _fetch_df(conn, query, discord_id)
+
+async def get_market_snapshot():
+    """
+    Fetches a comprehensive snapshot of the entire market, including 24h price
+    changes, market cap, top holders, and 24h volume.
+    """
+    pool = await get_pool()
+    if not pool: return None, None
+
+    query = """
+    WITH PriceHistory24h AS (
+        SELECT
+            ingamename,
+            FIRST_VALUE(price) OVER (PARTITION BY ingamename ORDER BY timestamp DESC) as price_24h_ago
+        FROM stock_price_history
+        WHERE timestamp < NOW() - INTERVAL '24 hours'
+    ),
+    LatestPriceHistory AS (
+        SELECT DISTINCT ingamename, price_24h_ago FROM PriceHistory24h
+    ),
+    RankedPortfolios AS (
+        SELECT
+            p.stock_ingamename,
+            b.ingamename AS holder_name,
+            p.shares_owned,
+            ROW_NUMBER() OVER(PARTITION BY p.stock_ingamename ORDER BY p.shares_owned DESC) as rn
+        FROM portfolios p
+        JOIN balances b ON p.investor_discord_id = b.discord_id
+    ),
+    MarketCaps AS (
+        SELECT
+            stock_ingamename,
+            SUM(shares_owned) as total_shares
+        FROM portfolios
+        GROUP BY stock_ingamename
+    )
+    SELECT
+        s.ingamename,
+        s.current_price,
+        s.ticker,
+        COALESCE(lph.price_24h_ago, s.current_price) AS price_24h_ago,
+        mc.total_shares * s.current_price AS market_cap,
+        rp.holder_name as largest_holder,
+        rp.shares_owned as largest_holder_shares
+    FROM stock_prices s
+    LEFT JOIN LatestPriceHistory lph ON s.ingamename = lph.ingamename
+    LEFT JOIN MarketCaps mc ON s.ingamename = mc.stock_ingamename
+    LEFT JOIN RankedPortfolios rp ON s.ingamename = rp.stock_ingamename AND rp.rn = 1;
+    """
+    volume_query = """
+        SELECT SUM(ABS(cc_amount))
+        FROM transactions
+        WHERE transaction_type IN ('INVEST', 'SELL')
+        AND timestamp >= NOW() - INTERVAL '24 hours';
+    """
+    async with pool.acquire() as conn:
+        market_df = await _fetch_df(conn, query)
+        volume_24h = await conn.fetchval(volume_query)
+    return market_df, volume_24h or 0
+
+async def get_stock_details(identifier: str):
+    """
+    Fetches all detailed information for a single stock in one efficient query.
+    This includes current price, 30-day price history, and top 5 holders.
+    """
+    pool = await get_pool()
+    if not pool:
+        return None, pd.DataFrame(), pd.DataFrame()
+
+    query = """
+    WITH SelectedStock AS (
+        SELECT * FROM stock_prices
+        WHERE ticker ILIKE $1 OR ingamename ILIKE $1
+        LIMIT 1
+    ),
+    PriceHistory AS (
+        SELECT to_char(timestamp, 'YYYY-MM-DD"T"HH24:MI:SS.MS"Z"') as timestamp, price
+        FROM stock_price_history
+        WHERE ingamename = (SELECT ingamename FROM SelectedStock)
+          AND timestamp >= NOW() - INTERVAL '30 days'
+        ORDER BY timestamp ASC
+    ),
+    TopHolders AS (
+        SELECT
+            b.ingamename,
+            p.shares_owned
+        FROM portfolios p
+        JOIN balances b ON p.investor_discord_id = b.discord_id
+        WHERE p.stock_ingamename = (SELECT ingamename FROM SelectedStock)
+        ORDER BY p.shares_owned DESC
+        LIMIT 5
+    )
+    SELECT
+        (SELECT row_to_json(ss) FROM SelectedStock ss) as stock_info,
+        (SELECT json_agg(ph) FROM PriceHistory ph) as history,
+        (SELECT json_agg(th) FROM TopHolders th) as top_holders;
+    """
+
+    stock_info = None
+    history_df = pd.DataFrame()
+    top_holders_df = pd.DataFrame()
+
+    try:
+        async with pool.acquire() as conn:
+            result = await conn.fetchrow(query, identifier)
+        if result and result['stock_info']:
+            stock_info = dict(result['stock_info'])
+            if result['history']:
+                history_df = pd.DataFrame(result['history'])
+                history_df['timestamp'] = pd.to_datetime(history_df['timestamp'], utc=True)
+            if result['top_holders']:
+                top_holders_df = pd.DataFrame(result['top_holders'])
+    except (Exception, asyncpg.PostgresError) as error:
+        logging.error(f"Error fetching stock details for {identifier}: {error}")
+
+    return stock_info, history_df, top_holders_df
+
+async def get_sponsorships(discord_id: str):
+    """
+    Finds all stocks for which the given user is the #1 shareholder.
+    Returns a list of dictionaries with sponsorship details.
+    """
+    pool = await get_pool()
+    if not pool: return []
+    query = """
+    WITH RankedHolders AS (
+        SELECT
+            stock_ingamename,
+            investor_discord_id,
+            shares_owned,
+            ROW_NUMBER() OVER(PARTITION BY stock_ingamename ORDER BY shares_owned DESC) as rn,
+            LEAD(shares_owned, 1, 0.0) OVER(PARTITION BY stock_ingamename ORDER BY shares_owned DESC) as second_place_shares
+        FROM portfolios
+    )
+    SELECT
+        rh.stock_ingamename,
+        s.ticker,
+        (rh.shares_owned - rh.second_place_shares) as lead_amount
+    FROM RankedHolders rh
+    JOIN stock_prices s ON rh.stock_ingamename = s.ingamename
+    WHERE rh.investor_discord_id = $1 AND rh.rn = 1;
+    """
+    async with pool.acquire() as conn:
+        df = await _fetch_df(conn, query, discord_id)
+    return df.to_dict('records')
+
+async def get_shop_data(discord_id: str):
+    """
+    Fetches all data needed for the /shop command for a specific user:
+    - Current balance
+    - A dictionary of their current upgrade tiers
+    - Their most recent lifetime prestige from the enriched_fan_log.csv
+    """
+    pool = await get_pool()
+    if not pool: return None
+
+    shop_data = {}
+    inGameName = None
+    async with pool.acquire() as conn:
+        balance_result = await conn.fetchrow("SELECT balance, ingamename FROM balances WHERE discord_id = $1;", discord_id)
+        if balance_result:
+            shop_data['balance'] = float(balance_result['balance'])
+            inGameName = balance_result['ingamename']
+        else:
+            shop_data['balance'] = 0
+        rows = await conn.fetch("SELECT upgrade_name, tier FROM shop_upgrades WHERE discord_id = $1;", discord_id)
+        shop_data['upgrades'] = {row['upgrade_name']: row['tier'] for row in rows}
+
+    def read_lifetime_prestige():
+        try:
+            enriched_df = pd.read_csv('enriched_fan_log.csv')
+            user_stats = enriched_df[enriched_df['inGameName'] == inGameName]
+            if not user_stats.empty:
+                return float(user_stats.loc[user_stats['timestamp'].idxmax()]['lifetimePrestige'])
+        except FileNotFoundError:
+            logging.error("enriched_fan_log.csv not found. Cannot calculate prestige for shop.")
+        except Exception as e:
+            logging.error(f"Error reading prestige from CSV: {e}")
+        return 0
+
+    # The CSV read is blocking, so it runs on a worker thread
+    shop_data['prestige'] = await asyncio.to_thread(read_lifetime_prestige) if inGameName else 0
+    return shop_data
+
+async def get_house_balance() -> float:
+    """Fetches the current balance of the house wallet."""
+    pool = await get_pool()
+    if not pool:
+        return 0.0
+    try:
+        async with pool.acquire() as conn:
+            result = await conn.fetchval("SELECT balance FROM house_wallet WHERE id = 1;")
+        return float(result) if result is not None else 0.0
+    except Exception as e:
+        logging.error(f"Error fetching house balance: {e}")
+        return 0.0
+
+async def get_player_betting_limit(discord_id: str) -> int:
+    """
+    Fetches a player's "High Roller License" tier and returns their
+    personal maximum bet limit.
+    """
+    bet_limits = {0: 9999, 1: 39999, 2: 99999, 3: 249999, 4: 499999, 5: 1000000, 6: 1000000}
+    pool = await get_pool()
+    if not pool:
+        return 9999 # Default to base limit on DB error
+    tier = 0
+    try:
+        async with pool.acquire() as conn:
+            result = await conn.fetchval(
+                "SELECT tier FROM shop_upgrades WHERE discord_id = $1 AND upgrade_name = 'High Roller License';",
+                discord_id
+            )
+        if result is not None:
+            tier = result
+    except Exception as e:
+        logging.error(f"Error fetching player betting tier for {discord_id}: {e}")
+    return bet_limits.get(tier, 9999)
+
+async def update_market_state_value(state_name: str, state_value: str):
+    """Updates a single key-value pair in the market_state table."""
+    pool = await get_pool()
+    if not pool:
+        logging.error(f"Cannot update market state for {state_name}, no database connection.")
+        return False
+    try:
+        async with pool.acquire() as conn:
+            await conn.execute(
+                """
+                INSERT INTO market_state (state_name, state_value) VALUES ($1, $2)
+                ON CONFLICT (state_name) DO UPDATE SET state_value = EXCLUDED.state_value;
+                """,
+                state_name, state_value
+            )
+        logging.info(f"Successfully updated market state: {state_name} = {state_value}")
+        return True
+    except (Exception, asyncpg.PostgresError) as error:
+        logging.error(f"Error updating single market state value: {error}")
+        return False
+
+async def update_user_ticker(ingamename: str, ticker: str):
+    """
+    Sets or updates a user's stock ticker.
+    Returns True on success, False on failure (e.g., ticker already taken).
+    """
+    pool = await get_pool()
+    if not pool: return False
+    try:
+        async with pool.acquire() as conn:
+            status = await conn.execute("UPDATE stock_prices SET ticker = $1 WHERE ingamename = $2;", ticker, ingamename)
+        # asyncpg returns the command tag, e.g. "UPDATE 1"
+        return int(status.split()[-1]) > 0
+    except asyncpg.UniqueViolationError:
+        return False
+
+async def remove_shop_upgrade(discord_id: str, upgrade_name: str) -> bool:
+    """
+    Removes a specific shop upgrade from a user.
+    Returns True on success, False on failure.
+    """
+    pool = await get_pool()
+    if not pool: return False
+    try:
+        async with pool.acquire() as conn:
+            status = await conn.execute(
+                "DELETE FROM shop_upgrades WHERE discord_id = $1 AND upgrade_name = $2;",
+                discord_id, upgrade_name
+            )
+        success = int(status.split()[-1]) > 0
+        if success:
+            logging.info(f"Successfully removed upgrade '{upgrade_name}' for user {discord_id}.")
+        else:
+            logging.warning(f"Attempted to remove upgrade '{upgrade_name}' for user {discord_id}, but no such upgrade was found.")
+        return success
+    except Exception as e:
+        logging.error(f"Error removing shop upgrade: {e}")
+        return False
+
+async def log_prestige_purchase(actor_id: str, amount: float):
+    """Logs a new prestige purchase to the ledger table."""
+    pool = await get_pool()
+    if not pool: return False
+    try:
+        async with pool.acquire() as conn:
+            await conn.execute(
+                "INSERT INTO purchased_prestige_ledger (discord_id, prestige_amount) VALUES ($1, $2);",
+                actor_id, amount
+            )
+        logging.info(f"Successfully logged prestige purchase for {actor_id} of {amount}.")
+        return True
+    except Exception as e:
+        logging.error(f"Failed to log prestige purchase: {e}")
+        return False
+
+async def execute_trade_transaction(
+    actor_id: str,
+    target_id: str,
+    stock_name: str,
+    shares: float,
+    price_per_share: float,
+    total_cost: float,
+    fee: float,
+    transaction_type: str
+):
+    """
+    Executes a buy or sell order as a single, atomic transaction.
+    A user's share balance can never go negative.
+    """
+    pool = await get_pool()
+    if not pool: return None
+
+    try:
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                # 1. Lock and update CC balance
+                wallet = await conn.fetchval("SELECT balance FROM balances WHERE discord_id = $1 FOR UPDATE;", actor_id)
+                if transaction_type == 'INVEST' and (wallet is None or wallet < -total_cost):
+                    raise _Rollback()
+
+                new_balance = await conn.fetchval(
+                    "UPDATE balances SET balance = balance + $1 WHERE discord_id = $2 RETURNING balance;",
+                    total_cost, actor_id
+                )
+
+                # 2. Update portfolio
+                status = await conn.execute(
+                    """
+                    UPDATE portfolios
+                    SET shares_owned = portfolios.shares_owned + $1
+                    WHERE investor_discord_id = $2
+                      AND stock_ingamename = $3
+                      AND portfolios.shares_owned + $1 >= 0;
+                    """,
+                    shares, actor_id, stock_name
+                )
+                if int(status.split()[-1]) == 0:
+                    if shares > 0:
+                        await conn.execute(
+                            "INSERT INTO portfolios (investor_discord_id, stock_ingamename, shares_owned) VALUES ($1, $2, $3)",
+                            actor_id, stock_name, shares
+                        )
+                    else:
+                        logging.error(f"Trade failed: Insufficient shares for {actor_id} to sell {stock_name}.")
+                        raise _Rollback()
+
+                # 3. Log the user-facing transaction
+                details = {
+                    "price_per_share": round(price_per_share, 2),
+                    "shares_transacted": round(shares, 4),
+                    "subtotal": round(abs(total_cost) - fee, 2),
+                    "fee_paid": round(fee, 2)
+                }
+                await conn.execute(
+                    """
+                    INSERT INTO transactions (actor_id, target_id, transaction_type, item_name, item_quantity, cc_amount, fee_paid, details, balance_after)
+                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9);
+                    """,
+                    actor_id, target_id, transaction_type, f"{stock_name}'s Stock", shares, total_cost, fee, details, new_balance
+                )
+
+                if fee > 0:
+                    await conn.execute("UPDATE house_wallet SET balance = balance + $1 WHERE id = 1;", fee)
+                    await conn.execute(
+                        "INSERT INTO house_ledger (transaction_type, net_change, player_id) VALUES ($1, $2, $3);",
+                        transaction_type, fee, actor_id
+                    )
+        return new_balance
+    except _Rollback:
+        return None
+    except Exception as e:
+        logging.error(f"Trade transaction failed: {e}")
+        return None
+
+async def execute_gift_transaction(sender_id: str, sender_name: str, receiver_id: str, receiver_name: str, amount: float) -> float | None:
+    """
+    Atomically transfers CC from a sender to a receiver and logs the transaction for both parties.
+    Returns the sender's new balance on success, None on failure.
+    """
+    pool = await get_pool()
+    if not pool:
+        return None
+
+    try:
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                sender_wallet = await conn.fetchval("SELECT balance FROM balances WHERE discord_id = $1 FOR UPDATE;", sender_id)
+                if sender_wallet is None or sender_wallet < amount:
+                    raise _Rollback()
+                await conn.execute("SELECT balance FROM balances WHERE discord_id = $1 FOR UPDATE;", receiver_id)
+
+                new_sender_balance = await conn.fetchval(
+                    "UPDATE balances SET balance = balance - $1 WHERE discord_id = $2 RETURNING balance;",
+                    amount, sender_id
+                )
+                new_receiver_balance = await conn.fetchval(
+                    "UPDATE balances SET balance = balance + $1 WHERE discord_id = $2 RETURNING balance;",
+                    amount, receiver_id
+                )
+
+                await conn.execute(
+                    """
+                    INSERT INTO transactions (actor_id, transaction_type, item_name, cc_amount, details, balance_after)
+                    VALUES ($1, 'GIFT_SENT', $2, $3, $4, $5);
+                    """,
+                    sender_id, f"Gift to {receiver_name}", -amount, {"receiver": receiver_name}, new_sender_balance
+                )
+                await conn.execute(
+                    """
+                    INSERT INTO transactions (actor_id, transaction_type, item_name, cc_amount, details, balance_after)
+                    VALUES ($1, 'GIFT_RECEIVED', $2, $3, $4, $5);
+                    """,
+                    receiver_id, f"Gift from {sender_name}", amount, {"sender": sender_name}, new_receiver_balance
+                )
+        return new_sender_balance
+    except _Rollback:
+        return None
+    except Exception as e:
+        logging.error(f"Gift transaction failed: {e}")
+        return None
+
+async def execute_purchase_transaction(actor_id: str, item_name: str, cost: float, upgrade_tier: int = None):
+    """
+    Executes a shop purchase as a single, atomic transaction.
+    Returns the new balance on success, None on failure.
+    """
+    pool = await get_pool()
+    if not pool: return None
+
+    try:
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                wallet = await conn.fetchval("SELECT balance FROM balances WHERE discord_id = $1 FOR UPDATE;", actor_id)
+                if wallet is None or wallet < cost:
+                    raise _Rollback()
+
+                new_balance = await conn.fetchval(
+                    "UPDATE balances SET balance = balance - $1 WHERE discord_id = $2 RETURNING balance;",
+                    cost, actor_id
+                )
+                if upgrade_tier is not None:
+                    await conn.execute(
+                        """
+                        INSERT INTO shop_upgrades (discord_id, upgrade_name, tier)
+                        VALUES ($1, $2, $3)
+                        ON CONFLICT (discord_id, upgrade_name) DO UPDATE
+                        SET tier = EXCLUDED.tier;
+                        """,
+                        actor_id, item_name, upgrade_tier
+                    )
+                await conn.execute(
+                    """
+                    INSERT INTO transactions (actor_id, transaction_type, item_name, cc_amount, balance_after)
+                    VALUES ($1, 'PURCHASE', $2, $3, $4);
+                    """,
+                    actor_id, item_name, -cost, new_balance
+                )
+        return new_balance
+    except _Rollback:
+        return None
+    except Exception as e:
+        logging.error(f"Purchase transaction failed: {e}")
+        return None
+
+async def execute_admin_award(admin_id: str, target_id: str, amount: int) -> float | None:
+    """
+    Atomically awards CC to a user and logs the transaction.
+    Returns the new balance on success, None on failure.
+    """
+    pool = await get_pool()
+    if not pool: return None
+
+    try:
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                new_balance = await conn.fetchval(
+                    "UPDATE balances SET balance = balance + $1 WHERE discord_id = $2 RETURNING balance;",
+                    amount, target_id
+                )
+                await conn.execute(
+                    """
+                    INSERT INTO transactions (actor_id, transaction_type, target_id, item_name, cc_amount)
+                    VALUES ($1, $2, $3, $4, $5)
+                    """,
+                    admin_id, 'ADMIN_AWARD', target_id, 'Admin Discretionary Award', amount
+                )
+        return new_balance
+    except Exception as err:
+        logging.error(f"Admin award transaction failed: {err}")
+        return None
+
+async def execute_admin_removal(admin_id: str, target_id: str, amount: int) -> float | None:
+    """
+    Atomically removes CC from a user and logs the transaction.
+    Returns the new balance on success, None on failure.
+    """
+    pool = await get_pool()
+    if not pool: return None
+
+    try:
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                wallet = await conn.fetchval("SELECT balance FROM balances WHERE discord_id = $1 FOR UPDATE;", target_id)
+                if wallet is None or wallet < amount:
+                    logging.warning(f"Admin removal failed: {target_id} has insufficient funds.")
+                    raise _Rollback()
+
+                new_balance = await conn.fetchval(
+                    "UPDATE balances SET balance = balance - $1 WHERE discord_id = $2 RETURNING balance;",
+                    amount, target_id
+                )
+                await conn.execute(
+                    """
+                    INSERT INTO transactions (actor_id, transaction_type, target_id, item_name, cc_amount, balance_after)
+                    VALUES ($1, $2, $3, $4, $5, $6)
+                    """,
+                    admin_id, 'ADMIN_REMOVAL', target_id, 'Admin Discretionary Removal', -amount, new_balance
+                )
+        return new_balance
+    except _Rollback:
+        return None
+    except Exception as err:
+        logging.error(f"Admin removal transaction failed: {err}")
+        return None
+
+async def execute_gambling_transaction(
+    actor_id: str,
+    game_name: str,
+    bet_amount: float,
+    winnings: float,
+    details: dict
+) -> float | None:
+    """
+    Executes a gambling win or loss as a single, atomic transaction against the house_wallet.
+    Returns the new balance on success, None on failure.
+    """
+    pool = await get_pool()
+    if not pool:
+        return None
+
+    try:
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                # 1. Lock the house and player wallets (same order as the sync DAL to avoid deadlocks)
+                house_wallet = await conn.fetchval("SELECT balance FROM house_wallet WHERE id = 1 FOR UPDATE;")
+                player_wallet = await conn.fetchval("SELECT balance FROM balances WHERE discord_id = $1 FOR UPDATE;", actor_id)
+
+                # 2. Final verification checks
+                if player_wallet is None or player_wallet < bet_amount:
+                    logging.warning(f"Gambling failed for {actor_id}: insufficient funds at time of execution.")
+                    raise _Rollback()
+                net_payout = winnings - bet_amount
+                if house_wallet is None or house_wallet < net_payout:
+                    logging.warning(f"Gambling failed for {actor_id}: House has insufficient funds to pay out {winnings}.")
+                    raise _Rollback()
+
+                # 3. Update balances
+                player_net_change = winnings - bet_amount
+                house_net_change = bet_amount - winnings
+                new_balance = await conn.fetchval(
+                    "UPDATE balances SET balance = balance + $1 WHERE discord_id = $2 RETURNING balance;",
+                    player_net_change, actor_id
+                )
+                await conn.execute("UPDATE house_wallet SET balance = balance + $1 WHERE id = 1;", house_net_change)
+
+                # 4. Log in the player ledger and the house ledger
+                await conn.execute(
+                    """
+                    INSERT INTO transactions (actor_id, transaction_type, item_name, cc_amount, details, balance_after)
+                    VALUES ($1, 'GAMBLE', $2, $3, $4, $5);
+                    """,
+                    actor_id, game_name, player_net_change, details, new_balance
+                )
+                await conn.execute(
+                    """
+                    INSERT INTO house_ledger (transaction_type, game_name, player_id, player_bet, player_winnings, net_change)
+                    VALUES ($1, $2, $3, $4, $5, $6);
+                    """,
+                    'GAMBLE', game_name, actor_id, bet_amount, winnings, house_net_change
+                )
+        return new_balance
+    except _Rollback:
+        return None
+    except Exception as e:
+        logging.error(f"Gambling transaction failed: {e}")
+        return None
+
+### ANNOUNCEMENT QUEUE ###
+ANNOUNCEMENT_CHANNEL = 'announcements'
+
+async def ensure_announcement_queue():
+    """
+    Creates the announcement_queue table (same DDL as database.create_market_tables) if it's missing,
+    so a database set up before the queue existed works without re-running the setup script.
+    """
+    pool = await get_pool()
+    if not pool: return
+    async with pool.acquire() as conn:
+        await conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS announcement_queue (
+                announcement_id SERIAL PRIMARY KEY,
+                channel_name VARCHAR(255) NOT NULL,
+                message TEXT NOT NULL,
+                created_at TIMESTAMPTZ DEFAULT NOW(),
+                delivered_at TIMESTAMPTZ
+            );
+            CREATE INDEX IF NOT EXISTS idx_announcement_queue_pending
+            ON announcement_queue (announcement_id) WHERE delivered_at IS NULL;
+            """
+        )
+
+async def listen_for_announcements(callback):
+    """
+    Opens a dedicated connection that LISTENs for new announcements and calls
+    callback() whenever analysis.py queues one. Returns the connection so the
+    caller can check is_closed() and re-listen after a dropped connection.
+    """
+    try:
+        conn = await asyncpg.connect(
+            host=PG_HOST, port=PG_PORT, user=PG_USER, password=PG_PASSWORD, database=PG_DATABASE
+        )
+        await conn.add_listener(ANNOUNCEMENT_CHANNEL, lambda *args: callback())
+        return conn
+    except (asyncpg.PostgresError, OSError) as e:
+        logging.error(f"Could not start announcement listener: {e}")
+        return None
+
+async def get_pending_announcements(limit: int = 50) -> list:
+    """Returns undelivered announcements, oldest first."""
+    pool = await get_pool()
+    if not pool: return []
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(
+            """
+            SELECT announcement_id, channel_name, message
+            FROM announcement_queue
+            WHERE delivered_at IS NULL
+            ORDER BY announcement_id
+            LIMIT $1;
+            """,
+            limit
+        )
+    return [dict(row) for row in rows]
+
+async def ack_announcements(announcement_ids: list) -> int:
+    """
+    Marks announcements as delivered. Safe to call more than once for the same ids;
+    only rows that were still pending are counted.
+    """
+    pool = await get_pool()
+    if not pool or not announcement_ids: return 0
+    async with pool.acquire() as conn:
+        status = await conn.execute(
+            "UPDATE announcement_queue SET delivered_at = NOW() WHERE announcement_id = ANY($1::int[]) AND delivered_at IS NULL;",
+            announcement_ids
+        )
+    return int(status.split()[-1])
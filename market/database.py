@@ -188,6 +188,20 @@ def create_market_tables():
             state_name VARCHAR(255) PRIMARY KEY,
             state_value TEXT
         );
+        """,
+        # --- NEW: Durable queue for bot announcements (replaces announcements.txt) ---
+        """
+        CREATE TABLE IF NOT EXISTS announcement_queue (
+            announcement_id SERIAL PRIMARY KEY,
+            channel_name VARCHAR(255) NOT NULL,
+            message TEXT NOT NULL,
+            created_at TIMESTAMPTZ DEFAULT NOW(),
+            delivered_at TIMESTAMPTZ
+        );
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_announcement_queue_pending
+        ON announcement_queue (announcement_id) WHERE delivered_at IS NULL;
         """
     )
     conn = None
@@ -2283,6 +2297,91 @@ def place_bet_transaction(race_id, bettor_id, horse_name, amount, odds) -> bool:
             return False
     conn.close()
 
+def place_bet_batch_transaction(race_id, bets) -> set:
+    """
+    Places many bets (a list of (bettor_id, horse_name, amount, odds)) in ONE transaction on
+    one connection: a single multi-row debit of every bettor's wallet, then a single multi-row
+    insert of the bets whose bettor could cover them.
+
+    A bettor's bets in the batch succeed or fail together; one bettor running short does not
+    affect anyone else. Returns the set of bettor_ids that were charged, or None if the whole
+    batch failed (e.g. no database connection).
+    """
+    if not bets:
+        return set()
+    conn = get_connection()
+    if not conn: return None
+
+    with conn.cursor() as cursor:
+        try:
+            # The UPDATE takes the same row locks the single-bet path gets from SELECT ... FOR UPDATE,
+            # and only debits wallets whose balance covers the bettor's whole share of the batch.
+            rows = extras.execute_values(
+                cursor,
+                """
+                WITH requested (race_id, bettor_id, horse_name, amount, odds) AS (VALUES %s),
+                totals AS (
+                    SELECT bettor_id, SUM(amount) AS total FROM requested GROUP BY bettor_id
+                ),
+                debited AS (
+                    UPDATE crew_coin_wallets w
+                    SET balance = w.balance - t.total
+                    FROM totals t
+                    WHERE w.discord_id = t.bettor_id AND w.balance >= t.total
+                    RETURNING w.discord_id
+                ),
+                inserted AS (
+                    INSERT INTO bets (race_id, bettor_id, horse_name, amount, locked_in_odds)
+                    SELECT r.race_id, r.bettor_id, r.horse_name, r.amount, r.odds
+                    FROM requested r JOIN debited d ON d.discord_id = r.bettor_id
+                    RETURNING bettor_id
+                )
+                SELECT DISTINCT bettor_id FROM inserted;
+                """,
+                [(race_id, bettor_id, horse_name, amount, odds) for bettor_id, horse_name, amount, odds in bets],
+                template="(%s::BIGINT, %s::TEXT, %s::TEXT, %s::DECIMAL, %s::DECIMAL)",
+                page_size=len(bets),
+                fetch=True
+            )
+            conn.commit()
+            placed = {row[0] for row in rows}
+            logging.info(f"Batch bet for race #{race_id}: {len(placed)} of {len({b[0] for b in bets})} bettors charged.")
+            return placed
+        except psycopg2.Error as e:
+            logging.error(f"Batch bet transaction failed: {e}")
+            conn.rollback()
+            return None
+        finally:
+            conn.close()
+
+### ANNOUNCEMENT QUEUE ###
+ANNOUNCEMENT_CHANNEL = 'announcements'
+
+def queue_announcement(message: str, channel_name: str = 'fan-exchange') -> bool:
+    """
+    Adds an announcement to the durable queue and wakes any listening bot via NOTIFY.
+    The NOTIFY is only delivered once the INSERT commits, so the bot never sees a half-written row.
+    """
+    conn = get_connection()
+    if not conn: return False
+    with conn.cursor() as cursor:
+        try:
+            cursor.execute(
+                "INSERT INTO announcement_queue (channel_name, message) VALUES (%s, %s) RETURNING announcement_id;",
+                (channel_name, message)
+            )
+            announcement_id = cursor.fetchone()[0]
+            cursor.execute("SELECT pg_notify(%s, %s);", (ANNOUNCEMENT_CHANNEL, str(announcement_id)))
+            conn.commit()
+            logging.info(f"Queued announcement {announcement_id} for #{channel_name}.")
+            return True
+        except Exception as e:
+            logging.error(f"Failed to queue announcement: {e}")
+            conn.rollback()
+            return False
+        finally:
+            conn.close()
+
 # We can add more functions here later as needed (e.g., for payouts, creating races, etc.)
 
 if __name__ == "__main__":
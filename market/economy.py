@@ -172,6 +172,7 @@ def process_cc_earnings(enriched_df, market_data_dfs, run_timestamp):
 
     # --- Final processing to prepare for database insertion ---
     updated_balances_df = pd.DataFrame(balance_map.items(), columns=['inGameName', 'balance'])
+    updated_balances_df['inGameName'] = updated_balances_df['inGameName'].astype(crew_coins_df['inGameName'].dtype)
     updated_balances_df = pd.merge(updated_balances_df, crew_coins_df[['inGameName', 'discord_id']], on='inGameName', how='left')
 
 
@@ -144,7 +144,7 @@ def calculate_individual_nudges(market_data_dfs, run_timestamp):
         print("No fan gain data in the last 24 hours. Skipping nudges.")
         return stock_prices_df
 
-    daily_fan_gains = perf_window_df.groupby('inGameName')['fanGain'].sum().reset_index()
+    daily_fan_gains = perf_window_df.groupby('inGameName', observed=True)['fanGain'].sum().reset_index()
     daily_fan_gains['rank'] = daily_fan_gains['fanGain'].rank(method='first', ascending=False)
     
     def assign_nudge(rank):
@@ -236,6 +236,8 @@ def update_all_stock_prices(enriched_df, market_data_dfs, run_timestamp):
 
     # --- 3. PREPARE & LOG ---
     new_prices_df = pd.DataFrame(updated_prices)
+    # Back onto the stock table's member encoding so the merge joins on codes
+    new_prices_df['inGameName'] = new_prices_df['inGameName'].astype(stock_prices_df['inGameName'].dtype)
     
     final_stocks_df = pd.merge(stock_prices_df.drop(columns=['current_price']), new_prices_df, on='inGameName', how='left')
     final_stocks_df['current_price'] = final_stocks_df['current_price'].fillna(0.01)
@@ -0,0 +1,84 @@
+import pandas as pd
+
+MEMBERS_CSV = 'members.csv'
+
+class MemberRegistry:
+    """
+    One id per inGameName, shared by every frame in a run so member columns can be held as
+    categoricals (small integer codes) instead of Python strings.
+
+    Ids follow members.csv's clubInfoOrder, which only ever grows, so a member keeps the same id
+    from run to run. Names members.csv doesn't know yet (the fan log or the DB got there first)
+    are appended after the roster in the order they turn up.
+
+    Groupbys, merges and `== name` masks on encoded columns compare codes. Values read back out
+    (iterrows, to_dict keys, to_csv) are still the plain names; decode() is for the few places
+    that need real string columns, like plotting or DB writes.
+    """
+    def __init__(self, names=()):
+        self.names = []
+        self._ids = {}
+        self._dtype = None
+        self.add(names)
+
+    @classmethod
+    def from_members(cls, members_df: pd.DataFrame):
+        """Builds the registry from the members.csv roster, Active and Inactive alike."""
+        roster = members_df.dropna(subset=['inGameName'])
+        if 'clubInfoOrder' in roster.columns:
+            roster = roster.sort_values('clubInfoOrder', kind='stable', na_position='last')
+        return cls(roster['inGameName'])
+
+    def add(self, names):
+        """Registers any names not seen yet, in order. Returns self so calls can be chained."""
+        for name in pd.Series(names).dropna().unique():
+            name = str(name)
+            if name not in self._ids:
+                self._ids[name] = len(self.names)
+                self.names.append(name)
+                self._dtype = None
+        return self
+
+    def id_of(self, name):
+        """The member's id, or None if it isn't registered."""
+        return self._ids.get(name)
+
+    @property
+    def dtype(self) -> pd.CategoricalDtype:
+        if self._dtype is None:
+            self._dtype = pd.CategoricalDtype(self.names)
+        return self._dtype
+
+    def encode(self, df: pd.DataFrame, column: str = 'inGameName') -> pd.DataFrame:
+        """
+        Converts `column` to the registry's categorical dtype in place, registering unseen names first.
+        Safe to call again after the registry grows: already-encoded columns are only re-pointed at
+        the longer category list. Returns df.
+        """
+        values = df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # astype() treats unordered dtypes with the same names as equal and would keep their order
+            self.add(values.cat.categories)
+            df[column] = values.cat.set_categories(self.dtype.categories)
+        else:
+            self.add(values)
+            df[column] = values.astype(self.dtype)
+        return df
+
+    @staticmethod
+    def decode(df: pd.DataFrame, columns=('inGameName',)) -> pd.DataFrame:
+        """Returns a copy of df with the given categorical columns turned back into plain strings."""
+        df = df.copy()
+        for column in columns:
+            if column in df.columns and isinstance(df[column].dtype, pd.CategoricalDtype):
+                df[column] = df[column].astype(df[column].cat.categories.dtype)
+        return df
+
+
+def load_member_registry(path: str = MEMBERS_CSV) -> MemberRegistry:
+    """The registry for members.csv, or an empty one (filled from the data) if the file is missing."""
+    try:
+        return MemberRegistry.from_members(pd.read_csv(path, usecols=lambda c: c in ('inGameName', 'clubInfoOrder')))
+    except FileNotFoundError:
+        print(f"  - WARNING: {path} not found, member ids will follow the order names are first seen")
+        return MemberRegistry()
@@ -0,0 +1,137 @@
+import asyncio
+import sys
+import time
+from race_day_scheduler import scripts
+
+STAGE_PENDING = 'pending'
+STAGE_RUNNING = 'running'
+STAGE_DONE = 'done'
+STAGE_FAILED = 'failed'
+STAGE_CANCELLED = 'cancelled'
+
+STAGE_ICONS = {
+    STAGE_PENDING: "⏳",
+    STAGE_RUNNING: "🔄",
+    STAGE_DONE: "✅",
+    STAGE_FAILED: "❌",
+    STAGE_CANCELLED: "🛑",
+}
+
+class RefreshAlreadyRunning(Exception):
+    """Raised when a refresh is requested while another one is still in progress."""
+    def __init__(self, job):
+        super().__init__(f"A refresh requested by {job.requested_by} is already running.")
+        self.job = job
+
+
+class RefreshJob:
+    """State of a single run through the refresh pipeline."""
+    def __init__(self, stage_scripts: list, requested_by: str):
+        self.requested_by = requested_by
+        self.stages = [{'script': script, 'status': STAGE_PENDING, 'seconds': None} for script in stage_scripts]
+        self.started_at = time.monotonic()
+        self.process = None
+        self.cancel_requested = False
+        self.error_output = None
+
+    @property
+    def current_stage(self):
+        return next((stage for stage in self.stages if stage['status'] == STAGE_RUNNING), None)
+
+    @property
+    def succeeded(self):
+        return all(stage['status'] == STAGE_DONE for stage in self.stages)
+
+    @property
+    def cancelled(self):
+        return any(stage['status'] == STAGE_CANCELLED for stage in self.stages)
+
+    def progress_text(self):
+        """A Discord-ready checklist of the pipeline stages."""
+        lines = []
+        for stage in self.stages:
+            line = f"{STAGE_ICONS[stage['status']]} `{stage['script']}`"
+            if stage['seconds'] is not None:
+                line += f" ({stage['seconds']:.0f}s)"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+class RefreshJobManager:
+    """
+    Runs the refresh pipeline one stage at a time as child processes and reports each
+    stage's real exit status. Only one job runs at a time (single-flight); a running
+    job can be cancelled, which terminates the current stage and skips the rest.
+    """
+    def __init__(self, sequence: str = 'full_run_once', terminate_timeout: float = 10):
+        self.stage_scripts = scripts[sequence]
+        self.terminate_timeout = terminate_timeout
+        self.current_job = None
+        self._lock = asyncio.Lock()
+
+    def is_running(self):
+        return self._lock.locked()
+
+    async def run(self, requested_by: str, on_progress=None) -> RefreshJob:
+        """
+        Runs every stage in order, awaiting on_progress(job) after each status change.
+        Raises RefreshAlreadyRunning instead of queueing a second refresh.
+        """
+        if self._lock.locked():
+            raise RefreshAlreadyRunning(self.current_job)
+
+        async with self._lock:
+            job = RefreshJob(self.stage_scripts, requested_by)
+            self.current_job = job
+            try:
+                for stage in job.stages:
+                    if job.cancel_requested:
+                        stage['status'] = STAGE_CANCELLED
+                        continue
+
+                    stage['status'] = STAGE_RUNNING
+                    if on_progress: await on_progress(job)
+
+                    stage_start = time.monotonic()
+                    returncode, stderr = await self._run_stage(job, stage['script'])
+                    stage['seconds'] = time.monotonic() - stage_start
+
+                    if job.cancel_requested:
+                        stage['status'] = STAGE_CANCELLED
+                    elif returncode == 0:
+                        stage['status'] = STAGE_DONE
+                    else:
+                        stage['status'] = STAGE_FAILED
+                        job.error_output = f"{stage['script']} exited with code {returncode}\n{stderr[-1500:]}"
+                        for remaining in job.stages:
+                            if remaining['status'] == STAGE_PENDING:
+                                remaining['status'] = STAGE_CANCELLED
+                        break
+                if on_progress: await on_progress(job)
+            finally:
+                job.process = None
+            return job
+
+    async def _run_stage(self, job: RefreshJob, script: str):
+        """Runs one script to completion; stdout goes to the bot's console, stderr is kept for error reports."""
+        job.process = await asyncio.create_subprocess_exec(
+            sys.executable, script,
+            stderr=asyncio.subprocess.PIPE
+        )
+        _, stderr = await job.process.communicate()
+        return job.process.returncode, (stderr or b"").decode(errors='replace')
+
+    async def cancel(self) -> bool:
+        """Stops the running job. Returns False if nothing was running."""
+        job = self.current_job
+        if not self.is_running() or job is None:
+            return False
+        job.cancel_requested = True
+        process = job.process
+        if process and process.returncode is None:
+            process.terminate()
+            try:
+                await asyncio.wait_for(process.wait(), timeout=self.terminate_timeout)
+            except asyncio.TimeoutError:
+                process.kill()
+        return True
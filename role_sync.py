@@ -0,0 +1,124 @@
+import discord
+import asyncio
+import pandas as pd
+
+class RoleSyncReport:
+    """Counts what a single reconcile pass did, so the task can log it in one line."""
+    def __init__(self, guild_name: str):
+        self.guild_name = guild_name
+        self.checked = 0
+        self.unchanged = 0
+        self.edited = 0
+        self.failed = 0
+        self.skipped_hierarchy = 0
+        self.missing_members = 0
+        self.announcements = 0
+        self.api_calls = 0
+
+    def __str__(self):
+        return (f"Rank sync for '{self.guild_name}': {self.checked} checked, {self.unchanged} already correct, "
+                f"{self.edited} edited, {self.failed} failed, {self.skipped_hierarchy} above my role, "
+                f"{self.missing_members} not in server, {self.announcements} promotions announced. "
+                f"API calls: {self.api_calls}.")
+
+
+class RoleReconciler:
+    """
+    Brings every registered member's prestige role in line with their latest rank.
+
+    Desired ranks are computed for all members in one pass, diffed against the member cache
+    discord.py already keeps from the gateway, and only members whose prestige role is wrong
+    get a single `member.edit(roles=...)`. Edits go through a small worker queue so only
+    `max_concurrency` requests are in flight; discord.py handles the per-route 429 buckets.
+    """
+    def __init__(self, max_concurrency: int = 2, announcement_limit: int = 1900):
+        self.max_concurrency = max_concurrency
+        self.announcement_limit = announcement_limit
+
+    @staticmethod
+    def desired_ranks(latest_stats: pd.DataFrame, registrations_df: pd.DataFrame, prestige_roles: dict) -> dict:
+        """Returns {discord_id: role} for every registered member whose rank has a matching role."""
+        merged = latest_stats[['inGameName', 'prestigeRank']].merge(
+            registrations_df[['inGameName', 'discord_id']], on='inGameName'
+        )
+        merged['role'] = merged['prestigeRank'].map(prestige_roles)
+        merged = merged.dropna(subset=['role'])
+        return dict(zip(merged['discord_id'].astype('int64'), merged['role']))
+
+    async def reconcile(self, guild: discord.Guild, desired: dict, prestige_roles: dict, promo_channel=None) -> RoleSyncReport:
+        report = RoleSyncReport(guild.name)
+        prestige_role_ids = {role.id for role in prestige_roles.values()}
+        my_top_role = guild.me.top_role
+        pending = []
+
+        # --- 1. Diff desired state against the cached member roles (no API calls) ---
+        for discord_id, correct_role in desired.items():
+            report.checked += 1
+            member = guild.get_member(discord_id)
+            if not member:
+                report.missing_members += 1
+                continue
+
+            current_prestige_ids = {role.id for role in member.roles if role.id in prestige_role_ids}
+            if current_prestige_ids == {correct_role.id}:
+                report.unchanged += 1
+                continue
+
+            if member.top_role >= my_top_role:
+                report.skipped_hierarchy += 1
+                continue
+
+            new_roles = [role for role in member.roles if role.id not in prestige_role_ids and not role.is_default()]
+            new_roles.append(correct_role)
+            promoted = correct_role.id not in current_prestige_ids
+            pending.append((member, new_roles, correct_role, promoted))
+
+        # --- 2. Apply the edits through a concurrency-limited queue ---
+        queue = asyncio.Queue()
+        for item in pending:
+            queue.put_nowait(item)
+        promotions = []
+
+        async def worker():
+            while True:
+                try:
+                    member, new_roles, correct_role, promoted = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                report.api_calls += 1
+                try:
+                    await member.edit(roles=new_roles, reason=f"Prestige rank sync: {correct_role.name}")
+                    report.edited += 1
+                    if promoted:
+                        promotions.append((member, correct_role))
+                        print(f"Promoted {member.name} to {correct_role.name}")
+                except discord.HTTPException as e:
+                    report.failed += 1
+                    print(f"Failed to update roles for {member.name}: {e}")
+
+        await asyncio.gather(*(worker() for _ in range(min(self.max_concurrency, len(pending)))))
+
+        # --- 3. Announce all promotions in as few messages as possible ---
+        if promo_channel and promotions:
+            lines = [f"🎉 **RANK UP!** Congratulations {member.mention}, you have achieved the rank of **{role.name}**!"
+                     for member, role in promotions]
+            for chunk in self._chunk_lines(lines):
+                report.api_calls += 1
+                try:
+                    await promo_channel.send(chunk)
+                    report.announcements += chunk.count("\n") + 1
+                except discord.HTTPException as e:
+                    print(f"Failed to post rank-up announcement: {e}")
+
+        return report
+
+    def _chunk_lines(self, lines):
+        """Joins lines into messages that stay under Discord's 2000 character limit."""
+        chunk = ""
+        for line in lines:
+            if chunk and len(chunk) + len(line) + 1 > self.announcement_limit:
+                yield chunk
+                chunk = ""
+            chunk = f"{chunk}\n{line}" if chunk else line
+        if chunk:
+            yield chunk
@@ -1,33 +1,68 @@
 import pandas as pd
+import numpy as np
 import os
-import pytz
 import shutil
 from datetime import datetime
 import csv
+import re
+import argparse
+from fan_log_store import read_fan_log
 
 # --- Configuration ---
 FANLOG_CSV = 'fan_log.csv'
 CROPPED_SCREENSHOTS_FOLDER = os.path.join("dataGet", "data", "croppedFanCounts")
 ERROR_LOG_CSV = 'data_validation_errors.csv'
 ERROR_IMAGE_FOLDER = os.path.join("dataGet", "data", "error_images") # Folder for problematic images
+CROP_INDEX_CSV = os.path.join("dataGet", "data", "crop_index.csv") # Written by dataGet.py as crops are archived
+CROP_FILENAME_PATTERN = re.compile(r"^(\d+)_(\d{12})_(.+)_fans\.png$")
+ERROR_LOG_FIELDS = ['timestamp', 'inGameName', 'previousFanCount', 'incorrectFanCount', 'negativeFanGain', 'sourceImageFile',
+                    'fanGain', 'robustZ', 'clubZ', 'reasons']
 
-def find_source_image_filename(timestamp, member_name):
+# --- Anomaly Scoring ---
+# Gains are compared per hour. A reading is suspect if it falls (negative_gain), if its gain is far
+# outside both the member's own recent gains and the rest of the club's gains in the same scan
+# (gain_spike), or if it gained/lost a digit while the count doubled or halved (digit_length).
+ROLLING_WINDOW = 48          # How many of a member's earlier gains (about two days of scans) set their baseline
+MIN_HISTORY = 6              # Fewer earlier gains than this and only the club comparison applies
+MIN_MAD_PER_HOUR = 100_000   # Floor for the spread, since idle stretches give a MAD of 0
+ROBUST_Z_THRESHOLD = 30
+CLUB_Z_THRESHOLD = 30
+DIGIT_JUMP_RATIO = 2.0
+BASELINE_READINGS = 3        # Gains are measured from the median of this many previous readings
+
+def _scan_crop_folder():
+    """Maps (filename timestamp, member) to filename for every crop in the folder."""
+    image_index = {}
+    try:
+        for entry in os.scandir(CROPPED_SCREENSHOTS_FOLDER):
+            match = CROP_FILENAME_PATTERN.match(entry.name)
+            if match:
+                image_index[(match.group(2), match.group(3))] = entry.name
+    except FileNotFoundError as e:
+        print(f"  - Could not index cropped images: {e}")
+    return image_index
+
+def build_image_index(rows=()):
+    """
+    Maps (filename timestamp '%Y%m%d%H%M', member) to the cropped image's filename, built once per run.
+    Uses the index dataGet.py keeps. If there isn't one yet, or it is missing any of `rows` (crops archived
+    before the index existed), the crop folder is scanned a single time to fill the gaps.
+    """
+    image_index = {}
+    if os.path.isfile(CROP_INDEX_CSV):
+        index_df = pd.read_csv(CROP_INDEX_CSV, dtype=str)
+        image_index = dict(zip(zip(index_df['timestamp'], index_df['inGameName']), index_df['filename']))
+    wanted = {(row.timestamp.strftime("%Y%m%d%H%M"), row.inGameName) for row in rows}
+    if not image_index or not wanted <= image_index.keys():
+        image_index = {**_scan_crop_folder(), **image_index}
+    return image_index
+
+def find_source_image_filename(timestamp, member_name, image_index):
     """
     Finds the corresponding cropped image file for a given log entry.
-    This works by matching the member name and the timestamp format used in the filenames.
+    The filename format for the timestamp part is '%Y%m%d%H%M'.
     """
-    try:
-        # The filename format for the timestamp part is '%Y%m%d%H%M'
-        filename_timestamp_str = timestamp.strftime("%Y%m%d%H%M")
-        
-        # Search the directory for a file that contains both the timestamp string and member name
-        for filename in os.listdir(CROPPED_SCREENSHOTS_FOLDER):
-            if filename_timestamp_str in filename and member_name in filename:
-                return filename
-    except Exception as e:
-        # This might happen if the directory doesn't exist or there are other issues
-        print(f"  - Could not search for image file for {member_name}: {e}")
-    return "File Not Found"
+    return image_index.get((timestamp.strftime("%Y%m%d%H%M"), member_name), "File Not Found")
 
 def move_error_image(image_filename):
     """Moves the problematic screenshot to an error folder for review."""
@@ -51,13 +86,18 @@ def move_error_image(image_filename):
 def log_anomalies_to_csv(anomalies_to_log):
     """
     Appends detected anomalies to a CSV log file for later review.
+    A log written before the scoring columns existed gets them added first.
     """
     file_exists = os.path.isfile(ERROR_LOG_CSV)
     
     try:
+        if file_exists:
+            with open(ERROR_LOG_CSV, 'r', newline='') as f:
+                header = next(csv.reader(f), [])
+            if header != ERROR_LOG_FIELDS:
+                pd.read_csv(ERROR_LOG_CSV, dtype=str).reindex(columns=ERROR_LOG_FIELDS).to_csv(ERROR_LOG_CSV, index=False)
         with open(ERROR_LOG_CSV, 'a', newline='') as f:
-            fieldnames = ['timestamp', 'inGameName', 'previousFanCount', 'incorrectFanCount', 'negativeFanGain', 'sourceImageFile']
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer = csv.DictWriter(f, fieldnames=ERROR_LOG_FIELDS)
             if not file_exists:
                 writer.writeheader()
             writer.writerows(anomalies_to_log)
@@ -65,89 +105,176 @@ def log_anomalies_to_csv(anomalies_to_log):
     except Exception as e:
         print(f"--- ERROR: Could not write to {ERROR_LOG_CSV}: {e} ---")
 
+def load_fan_log():
+    """Loads the cleaned fan log (Central-time timestamps, integer counts). Returns None if it's missing."""
+    try:
+        return read_fan_log(FANLOG_CSV)
+    except FileNotFoundError:
+        print(f"  - ERROR: {FANLOG_CSV} not found. Cannot perform validation.")
+        return None
+
+def _robust_z(values, median, mad):
+    return 0.6745 * (values - median) / np.maximum(mad, MIN_MAD_PER_HOUR)
+
+def _rolling_median(values, members, window=ROLLING_WINDOW, min_periods=MIN_HISTORY):
+    """Each row's median over its member's previous `window` values (the row itself excluded)."""
+    previous = values.groupby(members).shift(1)
+    return previous.groupby(members).rolling(window, min_periods=min_periods).median().reset_index(level=0, drop=True)
+
+def score_fan_gains(df):
+    """
+    Scores every fan log row in one vectorized pass. Returns the rows sorted by member and time, with
+    fanGain, gainPerHour, robustZ (vs. the member's rolling median/MAD), clubZ (vs. the same scan's
+    other members), reasons and a `suspect` flag.
+
+    Spikes are measured from the median of the member's last BASELINE_READINGS readings rather than
+    from the single previous one. One bad reading then can't move the baseline, so the good reading
+    after it isn't flagged for "jumping back". Drops are still checked against the previous reading.
+    """
+    scored = df.sort_values(['inGameName', 'timestamp'], kind='stable').reset_index(drop=True)
+    members = scored['inGameName']
+    by_member = scored.groupby('inGameName')
+    scored['previousFanCount'] = by_member['fanCount'].shift(1)
+    scored['fanGain'] = scored['fanCount'] - scored['previousFanCount']
+
+    # Timestamps may be s, us or ns resolution depending on where they were read from
+    epoch_hours = (scored['timestamp'] - pd.Timestamp(0, tz='UTC')) / pd.Timedelta(hours=1)
+    baseline = _rolling_median(scored['fanCount'], members, BASELINE_READINGS, min_periods=1)
+    baseline_hours = _rolling_median(epoch_hours, members, BASELINE_READINGS, min_periods=1)
+    # Scans a few minutes apart would turn an ordinary gain into a huge hourly rate, so count them as an hour
+    scored['gainPerHour'] = (scored['fanCount'] - baseline) / (epoch_hours - baseline_hours).clip(lower=1)
+
+    median = _rolling_median(scored['gainPerHour'], members)
+    mad = _rolling_median((scored['gainPerHour'] - median).abs(), members)
+    scored['robustZ'] = _robust_z(scored['gainPerHour'], median, mad)
+
+    # A surge the whole club shares (a game event) is real; an OCR error only hits one member
+    club_median = scored.groupby('timestamp')['gainPerHour'].transform('median')
+    club_mad = (scored['gainPerHour'] - club_median).abs().groupby(scored['timestamp']).transform('median')
+    scored['clubZ'] = _robust_z(scored['gainPerHour'], club_median, club_mad)
+
+    digits = np.floor(np.log10(scored['fanCount'].clip(lower=1))) + 1
+    baseline_digits = np.floor(np.log10(baseline.clip(lower=1))) + 1
+    ratio = scored['fanCount'] / baseline
+
+    # A spike has to be an actual rise: a reading equal to the previous one can still sit far above
+    # a baseline the misread readings before it dragged down
+    flags = {
+        'gain_spike': (scored['fanCount'] > scored['previousFanCount']) & (scored['clubZ'] >= CLUB_Z_THRESHOLD)
+                      & ((scored['robustZ'] >= ROBUST_Z_THRESHOLD) | scored['robustZ'].isna()),
+        'digit_length': (digits != baseline_digits) & baseline.notna() & ((ratio >= DIGIT_JUMP_RATIO) | (ratio <= 1 / DIGIT_JUMP_RATIO)),
+    }
+    # Any drop from the previous reading is suspect, unless that reading was itself a spike or
+    # digit misread and this one is back in line with the baseline
+    previous_suspect = (flags['gain_spike'] | flags['digit_length']).groupby(members).shift(1, fill_value=False)
+    recovered = previous_suspect & (scored['fanCount'] >= baseline)
+    flags = {'negative_gain': (scored['fanCount'] < scored['previousFanCount']) & ~recovered, **flags}
+    scored['suspect'] = flags['negative_gain'] | flags['gain_spike'] | flags['digit_length']
+    reasons = pd.Series('', index=scored.index)
+    for reason, mask in flags.items():
+        reasons = reasons.where(~mask, reasons + reason + ';')
+    scored['reasons'] = reasons.str.rstrip(';')
+    return scored
+
+def _anomaly_record(row, source_image):
+    return {
+        'timestamp': row.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+        'inGameName': row.inGameName,
+        'previousFanCount': int(row.previousFanCount),
+        'incorrectFanCount': int(row.fanCount),
+        'negativeFanGain': int(row.fanGain) if row.fanGain < 0 else '',
+        'sourceImageFile': source_image,
+        'fanGain': int(row.fanGain),
+        'robustZ': round(row.robustZ, 2) if pd.notna(row.robustZ) else '',
+        'clubZ': round(row.clubZ, 2) if pd.notna(row.clubZ) else '',
+        'reasons': row.reasons
+    }
 
 def validate_fan_gains():
     """
-    Loads the fan log, checks ONLY THE LATEST ENTRIES for negative fan gains, 
+    Loads the fan log, scores ONLY THE LATEST ENTRIES for suspect readings,
     quarantines the source image, and logs the error without stopping the scheduler.
     """
     print("--- 2a. Running Data Validation ---")
-    try:
-        df = pd.read_csv(FANLOG_CSV)
-    except FileNotFoundError:
-        print(f"  - ERROR: {FANLOG_CSV} not found. Cannot perform validation.")
+    df = load_fan_log()
+    if df is None:
         return
-
-    # --- Data Cleaning ---
-    df.dropna(subset=['inGameName', 'fanCount'], inplace=True)
-    df['fanCount'] = pd.to_numeric(df['fanCount'].astype(str).str.replace(',', '', regex=False), errors='coerce')
-    df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
-    df.dropna(subset=['fanCount', 'timestamp'], inplace=True)
-    
-    # Localize timestamps to ensure correct sorting and comparison
-    central_tz = pytz.timezone('US/Central')
-    df['timestamp'] = df['timestamp'].dt.tz_localize(central_tz, ambiguous='infer')
     
     # --- Anomaly Detection on MOST RECENT entries only ---
     
     # Find the timestamp of the most recent data collection run
     latest_timestamp = df['timestamp'].max()
-    
-    # Get all entries from the latest run
-    latest_entries = df[df['timestamp'] == latest_timestamp]
+
+    # Enough of each member's history to reproduce their rolling median and MAD for the latest entry
+    recent = df.sort_values('timestamp', kind='stable').groupby('inGameName').tail(2 * ROLLING_WINDOW + 2)
+    scored = score_fan_gains(recent)
+    latest_entries = scored[scored['timestamp'] == latest_timestamp]
     
     anomalies_found = []
 
     print(f"--- Validating {len(latest_entries)} entries from run at {latest_timestamp.strftime('%Y-%m-%d %H:%M')} ---")
 
-    for _, current_row in latest_entries.iterrows():
-        member_name = current_row['inGameName']
-        
-        # Get all historical data for this specific member and sort it
-        member_history = df[df['inGameName'] == member_name].sort_values('timestamp')
-        
-        # Ensure there are at least two data points to compare
-        if len(member_history) < 2:
-            continue # Skip members with only one entry (e.g., new members)
-            
-        # The current entry is the last one in their history
-        # The previous entry is the second to last one
-        previous_row = member_history.iloc[-2]
+    suspects = latest_entries[latest_entries['suspect']]
+    image_index = build_image_index(suspects.itertuples(index=False)) if not suspects.empty else {}
+    for current_row in suspects.itertuples(index=False):
+        member_name = current_row.inGameName
+
+        # Anomaly detected!
+        print(f"\n  - ⚠️ ANOMALY DETECTED for {member_name}! ({current_row.reasons.replace(';', ', ')})")
         
-        previous_fan_count = previous_row['fanCount']
-        current_fan_count = current_row['fanCount']
+        image_filename = find_source_image_filename(current_row.timestamp, member_name, image_index)
         
-        fan_gain = current_fan_count - previous_fan_count
+        # Move the image and get its new path
+        quarantined_image_path = move_error_image(image_filename)
+        anomalies_found.append(_anomaly_record(current_row, quarantined_image_path))
         
-        if fan_gain < 0:
-            # Anomaly detected!
-            print(f"\n  - ⚠️ ANOMALY DETECTED for {member_name}!")
-            
-            image_filename = find_source_image_filename(current_row['timestamp'], member_name)
-            
-            # Move the image and get its new path
-            quarantined_image_path = move_error_image(image_filename)
-
-            # Prepare the record for logging
-            anomaly_record = {
-                'timestamp': current_row['timestamp'].strftime('%Y-%m-%d %H:%M:%S'),
-                'inGameName': member_name,
-                'previousFanCount': int(previous_fan_count),
-                'incorrectFanCount': int(current_fan_count),
-                'negativeFanGain': int(fan_gain),
-                'sourceImageFile': quarantined_image_path
-            }
-            anomalies_found.append(anomaly_record)
-            
-            print(f"    - Previous Count: {int(previous_fan_count):,}")
-            print(f"    - Incorrect Count: {int(current_fan_count):,}")
+        print(f"    - Previous Count: {int(current_row.previousFanCount):,}")
+        print(f"    - Incorrect Count: {int(current_row.fanCount):,}")
 
     if anomalies_found:
         print("\n--- DATA VALIDATION ALERT SUMMARY ---")
         log_anomalies_to_csv(anomalies_found)
         print("--- Scheduler will continue. Please correct the data in fan_log.csv later. ---")
     else:
-        print("--- Data validation PASSED. No negative fan gains found in the latest run. ---")
+        print("--- Data validation PASSED. No suspect readings found in the latest run. ---")
+
+def backfill_anomalies():
+    """
+    Scores the whole fan log in one pass and logs every suspect row not already in the error log.
+    Images are only looked up, not quarantined, since history may already have been reviewed.
+    """
+    print("--- Backfilling Data Validation Over the Full Fan Log ---")
+    df = load_fan_log()
+    if df is None:
+        return
+    scored = score_fan_gains(df)
+    suspects = scored[scored['suspect']]
+
+    already_logged = set()
+    if os.path.isfile(ERROR_LOG_CSV):
+        logged_df = pd.read_csv(ERROR_LOG_CSV, dtype=str)
+        already_logged = set(zip(logged_df['timestamp'], logged_df['inGameName']))
+
+    image_index = build_image_index(suspects.itertuples(index=False)) if not suspects.empty else {}
+    anomalies_found = []
+    for row in suspects.itertuples(index=False):
+        if (row.timestamp.strftime('%Y-%m-%d %H:%M:%S'), row.inGameName) in already_logged:
+            continue
+        image_filename = find_source_image_filename(row.timestamp, row.inGameName, image_index)
+        source_image = os.path.join(CROPPED_SCREENSHOTS_FOLDER, image_filename) if image_filename != "File Not Found" else image_filename
+        anomalies_found.append(_anomaly_record(row, source_image))
+        print(f"  - {row.timestamp.strftime('%Y-%m-%d %H:%M')} {row.inGameName}: {int(row.previousFanCount):,} -> {int(row.fanCount):,} ({row.reasons.replace(';', ', ')})")
+
+    print(f"--- Scored {len(scored)} entries: {len(suspects)} suspect, {len(anomalies_found)} not yet logged. ---")
+    if anomalies_found:
+        log_anomalies_to_csv(anomalies_found)
 
 if __name__ == "__main__":
-    validate_fan_gains()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Validate the latest fan log entries.")
+    parser.add_argument('--backfill', action='store_true', help="Score the entire fan log and log every suspect row.")
+    args = parser.parse_args()
+
+    if args.backfill:
+        backfill_anomalies()
+    else:
+        validate_fan_gains()